@@ -15,6 +15,8 @@ CREATE TABLE IF NOT EXISTS Trucks (
   id          VARCHAR(10) NOT NULL,
   provider_id INT NOT NULL,
   PRIMARY KEY (id),
+  -- the bill looks up a provider's trucks
+  KEY ix_Trucks_provider_id (provider_id),
   CONSTRAINT fk_trucks_provider
     FOREIGN KEY (provider_id) REFERENCES Provider(id)
     ON UPDATE CASCADE
@@ -12,7 +12,7 @@ class Provider(db.Model):
 class Truck(db.Model):
     __tablename__ = 'Trucks'
     id = db.Column(db.String(10), primary_key=True)
-    provider_id = db.Column(db.Integer, db.ForeignKey('Provider.id'), nullable=False)
+    provider_id = db.Column(db.Integer, db.ForeignKey('Provider.id'), nullable=False, index=True)
     def __init__(self,id,provider_id):
         self.id=id
         self.provider_id=provider_id
@@ -14,6 +14,7 @@ bill_bp = Blueprint("bill", __name__)
 # ----------------------------------------------------------------------------------
 #                  _____ Helper functions _____
 # || parse_timestamp || resolve_time_range || get_provider_trucks ||
+# || fetch_summary || fetch_weights || fetch_truck_weights || summarize_weights ||
 # ----------------------------------------------------------------------------------
 def parse_timestamp(timeStamp_string):
     try:
@@ -43,42 +44,112 @@ def get_provider_trucks(provider_id):
     # extract just the id from each Truck object into a flat list
     return [truck.id for truck in trucks]
 
-# calls the weight microservice's GET /weight endpoint to get all completed
-# weighing transactions ("out" direction) within the given time window
-def fetch_weights(start, end):
+# how many trucks the weight service sums up per POST /weight/summary
+SUMMARY_TRUCKS_PER_REQUEST = 1000
+
+# asks the weight service to add up the trucks' billable sessions itself
+# (POST /weight/summary) — a few rows per product instead of the month's traffic.
+# returns (product_stats, truck_count, session_count), or None when the weight
+# service is too old to have the endpoint
+def fetch_summary(trucks, start, end):
+    product_stats = {}
+    trucks_seen = set()
+    session_count = 0
+
+    # a provider with thousands of trucks is summed in slices and added up here;
+    # each session belongs to one truck, so the slices never overlap
+    for i in range(0, len(trucks), SUMMARY_TRUCKS_PER_REQUEST):
+        response = requests.post(f"{WEIGHT_API}/weight/summary", json={
+            "trucks": trucks[i:i + SUMMARY_TRUCKS_PER_REQUEST],
+            "from": start.strftime("%Y%m%d%H%M%S"),
+            "to": end.strftime("%Y%m%d%H%M%S"),
+        })
+
+        # 404 means the route doesn't exist yet — the caller falls back to GET /weight
+        if response.status_code == 404:
+            return None
+        if response.status_code != 200:
+            raise Exception("weight service error")
+
+        # the summary looks like:
+        #   "trucks": ["T-001", ...],
+        #   "sessionCount": 3,
+        #   "products": [{"produce": "oranges", "neto": 3000, "sessions": 2}, ...]
+        data = response.json()
+        trucks_seen.update(data["trucks"])
+        session_count += data["sessionCount"]
+
+        for product in data["products"]:
+            stats = product_stats.setdefault(product["produce"], {"total_kg": 0, "session_count": 0})
+            stats["total_kg"] += product["neto"]
+            stats["session_count"] += product["sessions"]
+
+    return product_stats, len(trucks_seen), session_count
+
+# how many weight records to ask for per page
+WEIGHT_PAGE_SIZE = 1000
+# how many trucks to put in one GET /weight truck= filter, so the URL stays short
+WEIGHT_TRUCKS_PER_REQUEST = 100
+
+# calls the weight microservice's GET /weight endpoint to get the completed
+# weighing transactions ("out" direction) of the given trucks within the time window
+def fetch_weights(start, end, trucks):
+    weights = []
+    # the weight service filters by truck in SQL, a slice of trucks at a time
+    for i in range(0, len(trucks), WEIGHT_TRUCKS_PER_REQUEST):
+        weights.extend(fetch_truck_weights(start, end, trucks[i:i + WEIGHT_TRUCKS_PER_REQUEST]))
+    return weights
+
+def fetch_truck_weights(start, end, trucks):
 
     params = {
         # format datetimes back into the "yyyymmddhhmmss" string format
         "from": start.strftime("%Y%m%d%H%M%S"),
         "to": end.strftime("%Y%m%d%H%M%S"),
         "filter": "out",
+        # only these trucks' records (a weight service without the filter
+        # ignores it and returns everyone's — see the check below)
+        "truck": ",".join(trucks),
+        # ask for pages so a month of traffic isn't one giant response
+        "limit": WEIGHT_PAGE_SIZE,
     }
 
-    # make the HTTP GET call to the weight service
-    response = requests.get(f"{WEIGHT_API}/weight", params=params)
-
-    if response.status_code != 200:
-        raise Exception("weight service error")
-
-    # parse the JSON array of weight records and return it
-    #   "id": t.id,
-    #   "direction": t.direction,
-    #   "truck": t.truck,
-    #   "bruto": t.bruto,
-    #   "neto": t.neto / "na",
-    #   "produce": t.produce,
-    #   "containers": containers
-    return response.json()
-
-# ----------------------------------------------------------------------------------
-#   the core billing logic
-# ----------------------------------------------------------------------------------
-def generate_bill(provider, start, end):
-    # get all truck IDs for this provider as a set (for fast "in" lookups)
-    provider_trucks = set(get_provider_trucks(provider.id))
-    # fetch all "out" weight records from the weight service for this time window
-    weights = fetch_weights(start, end)
-
+    # keep only this slice's records, otherwise an older weight service that
+    # ignores truck= would have every slice count every truck's sessions again
+    slice_trucks = set(trucks)
+
+    weights = []
+    while True:
+        # make the HTTP GET call to the weight service
+        response = requests.get(f"{WEIGHT_API}/weight", params=params)
+
+        if response.status_code != 200:
+            raise Exception("weight service error")
+
+        # each weight record looks like:
+        #   "id": t.id,
+        #   "direction": t.direction,
+        #   "truck": t.truck,
+        #   "bruto": t.bruto,
+        #   "neto": t.neto / "na",
+        #   "produce": t.produce,
+        #   "containers": containers
+        data = response.json()
+
+        # a weight service without pagination returns the whole array at once
+        if isinstance(data, list):
+            return [w for w in data if w.get("truck") in slice_trucks]
+
+        weights.extend(w for w in data["results"] if w.get("truck") in slice_trucks)
+
+        # no "next" cursor means this was the last page
+        if not data.get("next"):
+            return weights
+        params["cursor"] = data["next"]
+
+# adds up the weight records on the provider's trucks per product, the way
+# POST /weight/summary does — for a weight service that doesn't have it yet
+def summarize_weights(weights, provider_trucks):
     # dict to accumulate total_kg and session_count per product (e.g. "oranges")
     product_stats = {}
     trucks_seen = set()
@@ -120,6 +191,24 @@ def generate_bill(provider, start, end):
         # bump the session count for this product
         product_stats[produce]["session_count"] += 1
 
+    # same shape as fetch_summary returns
+    return product_stats, len(trucks_seen), len(sessions_seen)
+
+# ----------------------------------------------------------------------------------
+#   the core billing logic
+# ----------------------------------------------------------------------------------
+def generate_bill(provider, start, end):
+    # get all truck IDs for this provider
+    provider_trucks = get_provider_trucks(provider.id)
+
+    # let the weight service add up this provider's sessions per product
+    summary = fetch_summary(provider_trucks, start, end)
+    if summary is None:
+        # older weight service: fetch our trucks' "out" weight records for this
+        # time window and add them up here (a set for fast "in" lookups)
+        summary = summarize_weights(fetch_weights(start, end, provider_trucks), set(provider_trucks))
+    product_stats, truck_count, session_count = summary
+
     # now look up the billing rates — each Rate row maps a product to a price per kg
     # scoped to this provider's ID
     rates_query = Rate.query.filter_by(scope=provider.id).all()
@@ -165,8 +254,8 @@ def generate_bill(provider, start, end):
         "name": provider.name,  # provider display name
         "from": start.strftime("%Y%m%d%H%M%S"),  # start of billing window
         "to": end.strftime("%Y%m%d%H%M%S"),  # end of billing window
-        "truckCount": len(trucks_seen),  # how many unique trucks
-        "sessionCount": len(sessions_seen),  # how many weighing sessions
+        "truckCount": truck_count,  # how many unique trucks
+        "sessionCount": session_count,  # how many weighing sessions
         "products": result_products,  # per-product breakdown
         "total": grand_total,  # total pay across all products
     }
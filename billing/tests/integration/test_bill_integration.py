@@ -39,6 +39,17 @@ def client(app):
     return app.test_client()
 
 
+# most tests below feed records through GET /weight, the way an older weight
+# service without POST /weight/summary is billed — so summary requests get a 404
+# unless a test patches requests.post itself
+@pytest.fixture(autouse=True)
+def weight_service_without_summary():
+    not_found = MagicMock()
+    not_found.status_code = 404
+    with patch("routes.bill_route.requests.post", return_value=not_found) as mock_post:
+        yield mock_post
+
+
 # helper that inserts a provider with two trucks and a rate into the test db
 # returns the provider's auto-generated ID so tests can use it in URLs
 def seed_provider_with_trucks(app):
@@ -290,3 +301,128 @@ def test_neto_na_transactions_are_skipped(mock_get, client, app):
     assert data["products"][0]["amount"] == 2000
     # total pay = 2000 kg * 5 per kg = 10000
     assert data["total"] == 10000
+
+
+# ---- TEST: paginated weight responses are followed ----
+# the weight service returns {"results": [...], "next": cursor} pages when
+# asked for a limit — fetch_weights should keep asking until "next" is empty
+
+@patch("routes.bill_route.requests.get")
+def test_weight_pages_are_followed(mock_get, client, app):
+    # seed provider with trucks and oranges rate
+    pid = seed_provider_with_trucks(app)
+
+    # first page points at a second page through its "next" cursor
+    first_page = {"results": [
+        {"id": 1, "direction": "out", "truck": "T-001", "bruto": 5000,
+         "neto": 1000, "produce": "oranges", "containers": ["C1"]},
+    ], "next": "abc"}
+    # second page is the last one — no "next" cursor
+    second_page = {"results": [
+        {"id": 2, "direction": "out", "truck": "T-002", "bruto": 6000,
+         "neto": 2000, "produce": "oranges", "containers": ["C2"]},
+    ], "next": None}
+    # each call to requests.get returns the next page
+    mock_get.side_effect = [make_weight_response(first_page), make_weight_response(second_page)]
+
+    resp = client.get(
+        f"/bill/{pid}?from=20250101000000&to=20251231235959"
+    )
+    data = resp.get_json()
+
+    # both pages were fetched and both records counted
+    assert resp.status_code == 200
+    assert mock_get.call_count == 2
+    # the second call carried the cursor from the first page
+    assert mock_get.call_args_list[1].kwargs["params"]["cursor"] == "abc"
+    # and both asked for our provider's trucks only
+    assert all(sorted(c.kwargs["params"]["truck"].split(",")) == ["T-001", "T-002"] for c in mock_get.call_args_list)
+    assert data["sessionCount"] == 2
+    assert data["total"] == 15000
+
+
+# ---- TEST: more trucks than one truck= slice, older weight service ----
+# an older weight service ignores truck= and returns every truck's records for
+# each slice — every session must still be counted exactly once
+
+@patch("routes.bill_route.requests.get")
+def test_old_weight_service_counts_each_session_once(mock_get, client, app):
+    # a provider with 150 trucks, more than WEIGHT_TRUCKS_PER_REQUEST (100)
+    with app.app_context():
+        provider = Provider(name="Big Provider")
+        db.session.add(provider)
+        db.session.flush()
+        trucks = [f"T-{n:03d}" for n in range(150)]
+        db.session.add_all(Truck(id=truck, provider_id=provider.id) for truck in trucks)
+        db.session.add(Rate(product_id="oranges", scope=str(provider.id), rate=5))
+        db.session.commit()
+        pid = provider.id
+
+    # one 100 kg session per truck, returned whatever truck= asked for
+    every_record = [
+        {"id": n + 1, "direction": "out", "truck": truck, "bruto": 5000,
+         "neto": 100, "produce": "oranges", "containers": ["C1"]}
+        for n, truck in enumerate(trucks)
+    ]
+    mock_get.return_value = make_weight_response(every_record)
+
+    resp = client.get(f"/bill/{pid}?from=20250101000000&to=20251231235959")
+    data = resp.get_json()
+
+    assert resp.status_code == 200
+    # two slices were asked for
+    assert mock_get.call_count == 2
+    assert data["truckCount"] == 150
+    assert data["sessionCount"] == 150
+    assert data["products"][0]["count"] == "150"
+    assert data["products"][0]["amount"] == 15000
+    assert data["total"] == 75000
+
+
+# ---- TEST: the weight service adds up the sessions ----
+# with POST /weight/summary available, billing sends the provider's trucks and
+# only gets per-product totals back — GET /weight is never called
+
+@patch("routes.bill_route.requests.get")
+@patch("routes.bill_route.requests.post")
+def test_bill_from_weight_summary(mock_post, mock_get, client, app):
+    pid = seed_provider_with_trucks(app)
+
+    # what the weight service answers for T-001 and T-002
+    mock_post.return_value = make_weight_response({
+        "from": "20250101000000", "to": "20251231235959",
+        "trucks": ["T-001", "T-002"], "truckCount": 2, "sessionCount": 3,
+        "products": [{"produce": "oranges", "neto": 3000, "sessions": 3}],
+    })
+
+    resp = client.get(f"/bill/{pid}?from=20250101000000&to=20251231235959")
+    data = resp.get_json()
+
+    assert resp.status_code == 200
+    mock_get.assert_not_called()
+    # the request carried our provider's trucks and the bill's window
+    sent = mock_post.call_args.kwargs["json"]
+    assert sorted(sent["trucks"]) == ["T-001", "T-002"]
+    assert (sent["from"], sent["to"]) == ("20250101000000", "20251231235959")
+
+    assert data["truckCount"] == 2
+    assert data["sessionCount"] == 3
+    assert data["products"] == [{"product": "oranges", "count": "3", "amount": 3000, "rate": 5, "pay": 15000}]
+    assert data["total"] == 15000
+
+
+# ---- TEST: weight summary error ----
+# anything but 200 or 404 from POST /weight/summary fails the bill
+
+@patch("routes.bill_route.requests.post")
+def test_weight_summary_error_returns_500(mock_post, client, app):
+    pid = seed_provider_with_trucks(app)
+
+    error_resp = MagicMock()
+    error_resp.status_code = 503
+    mock_post.return_value = error_resp
+
+    resp = client.get(f"/bill/{pid}?from=20250101000000&to=20251231235959")
+
+    assert resp.status_code == 500
+    assert "billing failed" in resp.get_json()["error"]
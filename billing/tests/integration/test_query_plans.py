@@ -0,0 +1,129 @@
+# query-plan regression tests for billing
+# each route is called against a seeded DB while we record every SQL statement
+# it sends; every SELECT/UPDATE/DELETE is then run through EXPLAIN QUERY PLAN and
+# the test fails if a large table is scanned or sorted without an index.
+# billing tests run on in-memory SQLite, so these are SQLite plans - MySQL
+# builds its own plans, but a missing index shows up in both.
+import pytest
+from unittest.mock import patch, MagicMock
+from sqlalchemy import event
+
+from app import create_app
+from models import db, Provider, Truck, Rate
+
+
+# tables that grow with the number of providers/trucks
+LARGE_TABLES = {"Trucks"}
+
+# (route, table) -> why a scan there is acceptable
+ALLOWED = {}
+
+SEED_PROVIDERS = 50
+SEED_TRUCKS_PER_PROVIDER = 40
+
+
+@pytest.fixture
+def app():
+    app = create_app("TestConfig")
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        # enough trucks that scanning the table would be a real cost
+        for p in range(SEED_PROVIDERS):
+            provider = Provider(name=f"Plan Provider {p}")
+            # same ids MySQL hands out (AUTO_INCREMENT=10001), so ROUTES can use them
+            provider.id = 10001 + p
+            db.session.add(provider)
+            db.session.flush()
+            for t in range(SEED_TRUCKS_PER_PROVIDER):
+                db.session.add(Truck(id=f"P{p}-T{t}", provider_id=provider.id))
+            db.session.add(Rate(product_id="oranges", scope=str(provider.id), rate=5))
+        db.session.commit()
+        db.session.execute(db.text("ANALYZE"))
+
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+# a fake weight service, so /bill and /truck only touch our DB:
+# GET /weight has no records, GET /item/<id> has no sessions,
+# POST /weight/summary has no sessions
+def fake_weight_service(url, params=None, json=None):
+    mock_resp = MagicMock()
+    mock_resp.status_code = 200
+    if url.endswith("/weight/summary"):
+        mock_resp.json.return_value = {"trucks": [], "truckCount": 0, "sessionCount": 0, "products": []}
+    elif url.endswith("/weight"):
+        mock_resp.json.return_value = []
+    else:
+        mock_resp.json.return_value = {"tara": "na", "sessions": []}
+    return mock_resp
+
+
+def capture_statements(engine):
+    # record (statement, parameters) for everything sent to the driver
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if not executemany:
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    return statements, lambda: event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def plan_problems(route, statements):
+    problems = []
+
+    with db.engine.connect() as conn:
+        for statement, parameters in statements:
+            if statement.lstrip().split(None, 1)[0].upper() not in ("SELECT", "UPDATE", "DELETE"):
+                continue
+
+            # each row is (id, parent, notused, detail), e.g. "SCAN Trucks"
+            for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters):
+                detail = row[3]
+                words = detail.split()
+                table = words[1] if words[0] in ("SCAN", "SEARCH") else None
+
+                if table not in LARGE_TABLES or (route, table) in ALLOWED:
+                    continue
+                # "SCAN Trucks USING COVERING INDEX ..." still walks the whole table
+                if words[0] == "SCAN" or detail.startswith("USE TEMP B-TREE"):
+                    problems.append(f"{detail}\n    in: {statement}")
+
+    return problems
+
+
+ROUTES = [
+    ("bill", "GET", "/bill/10001?from=20000101000000", None),
+    ("truck get", "GET", "/truck/P1-T1", None),
+    ("truck create", "POST", "/truck", {"id": "NEW-1", "provider": 10001}),
+    ("truck update", "PUT", "/truck/P1-T2", {"provider": 10002}),
+    ("provider create", "POST", "/provider", {"name": "Plan Provider New"}),
+    ("rates", "GET", "/rates", None),
+]
+
+
+@pytest.mark.parametrize("route, method, path, body", ROUTES, ids=[r[0] for r in ROUTES])
+# both route modules call the same requests.get
+@patch("requests.get", side_effect=fake_weight_service)
+@patch("requests.post", side_effect=fake_weight_service)
+def test_route_query_plans(mock_post, mock_get, client, route, method, path, body):
+    statements, stop = capture_statements(db.engine)
+    try:
+        res = client.open(path, method=method, json=body)
+    finally:
+        stop()
+
+    assert res.status_code < 500
+    problems = plan_problems(route, statements)
+    assert not problems, f"{route}: unindexed access on a large table:\n" + "\n".join(problems)
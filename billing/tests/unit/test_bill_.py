@@ -50,7 +50,8 @@ def mock_fetch_session(session_id):
 @patch("routes.bill_route.Rate")                                                 # Arg 1
 @patch("routes.bill_route.get_provider_trucks", return_value=["TR001", "TR002"]) # Arg 2
 @patch("routes.bill_route.fetch_weights")                                        # Arg 3
-def test_generate_bill(mock_weights_fn, mock_trucks_fn, mock_rate_model):
+@patch("routes.bill_route.fetch_summary", return_value=None)                     # weight service without /weight/summary
+def test_generate_bill(mock_summary_fn, mock_weights_fn, mock_trucks_fn, mock_rate_model):
     # 1. Update mock_weights to include the 'truck' key your code expects
     processed_weights = []
     for w in mock_weights:
@@ -83,4 +84,25 @@ def test_generate_bill(mock_weights_fn, mock_trucks_fn, mock_rate_model):
     for expected in mock_bill_provider1["products"]:
         actual = result_products[expected["product"]]
         assert actual["amount"] == expected["amount"]
-        assert int(actual["count"]) == int(expected["count"])
\ No newline at end of file
+        assert int(actual["count"]) == int(expected["count"])
+
+
+@patch("routes.bill_route.Rate")
+@patch("routes.bill_route.get_provider_trucks", return_value=["TR001", "TR002"])
+@patch("routes.bill_route.fetch_weights")
+@patch("routes.bill_route.fetch_summary")
+def test_generate_bill_from_weight_summary(mock_summary_fn, mock_weights_fn, mock_trucks_fn, mock_rate_model):
+    # the weight service already added up S1, S2 (P1) and S4 (P2)
+    mock_summary_fn.return_value = (
+        {"P1": {"total_kg": 800, "session_count": 2}, "P2": {"total_kg": 200, "session_count": 1}}, 2, 3
+    )
+    mock_rate_model.query.filter_by.return_value.all.return_value = [
+        MagicMock(product_id=r["product_id"], rate=r["rate"])
+        for r in mock_rates if r["scope"] == 1
+    ]
+
+    bill = generate_bill(make_provider(), datetime(2024, 1, 1), datetime(2024, 1, 31, 23, 59, 59))
+
+    # no weight records were downloaded
+    mock_weights_fn.assert_not_called()
+    assert bill == mock_bill_provider1
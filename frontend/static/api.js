@@ -38,17 +38,28 @@ async function recordWeight(params) {
   return data;
 }
 
-async function getWeightList(from, to, filter) {
+const WEIGHT_PAGE_SIZE = 500;
+
+async function getWeightList(from, to, filter, trucks, produce) {
   const params = new URLSearchParams();
   if (from) params.append('from', from);
   if (to) params.append('to', to);
   if (filter) params.append('filter', filter);
-  const res = await fetch('/api/weight/weight?' + params.toString());
-  if (!res.ok) {
+  // Comma-separated; the weight service filters these in SQL
+  if (trucks) params.append('truck', trucks);
+  if (produce) params.append('produce', produce);
+  params.append('limit', WEIGHT_PAGE_SIZE);
+
+  // Follow the "next" cursor until the last page
+  const records = [];
+  while (true) {
+    const res = await fetch('/api/weight/weight?' + params.toString());
     const data = await res.json();
-    throw new Error(data.error || 'error');
+    if (!res.ok) throw new Error(data.error || 'error');
+    records.push(...data.results);
+    if (!data.next) return records;
+    params.set('cursor', data.next);
   }
-  return await res.json();
 }
 
 async function batchWeight(filename) {
@@ -274,10 +274,12 @@ function setupWeightList() {
     const from = datetimeLocalToApi(document.getElementById('wl-from').value);
     const to = datetimeLocalToApi(document.getElementById('wl-to').value);
     const filter = document.getElementById('wl-filter').value;
+    const trucks = document.getElementById('wl-truck').value.trim();
+    const produce = document.getElementById('wl-produce').value.trim();
     result.innerHTML = '';
     btnLoading(btn, true);
     try {
-      const data = await getWeightList(from, to, filter);
+      const data = await getWeightList(from, to, filter, trucks, produce);
       if (!data || data.length === 0) {
         result.innerHTML = `<div class="empty">${t('noResults')}</div>`;
       } else {
@@ -12,6 +12,7 @@ const translations = {
     containers:'מכולות', containersPlaceholder:'מזהי מכולות מופרדים בפסיק',
     weight:'משקל', unit:'יחידה', force:'כפה',
     produce:'תוצרת', producePlaceholder:'סוג תוצרת (או na)',
+    listFilterPlaceholder:'מופרדים בפסיק, ריק לכולם',
     submit:'שלח', reset:'נקה', success:'הצלחה', error:'שגיאה',
     weightRecorded:'שקילה נרשמה בהצלחה',
     sessionLookup:'חיפוש שקילה', sessionId:'מזהה שקילה',
@@ -62,6 +63,7 @@ const translations = {
     containers:'Containers', containersPlaceholder:'Comma-separated container IDs',
     weight:'Weight', unit:'Unit', force:'Force',
     produce:'Produce', producePlaceholder:'Produce type (or na)',
+    listFilterPlaceholder:'Comma-separated, empty for all',
     submit:'Submit', reset:'Reset', success:'Success', error:'Error',
     weightRecorded:'Weight recorded successfully',
     sessionLookup:'Session Lookup', sessionId:'Session ID',
@@ -1,20 +1,41 @@
-from flask import Flask, Response, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from datetime import datetime
-from sqlalchemy import text
+from sqlalchemy import text, exists
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.exc import OperationalError
 import os
+import base64
 import csv
+import gzip
+import io
 import json
+import math
+from collections import deque
+from itertools import chain, islice
+from threading import Condition, Lock
+import time
+
+try:
+    import zstandard
+except ImportError:  # .zst batch files need the optional zstandard package
+    zstandard = None
 
 
 from dotenv import load_dotenv
 load_dotenv()
 from database import db
-from models import ContainerRegistered, Transaction
+from models import Change, ContainerRegistered, ContainerUnknown, JournalCheckpoint, Transaction, SessionContainer, Truck, WeighingSession
+from cache import LRUCache
+from jobs import JobRunner
+from idempotency import IdempotencyKeyBusy, IdempotencyKeyReused, IdempotencyStore
+from journal import Journal, WriteBehind
+from registry import OpenSession, OpenSessionRegistry
+from migrations import migrate
 import config
 
 app = Flask(__name__)
 
-app.config["SQLALCHEMY_DATABASE_URI"] = f"mysql+pymysql://{config.DB_USER}:{config.DB_PASSWORD}@{config.DB_HOST}/{config.DB_NAME}"
+app.config["SQLALCHEMY_DATABASE_URI"] = config.DB_URI
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
     "pool_pre_ping": True
@@ -22,6 +43,41 @@ app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
 
 db.init_app(app)
 
+# Container taras in kg (None when unknown), keyed by container id
+tara_cache = LRUCache(config.TARA_CACHE_SIZE)
+
+# GET /session responses of closed sessions, keyed by session id; they only
+# change when a forced re-weigh replaces them
+session_cache = LRUCache(config.SESSION_CACHE_SIZE)
+
+batch_jobs = JobRunner(config.BATCH_WORKERS)
+
+# Each truck's current session, so post_weight doesn't query for it
+open_sessions = OpenSessionRegistry()
+
+# POST /weight responses by Idempotency-Key, replayed to retrying scales
+idempotency_keys = IdempotencyStore(config.IDEMPOTENCY_MAX_KEYS, config.IDEMPOTENCY_TTL)
+
+# Set by start_write_behind(), or by start_store_and_forward() while the DB
+# is down. open_sessions then includes journaled readings, while
+# writer_sessions follows what the DB has
+write_behind = None
+writer_sessions = OpenSessionRegistry()
+# "direct", "write-behind" or "store-and-forward", reported by /health
+ingest_mode = "direct"
+mode_lock = Lock()
+
+# Transaction ids reserved in the DB (reserve_buffer_ids) for readings
+# store-and-forward buffers, so a buffered reading keeps the id the scale
+# was given
+reserved_ids = deque()
+
+# Held from adding change-feed rows through the commit, so this process
+# numbers them in commit order; GET /weight/changes long-polls wait on
+# changes_committed
+change_lock = Lock()
+changes_committed = Condition()
+
 
 # --- Utility functions ---
 
@@ -33,6 +89,11 @@ def parse_containers(containers_str):
     """Convert comma-delimited containers string to a list."""
     return containers_str.split(",") if containers_str else []
 
+def unique_container_ids(containers_str):
+    """Split a containers string into stripped, non-empty ids without duplicates."""
+    container_ids = (cid.strip() for cid in parse_containers(containers_str))
+    return list(dict.fromkeys(cid for cid in container_ids if cid))
+
 def parse_force(value):
     """ Convert various force inputs to a boolean. """
     return str(value).lower() == "true"
@@ -46,11 +107,80 @@ def parse_datetime_param(dt_str):
     except (ValueError, TypeError):
         return None
     
-def parse_csv(filepath):
-    """Parse a CSV file and return a list of (id, weight_in_kg) tuples."""
-    records = []
+BATCH_FORMATS = (".csv", ".json")
+BATCH_COMPRESSIONS = (".gz", ".zst")
+
+def batch_file_format(filename):
+    """Return (format, compression) for names like x.csv, x.json.gz or x.csv.zst, or None."""
+    stem, compression = filename, None
+    for suffix in BATCH_COMPRESSIONS:
+        if filename.endswith(suffix):
+            stem, compression = filename[:-len(suffix)], suffix
+            break
+
+    for suffix in BATCH_FORMATS:
+        if stem.endswith(suffix):
+            return suffix, compression
+    return None
+
+def open_batch_file(filepath):
+    """Open a batch file as text, decompressing .gz/.zst on the fly."""
+    if filepath.endswith(".gz"):
+        return gzip.open(filepath, "rt")
+
+    if filepath.endswith(".zst"):
+        if zstandard is None:
+            raise ValueError("zstd files need the 'zstandard' package installed")
+        raw = zstandard.ZstdDecompressor().stream_reader(open(filepath, "rb"))
+        return io.TextIOWrapper(raw)
+
+    return open(filepath, "r")
+
+DEFAULT_PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 10000
+
+def encode_cursor(values):
+    """Pack the last row's sort key into an opaque, URL-safe cursor."""
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor):
+    """Unpack a cursor made by encode_cursor. Raises ValueError if it's malformed."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise ValueError("invalid cursor")
+    if not isinstance(values, list):
+        raise ValueError("invalid cursor")
+    return values
+
+def parse_page_params(args):
+    """Return (limit, cursor_values) when the client asked for a page, else None.
 
-    with open(filepath, "r") as f:
+    Raises ValueError for a bad limit or cursor.
+    """
+    limit_str = args.get("limit")
+    cursor = args.get("cursor")
+
+    if limit_str is None and cursor is None:
+        return None
+
+    try:
+        limit = int(limit_str) if limit_str is not None else DEFAULT_PAGE_SIZE
+    except ValueError:
+        raise ValueError("invalid limit")
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+
+    return limit, decode_cursor(cursor) if cursor else None
+
+def parse_list_param(args, name):
+    """Values of a repeatable, comma-separated query parameter: ?truck=A&truck=B,C -> ["A", "B", "C"]."""
+    values = (v.strip() for value in args.getlist(name) for v in value.split(","))
+    return list(dict.fromkeys(v for v in values if v))
+
+def parse_csv(filepath):
+    """Yield (id, weight_in_kg) tuples from a CSV file, one row at a time."""
+    with open_batch_file(filepath) as f:
         reader = csv.reader(f)
         header = next(reader)
 
@@ -79,85 +209,756 @@ def parse_csv(filepath):
             if unit == "lbs":
                 weight = lbs_to_kg(weight)
 
-            records.append((container_id, weight))
-
-    return records
+            yield container_id, weight
+
+
+def iter_json_array(f, read_size=65536, max_item_size=1 << 20):
+    """Yield the items of a top-level JSON array without loading the whole file."""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    eof = False
+
+    def fill():
+        # Drop what was already consumed, then append the next block
+        nonlocal buffer, pos, eof
+        block = f.read(read_size)
+        buffer = buffer[pos:] + block
+        pos = 0
+        eof = not block
+
+    def skip_whitespace():
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos].isspace():
+                pos += 1
+            if pos < len(buffer) or eof:
+                return
+            fill()
+
+    skip_whitespace()
+    if pos >= len(buffer) or buffer[pos] != "[":
+        raise ValueError("expected a JSON array")
+    pos += 1
+
+    skip_whitespace()
+    if pos < len(buffer) and buffer[pos] == "]":
+        return
+
+    index = 0
+    while True:
+        skip_whitespace()
+        # An item that ends exactly at the buffer edge may continue in the next block,
+        # and so may a number cut just after its "." or "e" ("1." of "1.5" decodes as 1)
+        while True:
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+                cut = end == len(buffer) or (buffer[pos] in "-0123456789" and buffer[end] in ".eE+-0123456789")
+                if not cut or eof or len(buffer) - pos > max_item_size:
+                    break
+            except json.JSONDecodeError as e:
+                if eof or len(buffer) - pos > max_item_size:
+                    raise ValueError(f"item {index}: invalid JSON ({e.msg})")
+            fill()
+        pos = end
+        yield item
+        index += 1
+
+        skip_whitespace()
+        if pos >= len(buffer):
+            raise ValueError(f"item {index}: unterminated JSON array")
+        if buffer[pos] == "]":
+            return
+        if buffer[pos] != ",":
+            raise ValueError(f"item {index}: expected ',' or ']' between items")
+        pos += 1
 
 
 def parse_json(filepath):
-    """Parse a JSON file and return a list of (id, weight_in_kg) tuples."""
-    with open(filepath, "r") as f:
-        data = json.load(f)
+    """Yield (id, weight_in_kg) tuples from a JSON array file, one item at a time."""
+    with open_batch_file(filepath) as f:
+        for i, item in enumerate(iter_json_array(f)):
+            if not isinstance(item, dict) or "id" not in item or "weight" not in item:
+                raise ValueError(f"item {i}: missing 'id' or 'weight' field")
 
-    if not isinstance(data, list):
-        raise ValueError("expected a JSON array")
+            container_id = item["id"]
 
-    records = []
-    for i, item in enumerate(data):
-        if "id" not in item or "weight" not in item:
-            raise ValueError(f"item {i}: missing 'id' or 'weight' field")
+            if not container_id:
+                raise ValueError(f"item {i}: empty 'id' field")
+            
+            if item["weight"] is None:
+                raise ValueError(f"item {i}: missing weight value")
 
-        container_id = item["id"]
+            weight = int(item["weight"])
 
-        if not container_id:
-            raise ValueError(f"item {i}: empty 'id' field")
-        
-        if item["weight"] is None:
-            raise ValueError(f"item {i}: missing weight value")
+            unit = item.get("unit", "kg")
+            if unit == "lbs":
+                weight = lbs_to_kg(weight)
 
-        weight = int(item["weight"])
+            yield container_id, weight
 
-        unit = item.get("unit", "kg")
-        if unit == "lbs":
-            weight = lbs_to_kg(weight)
+# --- Business logic helpers ---
 
-        records.append((container_id, weight))
+def container_tara_kg(container):
+    """Return a registered container's tara in kg, or None if it has no weight."""
+    if container is None or container.weight is None:
+        return None
+    if container.unit == "lbs":
+        return lbs_to_kg(container.weight)
+    return container.weight
+
+def get_container_taras(container_ids, cached_only=False):
+    """Return {container_id: tara_kg or None}, querying only ids missing from tara_cache.
+
+    With cached_only, ids missing from the cache come back as None instead.
+    """
+    taras, missing = tara_cache.get_many(container_ids)
+
+    if missing and cached_only:
+        taras.update({cid: None for cid in missing})
+    elif missing:
+        registered = ContainerRegistered.query.filter(
+            ContainerRegistered.container_id.in_(missing)
+        ).all()
+        loaded = {cid: None for cid in missing}
+        for container in registered:
+            loaded[container.container_id] = container_tara_kg(container)
 
-    return records
+        tara_cache.put_many(loaded)
+        taras.update(loaded)
 
-# --- Business logic helpers ---
+    return taras
 
-def calculate_neto(bruto, truck_tara, container_ids):
+def calculate_neto(bruto, truck_tara, container_ids, cached_only=False):
     """Calculate neto weight. Returns int or 'na' if any container tara unknown."""
-    container_taras = []
-
-    for cid in container_ids:
-        container = ContainerRegistered.query.filter_by(container_id=cid.strip()).first()
-        if container and container.weight is not None:
-            tara = container.weight
-            if container.unit == "lbs":
-                tara = lbs_to_kg(tara)
-            container_taras.append(tara)
-        else:
-            container_taras.append(None)
+    container_ids = [cid.strip() for cid in container_ids]
+    taras = get_container_taras(container_ids, cached_only)
+    container_taras = [taras[cid] for cid in container_ids]
 
     if None in container_taras:
         return "na"
     return bruto - truck_tara - sum(container_taras)
 
+def index_containers(transaction):
+    """Add a session_containers row for each container on the transaction. Returns the row count."""
+    container_ids = unique_container_ids(transaction.containers)
 
-# --- Routes ---
+    for cid in container_ids:
+        db.session.add(SessionContainer(
+            transaction_id=transaction.id,
+            container_id=cid,
+            session_id=transaction.session_id,
+            datetime=transaction.datetime
+        ))
+
+    return len(container_ids)
+
+def unindex_containers(transaction):
+    """Remove the session_containers rows of a transaction that is being deleted."""
+    SessionContainer.query.filter_by(transaction_id=transaction.id).delete()
+
+    # Containers that no longer appear on any transaction drop out of the unknown set
+    ContainerUnknown.query.filter(
+        ContainerUnknown.container_id.in_(unique_container_ids(transaction.containers)),
+        ~exists().where(SessionContainer.container_id == ContainerUnknown.container_id)
+    ).delete(synchronize_session=False)
+
+def track_unknown_containers(container_ids):
+    """Add the containers that have no registered tara to the unknown set."""
+    if not container_ids:
+        return
+
+    taras = get_container_taras(container_ids)
+
+    unknown = [{"container_id": cid} for cid in container_ids if taras[cid] is None]
+    if not unknown:
+        return
+
+    # Another scale may have added the same container concurrently — ignore duplicates
+    insert = db.insert(ContainerUnknown).prefix_with("IGNORE", dialect="mysql").prefix_with("OR IGNORE", dialect="sqlite")
+    db.session.execute(insert, unknown)
+
+def untrack_unknown_containers(container_ids, chunk_size=1000):
+    """Remove containers that just got a registered tara from the unknown set."""
+    for start in range(0, len(container_ids), chunk_size):
+        ContainerUnknown.query.filter(
+            ContainerUnknown.container_id.in_(container_ids[start:start + chunk_size])
+        ).delete(synchronize_session=False)
+
+def upsert_container_rows(rows):
+    """Insert or update containers_registered rows in one statement where the dialect allows it."""
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect == "mysql":
+        stmt = mysql.insert(ContainerRegistered).values(rows)
+        stmt = stmt.on_duplicate_key_update(weight=stmt.inserted.weight, unit=stmt.inserted.unit)
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(ContainerRegistered).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["container_id"],
+            set_={"weight": stmt.excluded.weight, "unit": stmt.excluded.unit}
+        )
+    else:
+        raise NotImplementedError(f"no bulk upsert for dialect '{dialect}'")
 
-@app.get("/health")
-def health():
+    db.session.execute(stmt)
+
+class BatchParseError(Exception):
+    """Raised when a streamed batch file turns out to be invalid partway through."""
+
+def guard_parse_errors(records):
+    """Re-raise parser errors as BatchParseError so they can't be confused with DB errors."""
     try:
-        db.session.execute(text("SELECT 1"))
-        return jsonify({"status": "OK"}), 200
+        yield from records
     except Exception as e:
-        return jsonify({"status": "Failure", "error": str(e)}), 500
+        raise BatchParseError(str(e)) from e
 
+def upsert_containers(records, chunk_size=1000, counts=None):
+    """Register (container_id, weight_kg) records in chunks. Returns inserted/updated/unchanged counts.
 
-@app.post("/weight")
-def post_weight():
-    data = request.get_json(silent=True) or request.form.to_dict()
+    records may be a generator, read in a single pass; only one chunk of
+    records is held in memory at a time (plus the change-feed rows of the
+    containers that actually change). Every chunk is written in one
+    transaction: if records raises partway through (e.g. BatchParseError),
+    nothing is saved. Pass a counts dict to watch progress.
+    """
+    if counts is None:
+        counts = {"inserted": 0, "updated": 0, "unchanged": 0}
 
+    # Committed with the last chunk; the change feed numbers rows at commit
+    changes = []
+    changed_ids = []
+
+    try:
+        import_chunks(iter(records), chunk_size, counts, changes, changed_ids)
+        commit_changes(changes)
+    except Exception:
+        db.session.rollback()
+        raise
+
+    tara_cache.invalidate(changed_ids)
+    return counts
+
+def import_chunks(records, chunk_size, counts, changes, changed_ids):
+    """Upsert records chunk by chunk without committing, collecting the change-feed rows and changed ids."""
+    while chunk := list(islice(records, chunk_size)):
+        container_ids = list(dict.fromkeys(container_id for container_id, _ in chunk))
+
+        # One SELECT per chunk tells us which rows are new or actually change
+        existing = db.session.query(
+            ContainerRegistered.container_id, ContainerRegistered.weight, ContainerRegistered.unit
+        ).filter(ContainerRegistered.container_id.in_(container_ids)).all()
+        current = {cid: (weight, unit) for cid, weight, unit in existing}
+
+        changed = {}
+        for container_id, weight_kg in chunk:
+            if container_id not in current:
+                counts["inserted"] += 1
+            elif current[container_id] == (weight_kg, "kg"):
+                counts["unchanged"] += 1
+                continue
+            else:
+                counts["updated"] += 1
+
+            current[container_id] = (weight_kg, "kg")
+            changed[container_id] = {"container_id": container_id, "weight": weight_kg, "unit": "kg"}
+
+        if changed:
+            upsert_container_rows(list(changed.values()))
+
+        untrack_unknown_containers(container_ids)
+        changes.extend(tara_change(row) for row in changed.values())
+        changed_ids.extend(changed)
+
+def parse_batch_file(filepath):
+    """Pick the streaming parser for a batch file by its extension."""
+    file_format, _ = batch_file_format(filepath)
+    if file_format == ".csv":
+        return parse_csv(filepath)
+    return parse_json(filepath)
+
+def run_batch_job(job, filepath):
+    """Import a batch file on a worker thread, recording progress on the job."""
+    with app.app_context():
+        try:
+            upsert_containers(guard_parse_errors(parse_batch_file(filepath)), counts=job.counts)
+        except BatchParseError as e:
+            raise ValueError(f"failed to parse file: {str(e)}") from e
+
+def rebuild_unknown_containers():
+    """Recompute the unknown set from session_containers in one pass."""
+    ContainerUnknown.query.delete()
+
+    unknown = db.session.query(SessionContainer.container_id).outerjoin(
+        ContainerRegistered,
+        db.and_(
+            ContainerRegistered.container_id == SessionContainer.container_id,
+            ContainerRegistered.weight.isnot(None)
+        )
+    ).filter(
+        ContainerRegistered.container_id.is_(None)
+    ).distinct()
+
+    db.session.execute(db.insert(ContainerUnknown).from_select(["container_id"], unknown))
+    db.session.commit()
+
+def backfill_session_containers(chunk_size=1000):
+    """Index containers of transactions written before session_containers existed."""
+    last_id = 0
+    indexed = 0
+
+    while True:
+        chunk = Transaction.query.filter(
+            Transaction.id > last_id,
+            Transaction.containers.isnot(None),
+            Transaction.containers != "",
+            ~exists().where(SessionContainer.transaction_id == Transaction.id)
+        ).order_by(Transaction.id).limit(chunk_size).all()
+
+        if not chunk:
+            break
+
+        for t in chunk:
+            indexed += index_containers(t)
+
+        db.session.commit()
+        last_id = chunk[-1].id
+
+    return indexed
+
+
+# --- Open sessions ---
+
+def open_session_from(t, out_transaction_id=None):
+    return OpenSession(
+        transaction_id=t.id,
+        session_id=t.session_id,
+        truck=t.truck,
+        bruto=t.bruto,
+        containers=t.containers,
+        produce=t.produce,
+        datetime=t.datetime,
+        weighed_out=out_transaction_id is not None,
+        out_transaction_id=out_transaction_id
+    )
+
+def close_weighing_session(out_transaction):
+    """Record the "out" on its sessions row, creating the row if an older deploy never wrote it."""
+    session = db.session.get(WeighingSession, out_transaction.session_id)
+    if session is None:
+        session = WeighingSession(
+            id=out_transaction.session_id,
+            direction="in",
+            truck=out_transaction.truck,
+            bruto=out_transaction.bruto,
+            produce=out_transaction.produce
+        )
+        db.session.add(session)
+
+    session.truckTara = out_transaction.truckTara
+    session.neto = out_transaction.neto
+    session.out_datetime = out_transaction.datetime
+
+def seen_truck(truck_id, seen_at):
+    """Return the truck's trucks row with last_seen moved up to seen_at, creating it on the truck's first weighing.
+
+    Replayed and store-and-forward readings can arrive out of order, so an
+    older reading leaves last_seen alone.
+    """
+    truck = db.session.get(Truck, truck_id)
+    if truck is None:
+        truck = Truck(id=truck_id, session_count=0)
+        db.session.add(truck)
+
+    if truck.last_seen is None or seen_at >= truck.last_seen:
+        truck.last_seen = seen_at
+    return truck
+
+def record_truck_out(out_transaction, replaced):
+    """Store the tara from a weigh-out and count the session, unless a forced weigh-out replaced one.
+
+    last_tara is the newest weigh-out's by datetime, like backfill_trucks;
+    a weigh-out older than the truck's last reading only sets it if no
+    newer "out" exists.
+    """
+    truck = seen_truck(out_transaction.truck, out_transaction.datetime)
+    if truck.last_seen == out_transaction.datetime or not db.session.query(exists().where(
+        Transaction.truck == out_transaction.truck,
+        Transaction.direction == "out",
+        Transaction.datetime > out_transaction.datetime
+    )).scalar():
+        truck.last_tara = out_transaction.truckTara
+    if not replaced:
+        truck.session_count += 1
+
+def load_open_sessions(registry=None):
+    """Rebuild open_sessions (or `registry`) from the DB in one query: each truck's latest "in" and its "out", if any.
+
+    Only the latest "in" per truck (its max id, from the (truck, direction)
+    index) is loaded, so the cost follows the number of trucks, not the
+    table's history.
+    """
+    latest_in = db.session.query(
+        Transaction.truck, db.func.max(Transaction.id).label("id")
+    ).filter(
+        Transaction.direction == "in",
+        Transaction.truck != "na"
+    ).group_by(Transaction.truck).subquery()
+    out = db.aliased(Transaction)
+
+    rows = db.session.query(Transaction, out.id).join(
+        latest_in, Transaction.id == latest_in.c.id
+    ).outerjoin(
+        out,
+        db.and_(out.session_id == Transaction.session_id, out.direction == "out")
+    )
+
+    sessions = [open_session_from(t, out_transaction_id=out_id) for t, out_id in rows]
+    (registry if registry is not None else open_sessions).replace_all(sessions)
+    return len(sessions)
+
+
+def weight_record(t):
+    """Format a transaction the way GET /weight returns it."""
+    return {
+        "id": t.session_id,
+        "direction": t.direction,
+        "truck": t.truck,
+        "bruto": t.bruto,
+        "neto": t.neto if t.neto is not None else "na",
+        "produce": t.produce,
+        "containers": parse_containers(t.containers)
+    }
+
+WEIGHT_EXPORT_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+WEIGHT_CSV_COLUMNS = ["id", "direction", "truck", "bruto", "neto", "produce", "containers"]
+
+def weight_export_format():
+    """Return 'ndjson' or 'csv' when the client asked for a streamed export, else None."""
+    requested = request.args.get("format")
+    if requested in WEIGHT_EXPORT_TYPES:
+        return requested
+
+    best = request.accept_mimetypes.best_match(["application/json", *WEIGHT_EXPORT_TYPES.values()])
+    for export_format, mimetype in WEIGHT_EXPORT_TYPES.items():
+        if best == mimetype:
+            return export_format
+    return None
+
+def stream_weights(query, export_format, batch_size=1000, extra=()):
+    """Stream query rows, then `extra`, as NDJSON or CSV through a server-side cursor, batch_size rows at a time."""
+    rows = chain(query.yield_per(batch_size), extra)
+
+    def generate_ndjson():
+        for t in rows:
+            yield json.dumps(weight_record(t)) + "\n"
+
+    def generate_csv():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(WEIGHT_CSV_COLUMNS)
+        for t in rows:
+            record = weight_record(t)
+            record["containers"] = ",".join(record["containers"])
+            writer.writerow([record[column] for column in WEIGHT_CSV_COLUMNS])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    generate = generate_ndjson if export_format == "ndjson" else generate_csv
+    return Response(stream_with_context(generate()), mimetype=WEIGHT_EXPORT_TYPES[export_format])
+
+
+def keyset_page(query, columns, after, limit):
+    """Fetch the rows sorting after the `after` key. Returns (rows, last key or None).
+
+    The (c1, c2, ...) > (v1, v2, ...) comparison is spelled out as ORs so
+    MySQL can range-scan an index on the columns instead of using OFFSET.
+    """
+    if after is not None:
+        if len(after) != len(columns) or not all(
+            isinstance(v, c.type.python_type) for c, v in zip(columns, after)
+        ):
+            raise ValueError("invalid cursor")
+        query = query.filter(db.or_(*[
+            db.and_(*[c == v for c, v in zip(columns[:i], after[:i])], columns[i] > after[i])
+            for i in range(len(columns))
+        ]))
+
+    rows = query.order_by(*columns).limit(limit + 1).all()
+
+    if len(rows) > limit:
+        return rows[:limit], rows[limit - 1]
+    return rows, None
+
+
+# --- Item lookups ---
+
+# Most ids POST /items resolves in one request
+MAX_ITEM_IDS = 1000
+
+def item_window(from_str, to_str):
+    """Resolve an item's from/to (default: this month so far). Returns (from, to), or None if either is invalid."""
+    now = datetime.now()
+    dt_from = parse_datetime_param(from_str) if from_str else now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    dt_to = parse_datetime_param(to_str) if to_str else now
+
+    if dt_from is None or dt_to is None:
+        return None
+    return dt_from, dt_to
+
+def resolve_items(item_ids, dt_from, dt_to, chunk_size=1000):
+    """Resolve many items at once: {id: {"id", "type", "tara", "sessions"}} for the ids that exist.
+
+    Like get_item, a registered container wins over a truck of the same
+    name. Four queries per chunk of ids, whatever the chunk size.
+    """
+    items = {}
+
+    for start in range(0, len(item_ids), chunk_size):
+        chunk = item_ids[start:start + chunk_size]
+
+        for container in ContainerRegistered.query.filter(ContainerRegistered.container_id.in_(chunk)):
+            tara = container_tara_kg(container)
+            items[container.container_id] = {
+                "id": container.container_id,
+                "type": "container",
+                "tara": tara if tara is not None else "na",
+                "sessions": []
+            }
+
+        truck_ids = [i for i in chunk if i not in items]
+        if truck_ids:
+            for truck in Truck.query.filter(Truck.id.in_(truck_ids)):
+                items[truck.id] = {
+                    "id": truck.id,
+                    "type": "truck",
+                    "tara": truck.last_tara if truck.last_tara is not None else "na",
+                    "sessions": []
+                }
+
+        container_ids = [i for i in chunk if items.get(i, {}).get("type") == "container"]
+        if container_ids:
+            container_sessions = db.session.query(SessionContainer.container_id, SessionContainer.session_id).filter(
+                SessionContainer.container_id.in_(container_ids),
+                SessionContainer.datetime >= dt_from,
+                SessionContainer.datetime <= dt_to,
+                SessionContainer.session_id.isnot(None)
+            ).distinct().order_by(SessionContainer.container_id, SessionContainer.session_id)
+
+            for container_id, session_id in container_sessions:
+                items[container_id]["sessions"].append(session_id)
+
+        truck_ids = [i for i in chunk if items.get(i, {}).get("type") == "truck"]
+        if truck_ids:
+            truck_sessions = db.session.query(Transaction.truck, Transaction.session_id).filter(
+                Transaction.truck.in_(truck_ids),
+                Transaction.datetime >= dt_from,
+                Transaction.datetime <= dt_to,
+                Transaction.session_id.isnot(None)
+            ).distinct().order_by(Transaction.truck, Transaction.session_id)
+
+            for truck_id, session_id in truck_sessions:
+                items[truck_id]["sessions"].append(session_id)
+
+    return items
+
+
+# --- Session lookups ---
+
+# Most ids GET /sessions resolves in one request
+MAX_SESSION_IDS = 5000
+
+def session_record(session):
+    """Format a sessions row the way GET /session returns it."""
+    result = {
+        "id": str(session.id),
+        "truck": session.truck,
+        "bruto": session.bruto
+    }
+
+    # Only a session that has weighed out has a tara and neto
+    if session.truckTara is not None:
+        result["truckTara"] = session.truckTara
+        result["neto"] = session.neto if session.neto is not None else "na"
+
+    return result
+
+def get_session_records(session_ids, chunk_size=1000):
+    """Return {session_id: record} for the ids that exist, querying only ids missing from session_cache."""
+    records, missing = session_cache.get_many(session_ids)
+
+    for start in range(0, len(missing), chunk_size):
+        sessions = WeighingSession.query.filter(
+            WeighingSession.id.in_(missing[start:start + chunk_size])
+        ).all()
+
+        for session in sessions:
+            records[session.id] = session_record(session)
+
+        # Closed sessions only change on a forced re-weigh, which invalidates them
+        session_cache.put_many({s.id: records[s.id] for s in sessions if s.truckTara is not None})
+
+    # Journaled readings are newer than anything in the DB or the cache
+    writer = write_behind
+    if writer:
+        for session_id, record in writer.pending.sessions(session_ids).items():
+            if record is None:
+                records.pop(session_id, None)
+            else:
+                records[session_id] = record
+
+    return records
+
+
+# --- Weight summaries ---
+
+# Most trucks POST /weight/summary adds up in one request
+MAX_SUMMARY_TRUCKS = 1000
+
+def summarize_weights(trucks, dt_from, dt_to):
+    """Add up the trucks' weighed-out sessions with a known neto in a time window, per produce.
+
+    Two GROUP BY queries over the (truck, datetime) index, so only a few
+    rows leave the DB however many sessions the window holds.
+    """
+    billable = db.and_(
+        Transaction.truck.in_(trucks),
+        Transaction.datetime >= dt_from,
+        Transaction.datetime <= dt_to,
+        Transaction.direction == "out",
+        Transaction.neto.isnot(None)
+    )
+
+    products = db.session.query(
+        Transaction.produce,
+        db.func.sum(Transaction.neto),
+        db.func.count(db.distinct(Transaction.session_id))
+    ).filter(billable).group_by(Transaction.produce).order_by(Transaction.produce).all()
+
+    trucks_seen = [truck for truck, in db.session.query(Transaction.truck).filter(billable).group_by(Transaction.truck)]
+
+    return {
+        "trucks": sorted(trucks_seen),
+        "truckCount": len(trucks_seen),
+        # A session has one produce, so the per-produce counts add up
+        "sessionCount": sum(sessions for _, _, sessions in products),
+        "products": [
+            {"produce": produce, "neto": int(neto), "sessions": sessions}
+            for produce, neto, sessions in products
+        ]
+    }
+
+
+# --- Change feed ---
+
+# Most changes GET /weight/changes returns at once, and the longest it waits for one (seconds)
+MAX_CHANGES = 1000
+MAX_CHANGES_WAIT = 30
+
+def transaction_change(kind, t):
+    """A change-feed row (for commit_changes) for a transaction inserted ("insert") or deleted by a forced re-weigh ("delete")."""
+    return {"kind": kind, "datetime": datetime.now().replace(microsecond=0), "payload": json.dumps({
+        "transactionId": t.id,
+        "datetime": t.datetime.strftime("%Y%m%d%H%M%S") if t.datetime else None,
+        **weight_record(t),
+        "truckTara": t.truckTara
+    })}
+
+def tara_change(row):
+    """A change-feed row (for commit_changes) for a container weight registered by POST /batch-weight."""
+    return {"kind": "tara", "datetime": datetime.now().replace(microsecond=0), "payload": json.dumps(row)}
+
+def commit_changes(changes):
+    """Commit the session together with its change-feed rows and wake GET /weight/changes long-polls.
+
+    The rows go in as one executemany, so a /batch-weight chunk costs one
+    INSERT however many containers it changed.
+    """
+    if not changes:
+        db.session.commit()
+        return
+
+    with change_lock:
+        db.session.execute(db.insert(Change), changes)
+        db.session.commit()
+    with changes_committed:
+        changes_committed.notify_all()
+
+def change_record(change):
+    """Format a change-feed row the way GET /weight/changes returns it."""
+    return {
+        "seq": change.id,
+        "type": change.kind,
+        "datetime": change.datetime.strftime("%Y%m%d%H%M%S"),
+        "data": json.loads(change.payload)
+    }
+
+def changes_since(since, limit, wait):
+    """Changes after `since` in commit order, waiting up to `wait` seconds while there are none."""
+    deadline = time.monotonic() + wait
+    while True:
+        changes = Change.query.filter(Change.id > since).order_by(Change.id).limit(limit).all()
+        remaining = deadline - time.monotonic()
+        if changes or remaining <= 0:
+            return changes
+
+        # End the read transaction so the next query sees new commits; other
+        # processes don't notify this one, so look again at least every second
+        db.session.rollback()
+        with changes_committed:
+            changes_committed.wait(min(remaining, 1.0))
+
+
+# --- Weighings ---
+
+# Readings POST /weight/replay accepts per request, and commits at a time
+MAX_REPLAY_READINGS = 5000
+REPLAY_COMMIT_SIZE = 100
+
+class WeighingBatch:
+    """Weighings applied in one DB transaction, not yet visible to other requests.
+
+    The registry (open_sessions unless given) and session_cache only
+    change after the commit (publish()), so a batch sees its own
+    uncommitted sessions through open_session() while everyone else keeps
+    seeing the committed ones.
+    """
+
+    def __init__(self, registry=None):
+        self.registry = registry if registry is not None else open_sessions
+        self.sessions = {}
+        self.replaced_session_ids = set()
+        # Change-feed rows for the caller to commit with commit_changes()
+        self.changes = []
+
+    def open_session(self, truck):
+        if truck in self.sessions:
+            return self.sessions[truck]
+        return self.registry.get(truck)
+
+    def publish(self):
+        session_cache.invalidate(list(self.replaced_session_ids))
+        for session in self.sessions.values():
+            self.registry.put(session)
+
+def validate_weighing(data, open_session_for):
+    """Check one POST /weight reading against the in/out rules without writing anything.
+
+    Returns (reading, None), where reading holds the parsed fields and the
+    truck's current session from open_session_for(truck), or
+    (None, (error body, status)).
+    """
     direction = data.get("direction")
     weight = data.get("weight")
 
     if not direction or not weight:
-        return jsonify({"error": "missing required fields: direction and weight"}), 400
+        return None, ({"error": "missing required fields: direction and weight"}, 400)
 
-    weight = int(weight)
+    try:
+        weight = int(weight)
+    except (TypeError, ValueError):
+        return None, ({"error": "invalid weight"}, 400)
     truck = data.get("truck", "na")
     containers = parse_containers(data.get("containers", ""))
     unit = data.get("unit", "kg")
@@ -166,105 +967,580 @@ def post_weight():
 
     if unit == "lbs":
         weight = lbs_to_kg(weight)
-    
-    # --- IN or NONE: create a new session ---
+
+    session = None
+
+    # --- IN or NONE: a new session, unless the truck already has one ---
     if direction in ("in", "none"):
-        # Check for existing open session for this truck
         if truck != "na":
-            existing = Transaction.query.filter_by(
-                truck=truck, direction="in", truckTara=None
-            ).first()
+            session = open_session_for(truck)
 
-            if existing:
+            if session:
                 if direction == "none":
                     # "none" after "in" is always an error
-                    return jsonify({"error": "truck has an open 'in' session, cannot use direction 'none'"}), 400
+                    return None, ({"error": "truck has an open 'in' session, cannot use direction 'none'"}, 400)
                 elif not force:
                     # "in" after "in" without force is an error
-                    return jsonify({"error": "truck already weighed in, use force=true to overwrite"}), 400
-                else:
-                    # "in" after "in" with force — delete the old session
-                    db.session.delete(existing)
-                    db.session.commit()
+                    return None, ({"error": "truck already weighed in, use force=true to overwrite"}, 400)
+
+    # --- OUT: closes the truck's session ---
+    elif direction == "out":
+        session = open_session_for(truck)
+
+        if not session:
+            return None, ({"error": "no open 'in' session for this truck"}, 400)
+        if session.weighed_out and not force:
+            return None, ({"error": "truck already weighed out, use force=true to overwrite"}, 400)
+
+    else:
+        return None, ({"error": "invalid direction"}, 400)
+
+    return {
+        "direction": direction,
+        "truck": truck,
+        "weight": weight,
+        "containers": containers,
+        "produce": produce,
+        "session": session
+    }, None
+
+def apply_weighing(data, when, batch, transaction_id=None):
+    """Apply one POST /weight reading at `when` inside the caller's DB transaction.
+
+    Returns (response body, status). Nothing is written unless the status
+    is 200; the caller commits with commit_changes(batch.changes) and then
+    calls batch.publish().
+    transaction_id fixes the new row's id instead of leaving it to the DB.
+    """
+    reading, error = validate_weighing(data, batch.open_session)
+    if error:
+        return error
+
+    direction = reading["direction"]
+    truck = reading["truck"]
+    weight = reading["weight"]
+    produce = reading["produce"]
+
+    # --- IN or NONE: create a new session ---
+    if direction in ("in", "none"):
+        existing = reading["session"]
+        if existing and not existing.weighed_out:
+            # "in" after "in" with force — delete the old session
+            # (committed together with the new one below). A session that
+            # was weighed out is kept; the truck just starts a new one
+            existing_in = db.session.get(Transaction, existing.transaction_id)
+            replaced_session = db.session.get(WeighingSession, existing.session_id)
+            if existing_in:
+                unindex_containers(existing_in)
+                db.session.delete(existing_in)
+                batch.changes.append(transaction_change("delete", existing_in))
+            if replaced_session:
+                db.session.delete(replaced_session)
+            batch.replaced_session_ids.add(existing.session_id)
 
         new_transaction = Transaction(
+            id=transaction_id,
             direction=direction,
             truck=truck,
-            containers=",".join(containers),
+            containers=",".join(reading["containers"]),
             bruto=weight,
             produce=produce,
-            datetime=datetime.now().replace(microsecond=0)
+            datetime=when
         )
 
+        # Flush to allocate the id, then commit the delete, insert and
+        # session id together in one transaction
         db.session.add(new_transaction)
-        db.session.commit()
+        db.session.flush()
 
         new_transaction.session_id = new_transaction.id
-        db.session.commit()
+        batch.changes.append(transaction_change("insert", new_transaction))
+        db.session.add(WeighingSession(
+            id=new_transaction.session_id,
+            direction=direction,
+            truck=truck,
+            bruto=weight,
+            produce=produce,
+            in_datetime=new_transaction.datetime
+        ))
+        index_containers(new_transaction)
+        track_unknown_containers(unique_container_ids(new_transaction.containers))
+        if truck != "na":
+            seen_truck(truck, new_transaction.datetime)
+
+        if direction == "in" and truck != "na":
+            batch.sessions[truck] = open_session_from(new_transaction)
 
-        return jsonify({
+        return {
             "id": str(new_transaction.session_id),
             "truck": truck,
             "bruto": weight
-        }), 200
+        }, 200
     
     # --- OUT: close an existing session ---
-    elif direction == "out":
-        # 1. Find the open "in" session for this truck
-        open_session = Transaction.query.filter_by(
-            truck=truck, direction="in", truckTara=None
-            ).first()
-        
-        if not open_session:
-            return jsonify({"error": "no open 'in' session for this truck"}), 400
-        
-        # 2. Check for existing "out" in this session
+    # 1. The truck's open "in" session
+    open_session = reading["session"]
+
+    # 2. A forced weigh-out replaces the session's existing "out"
+    if open_session.weighed_out:
+        # Committed together with the new "out" below
         existing_out = Transaction.query.filter_by(
             session_id=open_session.session_id, direction="out"
         ).first()
-
         if existing_out:
-            if not force:
-                return jsonify({"error": "truck already weighed out, use force=true to overwrite"}), 400
-            else:
-                db.session.delete(existing_out)
-                db.session.commit()
-        
-        # 3. truckTara is the weight from the scale right now
-        truck_tara = weight
-
-        # 4. Look up each container's tara weight & calculate neto
-        container_ids = open_session.containers.split(",") if open_session.containers else []
-        neto = calculate_neto(open_session.bruto, truck_tara, container_ids)
-        
-        # 5. Create the "out" transaction
-        out_transaction = Transaction(
-            direction="out",
-            truck=truck,
-            containers=open_session.containers,
-            bruto=open_session.bruto,
-            truckTara=truck_tara,
-            neto=neto if neto != "na" else None,
-            produce=open_session.produce,
-            datetime=datetime.now().replace(microsecond=0),
-            session_id=open_session.session_id
-        )
-
-        db.session.add(out_transaction)
-        db.session.commit()
+            unindex_containers(existing_out)
+            db.session.delete(existing_out)
+            batch.changes.append(transaction_change("delete", existing_out))
+        batch.replaced_session_ids.add(open_session.session_id)
+    
+    # 3. truckTara is the weight from the scale right now
+    truck_tara = weight
 
-        return jsonify({
-            "id": str(open_session.session_id),
-            "truck": truck,
-            "bruto": open_session.bruto,
-            "truckTara": truck_tara,
-            "neto": neto
-        }), 200
+    # 4. Look up each container's tara weight & calculate neto
+    container_ids = open_session.containers.split(",") if open_session.containers else []
+    neto = calculate_neto(open_session.bruto, truck_tara, container_ids)
     
+    # 5. Create the "out" transaction
+    out_transaction = Transaction(
+        id=transaction_id,
+        direction="out",
+        truck=truck,
+        containers=open_session.containers,
+        bruto=open_session.bruto,
+        truckTara=truck_tara,
+        neto=neto if neto != "na" else None,
+        produce=open_session.produce,
+        datetime=when,
+        session_id=open_session.session_id
+    )
+
+    db.session.add(out_transaction)
+    db.session.flush()
+    batch.changes.append(transaction_change("insert", out_transaction))
+    index_containers(out_transaction)
+    close_weighing_session(out_transaction)
+    record_truck_out(out_transaction, replaced=open_session.weighed_out)
+    batch.sessions[truck] = open_session.weighed_out_copy(out_transaction.id)
+
+    return {
+        "id": str(open_session.session_id),
+        "truck": truck,
+        "bruto": open_session.bruto,
+        "truckTara": truck_tara,
+        "neto": neto
+    }, 200
+
+
+# --- Write-behind and store-and-forward ---
+
+# journal_checkpoint rows, one per journal
+WRITE_BEHIND_CHECKPOINT = 1
+BUFFER_CHECKPOINT = 2
+
+def accept_reading(writer, data, when):
+    """Check a reading against the acknowledged state, journal it and answer without waiting for the DB.
+
+    The response is the one post_weight would give. The journal writer
+    applies the reading later (apply_journal_entries); until then reads
+    see it through writer.pending. Returns None if the writer no longer
+    accepts readings (store-and-forward has ended).
+    """
+    pending = writer.pending
+
+    with writer.lock:
+        if not writer.accepting:
+            return None
+
+        reading, error = validate_weighing(data, open_sessions.get)
+        if error:
+            return error
+
+        direction = reading["direction"]
+        truck = reading["truck"]
+        session = reading["session"]
+        transaction_id = writer.allocate_id()
+        if transaction_id is None:
+            return {"error": "no reserved transaction ids left for buffering, try again once the DB is back"}, 503
+
+        if direction == "out":
+            container_ids = session.containers.split(",") if session.containers else []
+            # With the DB down only cached taras are known; the sync works out the real neto
+            neto = calculate_neto(session.bruto, reading["weight"], container_ids,
+                                  cached_only=ingest_mode == "store-and-forward")
+
+        seq = writer.journal.append({
+            "datetime": when.strftime("%Y%m%d%H%M%S"),
+            "transaction_id": transaction_id,
+            "reading": data
+        })["seq"]
+
+        if direction in ("in", "none"):
+            t = Transaction(
+                id=transaction_id, session_id=transaction_id, direction=direction, truck=truck,
+                containers=",".join(reading["containers"]), bruto=reading["weight"],
+                produce=reading["produce"], datetime=when
+            )
+            if session and not session.weighed_out:
+                # Forced weigh-in over an open session: the old session goes away
+                pending.delete_transaction(seq, session.transaction_id)
+                pending.put_session(seq, session.session_id, None)
+                session_cache.invalidate([session.session_id])
+            if direction == "in" and truck != "na":
+                open_sessions.put(open_session_from(t))
+
+            body = {"id": str(t.session_id), "truck": truck, "bruto": t.bruto}
+        else:
+            t = Transaction(
+                id=transaction_id, session_id=session.session_id, direction="out", truck=truck,
+                containers=session.containers, bruto=session.bruto, truckTara=reading["weight"],
+                neto=neto if neto != "na" else None, produce=session.produce, datetime=when
+            )
+            if session.weighed_out:
+                # Forced weigh-out: replaces the session's "out"
+                if session.out_transaction_id is not None:
+                    pending.delete_transaction(seq, session.out_transaction_id)
+                session_cache.invalidate([session.session_id])
+            open_sessions.put(session.weighed_out_copy(transaction_id))
+
+            body = {"id": str(session.session_id), "truck": truck, "bruto": session.bruto,
+                    "truckTara": t.truckTara, "neto": neto}
+
+        pending.add_transaction(seq, t)
+        pending.put_session(seq, t.session_id, {
+            key: body[key] for key in ("id", "truck", "bruto", "truckTara", "neto") if key in body
+        })
+
+    writer.notify()
+    return body, 200
+
+def pending_weights(query, matches):
+    """Return (query without the rows journaled deletes remove, journaled transactions that match, by (datetime, id))."""
+    writer = write_behind
+    if not writer:
+        return query, []
+
+    deleted = writer.pending.deleted_ids()
+    if deleted:
+        query = query.filter(Transaction.id.notin_(deleted))
+
+    pending = [t for t in writer.pending.transactions() if matches(t)]
+    return query, sorted(pending, key=lambda t: (t.datetime, t.id))
+
+def apply_journal_entries(entries, checkpoint_id=WRITE_BEHIND_CHECKPOINT):
+    """Write journaled readings to the DB in order, in one transaction, and move the checkpoint with them."""
+    with app.app_context():
+        batch = WeighingBatch(writer_sessions)
+        try:
+            for entry in entries:
+                when = parse_datetime_param(entry["datetime"])
+                # The id was handed out before the DB saw it; it is never
+                # renumbered, so a clash fails the batch and it is retried
+                body, status = apply_weighing(entry["reading"], when, batch, transaction_id=entry["transaction_id"])
+                if status != 200:
+                    # It passed the same checks when it was accepted, so the journal and the DB disagree
+                    app.logger.error("journal entry %s not applied: %s", entry["seq"], body["error"])
+
+            checkpoint = db.session.get(JournalCheckpoint, checkpoint_id) or JournalCheckpoint(id=checkpoint_id)
+            checkpoint.seq = entries[-1]["seq"]
+            db.session.add(checkpoint)
+            commit_changes(batch.changes)
+        except Exception:
+            db.session.rollback()
+            raise
+
+        batch.publish()
+
+def recover_journal(path, checkpoint_id):
+    """Open the journal at path and apply whatever a crash left in it. Returns the (now empty) Journal."""
+    checkpoint = db.session.get(JournalCheckpoint, checkpoint_id)
+    journal = Journal(path, applied_seq=checkpoint.seq if checkpoint else 0)
+    # End this read transaction so the queries below see what the recovery writes
+    db.session.rollback()
+
+    load_open_sessions(writer_sessions)
+    recovery = WriteBehind(journal, lambda entries: apply_journal_entries(entries, checkpoint_id),
+                           next_id=0, batch_size=config.WRITE_BEHIND_BATCH)
+    if recovery.flush():
+        load_open_sessions()
+    return journal
+
+def start_write_behind(path, start_writer=True):
+    """Switch POST /weight to write-behind mode, first applying whatever a crash left in the journal."""
+    global write_behind, ingest_mode
+
+    journal = recover_journal(path, WRITE_BEHIND_CHECKPOINT)
+
+    # Ids continue from the DB, which now has every journaled reading
+    max_id = db.session.query(db.func.max(Transaction.id)).scalar() or 0
+    write_behind = WriteBehind(journal, apply_journal_entries, next_id=max_id + 1, batch_size=config.WRITE_BEHIND_BATCH)
+    ingest_mode = "write-behind"
+
+    if start_writer:
+        write_behind.start()
+    return write_behind
+
+def stop_write_behind():
+    """Apply what is left in the journal and go back to writing each reading directly."""
+    global write_behind, ingest_mode
+
+    if write_behind:
+        write_behind.stop()
+        write_behind.flush()
+        write_behind.journal.close()
+        write_behind, ingest_mode = None, "direct"
+
+def reserve_buffer_ids():
+    """Top reserved_ids up to BUFFER_RESERVED_IDS while the DB is reachable.
+
+    The ids come from the transactions auto-increment: placeholder rows are
+    inserted and deleted in one transaction, and the DB never hands those
+    ids out again, to this process or any other.
+    """
+    missing = config.BUFFER_RESERVED_IDS - len(reserved_ids)
+    if missing <= 0:
+        return
+
+    placeholders = [Transaction(direction="reserved") for _ in range(missing)]
+    db.session.add_all(placeholders)
+    db.session.flush()
+    ids = [t.id for t in placeholders]
+    for t in placeholders:
+        db.session.expunge(t)
+    Transaction.query.filter(Transaction.id.in_(ids)).delete(synchronize_session=False)
+    db.session.commit()
+    reserved_ids.extend(ids)
+
+def take_reserved_ids():
+    """Hand out reserved_ids one at a time until they run out."""
+    while True:
+        try:
+            yield reserved_ids.popleft()
+        except IndexError:
+            return
+
+# MySQL client errors for a server that can't be reached: can't connect,
+# server has gone away, lost connection. Lock wait timeouts and deadlocks
+# come from a healthy server and don't start store-and-forward
+DB_UNREACHABLE_ERRORS = {2002, 2003, 2006, 2013}
+
+def db_unreachable(error):
+    """True if an OperationalError means the DB itself is unavailable."""
+    if error.connection_invalidated:
+        return True
+    args = getattr(error.orig, "args", ())
+    return bool(args) and args[0] in DB_UNREACHABLE_ERRORS
+
+def start_store_and_forward():
+    """Buffer readings in the local journal at BUFFER_PATH while the DB is down. Returns the buffer's writer.
+
+    The writer keeps retrying the DB; once it has synced the whole buffer,
+    end_store_and_forward() switches POST /weight back to direct writes.
+    Buffered readings get ids from reserved_ids; when those run out,
+    POST /weight answers 503 until the DB is back.
+    """
+    global write_behind, ingest_mode
+
+    with mode_lock:
+        if write_behind is None:
+            # The DB can't be asked, so the writer starts from what this process knows
+            writer_sessions.replace_all(open_sessions.sessions())
+            write_behind = WriteBehind(
+                Journal(config.BUFFER_PATH),
+                lambda entries: apply_journal_entries(entries, BUFFER_CHECKPOINT),
+                next_id=None,
+                ids=take_reserved_ids(),
+                batch_size=config.WRITE_BEHIND_BATCH,
+                retry_delay=5.0,
+                on_drained=end_store_and_forward
+            )
+            ingest_mode = "store-and-forward"
+            write_behind.start()
+            app.logger.warning("weight DB unavailable, buffering readings in %s", config.BUFFER_PATH)
+        return write_behind
+
+def end_store_and_forward(buffer):
+    """Go back to direct writes once the buffer is synced. Returns False if readings arrived meanwhile."""
+    global write_behind, ingest_mode
+
+    with app.app_context(), buffer.lock:
+        if len(buffer.journal):
+            return False
+
+        # The sync worked out the netos the buffer couldn't; take the DB's view
+        load_open_sessions()
+        buffer.accepting = False
+        with mode_lock:
+            write_behind, ingest_mode = None, "direct"
+
+    buffer.journal.close()
+    app.logger.warning("weight DB is back, buffered readings synced")
+    try:
+        with app.app_context():
+            reserve_buffer_ids()
+    except Exception:
+        app.logger.exception("could not reserve transaction ids for store-and-forward")
+    return True
+
+
+# --- Routes ---
+
+@app.get("/health")
+def health():
+    writer = write_behind
+    mode = {"mode": ingest_mode, "backlog": len(writer.journal) if writer else 0}
+
+    try:
+        db.session.execute(text("SELECT 1"))
+        return jsonify({"status": "OK", **mode}), 200
+    except Exception as e:
+        db.session.rollback()
+        if ingest_mode == "store-and-forward":
+            # Readings are still being taken; they sync once the DB is back
+            return jsonify({"status": "Degraded", "error": str(e), **mode}), 200
+        return jsonify({"status": "Failure", "error": str(e), **mode}), 500
+
+
+@app.get("/stats")
+def stats():
+    return jsonify({
+        "tara_cache": tara_cache.stats(),
+        "session_cache": session_cache.stats(),
+        "idempotency_keys": idempotency_keys.stats(),
+        "open_sessions": len(open_sessions)
+    }), 200
+
+
+@app.get("/open-sessions")
+def get_open_sessions():
+    """Trucks currently in the yard: weighed in, not yet out."""
+    return jsonify([s.to_dict() for s in open_sessions.in_yard()]), 200
+
+
+def weigh(data):
+    """Apply and commit (or, in write-behind mode, journal) one POST /weight reading. Returns (body, status).
+
+    If the DB is unreachable the reading goes into the store-and-forward
+    buffer instead, unless STORE_AND_FORWARD is off. Other DB errors (lock
+    wait timeouts, deadlocks) are a 503 the scale can retry.
+    """
+    now = datetime.now().replace(microsecond=0)
+
+    while True:
+        writer = write_behind
+        if writer:
+            accepted = accept_reading(writer, data, now)
+            if accepted:
+                return accepted
+            # Store-and-forward ended while this request waited: the DB is back
+            continue
+
+        batch = WeighingBatch()
+        try:
+            body, status = apply_weighing(data, now, batch)
+            if status == 200:
+                commit_changes(batch.changes)
+        except OperationalError as e:
+            db.session.rollback()
+            if not db_unreachable(e):
+                app.logger.warning("weighing not saved: %s", e.orig)
+                return {"error": "database busy, try again"}, 503
+            if not config.STORE_AND_FORWARD:
+                raise
+            start_store_and_forward()
+            continue
+
+        if status == 200:
+            batch.publish()
+        return body, status
+
+@app.post("/weight")
+def post_weight():
+    data = request.get_json(silent=True) or request.form.to_dict()
+
+    key = request.headers.get("Idempotency-Key")
+    if not key:
+        body, status = weigh(data)
+        return jsonify(body), status
+
+    # A retry with the same key gets the first response back without touching the DB
+    try:
+        stored = idempotency_keys.claim(key, json.dumps(data, sort_keys=True))
+    except IdempotencyKeyReused:
+        return jsonify({"error": "Idempotency-Key was already used for a different request"}), 422
+    except IdempotencyKeyBusy:
+        return jsonify({"error": "a request with this Idempotency-Key is still in progress"}), 409
+
+    if stored is not None:
+        body, status = stored
+        return jsonify(body), status, {"Idempotent-Replayed": "true"}
+
+    try:
+        body, status = weigh(data)
+    except Exception:
+        idempotency_keys.release(key)
+        raise
+
+    if status >= 500:
+        # Nothing was saved, so a retry with the same key gets another go
+        idempotency_keys.release(key)
     else:
-        return jsonify({"error": "invalid direction"}), 400
+        idempotency_keys.complete(key, (body, status))
+    return jsonify(body), status
+
+@app.post("/weight/replay")
+def post_weight_replay():
+    """Apply an ordered list of readings recorded while the scale was offline.
+
+    Each reading is a POST /weight body plus its original "datetime"
+    (yyyymmddhhmmss). Readings are applied in order and committed
+    REPLAY_COMMIT_SIZE at a time; the response has one result per reading.
+    """
+    data = request.get_json(silent=True)
+    readings = data.get("readings") if isinstance(data, dict) else data
+
+    if not isinstance(readings, list) or not readings:
+        return jsonify({"error": "missing required field: readings (a list of weighings)"}), 400
+    if len(readings) > MAX_REPLAY_READINGS:
+        return jsonify({"error": f"too many readings, at most {MAX_REPLAY_READINGS} per request"}), 400
+
+    results = []
+    for start in range(0, len(readings), REPLAY_COMMIT_SIZE):
+        chunk_results = []
+        batch = WeighingBatch()
+
+        try:
+            for reading in readings[start:start + REPLAY_COMMIT_SIZE]:
+                if not isinstance(reading, dict):
+                    chunk_results.append({"status": 400, "error": "reading must be an object"})
+                    continue
+
+                when = parse_datetime_param(str(reading["datetime"])) if reading.get("datetime") else datetime.now().replace(microsecond=0)
+                if when is None:
+                    chunk_results.append({"status": 400, "error": "invalid datetime format, expected yyyymmddhhmmss"})
+                    continue
+
+                writer = write_behind
+                accepted = accept_reading(writer, reading, when) if writer else None
+                body, status = accepted or apply_weighing(reading, when, batch)
+                chunk_results.append({"status": status, **body})
+
+            commit_changes(batch.changes)
+        except Exception as e:
+            # Nothing from this chunk was saved; later readings depend on it, so stop here
+            db.session.rollback()
+            not_saved = {"status": 500, "error": f"not saved, the replay stopped at reading {start}: {e}"}
+            results.extend(not_saved for _ in range(len(readings) - start))
+            return jsonify({"results": results}), 500
+
+        batch.publish()
+        results.extend(chunk_results)
+
+    return jsonify({"results": results}), 200
     
 
+# Most truck= or produce= values GET /weight filters by in one request
+MAX_WEIGHT_FILTER_VALUES = 1000
+
 @app.get("/weight")
 def get_weight():
     # Defaults: from = today midnight, to = right now
@@ -283,32 +1559,116 @@ def get_weight():
     if dt_from is None or dt_to is None:
         return jsonify({"error": "invalid datetime format, expected yyyymmddhhmmss"}), 400
 
+    try:
+        page = parse_page_params(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
     # Split filter string into a list
     directions = [d.strip() for d in filter_str.split(",")]
 
+    # Optional truck and produce filters, each any number of values
+    trucks = parse_list_param(request.args, "truck")
+    produces = parse_list_param(request.args, "produce")
+    if len(trucks) > MAX_WEIGHT_FILTER_VALUES or len(produces) > MAX_WEIGHT_FILTER_VALUES:
+        return jsonify({"error": f"too many truck or produce values, at most {MAX_WEIGHT_FILTER_VALUES} each"}), 400
+
     # Query transactions based on datetime range and direction filter
-    transactions = Transaction.query.filter(
+    query = Transaction.query.filter(
         Transaction.datetime >= dt_from,
         Transaction.datetime <= dt_to,
         Transaction.direction.in_(directions)
-    ).all()
+    )
+    # In SQL, so the (truck, datetime) and (produce, datetime) indexes can narrow the window
+    if trucks:
+        query = query.filter(Transaction.truck.in_(trucks))
+    if produces:
+        query = query.filter(Transaction.produce.in_(produces))
+
+    def matches(t):
+        return (dt_from <= t.datetime <= dt_to and t.direction in directions
+                and (not trucks or t.truck in trucks) and (not produces or t.produce in produces))
+
+    query, pending = pending_weights(query, matches)
+
+    export_format = weight_export_format()
+    if export_format:
+        return stream_weights(query, export_format, extra=pending)
+
+    if page:
+        limit, after = page
+        if after:
+            # The cursor carries the datetime as yyyymmddhhmmss
+            after = [parse_datetime_param(str(after[0])), *after[1:]]
+        try:
+            rows, last = keyset_page(query, [Transaction.datetime, Transaction.id], after, limit)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        if pending:
+            # Journaled rows go into the page in key order; any DB rows
+            # left out still sort after the new last row
+            pending = [t for t in pending if after is None or (t.datetime, t.id) > tuple(after)]
+            merged = sorted(rows + pending, key=lambda t: (t.datetime, t.id))
+            rows = merged[:limit]
+            last = rows[-1] if last is not None or len(merged) > limit else None
+
+        next_cursor = encode_cursor([last.datetime.strftime("%Y%m%d%H%M%S"), last.id]) if last else None
+        return jsonify({"results": [weight_record(t) for t in rows], "next": next_cursor}), 200
 
     # Format the response
-    result = []
-    for t in transactions:
-        containers = t.containers.split(",") if t.containers else []
-        result.append({
-            "id": t.session_id,
-            "direction": t.direction,
-            "truck": t.truck,
-            "bruto": t.bruto,
-            "neto": t.neto if t.neto is not None else "na",
-            "produce": t.produce,
-            "containers": containers
-        })
+    result = [weight_record(t) for t in chain(query.all(), pending)]
 
     return jsonify(result), 200
 
+@app.post("/weight/summary")
+def post_weight_summary():
+    """Per-produce neto totals and session counts for a list of trucks, e.g. one provider's, over a time window."""
+    data = request.get_json(silent=True) or {}
+    trucks = data.get("trucks")
+
+    if not isinstance(trucks, list) or not trucks or not all(isinstance(t, str) and t for t in trucks):
+        return jsonify({"error": "missing required field: trucks (a list of truck ids)"}), 400
+    trucks = list(dict.fromkeys(trucks))
+    if len(trucks) > MAX_SUMMARY_TRUCKS:
+        return jsonify({"error": f"too many trucks, at most {MAX_SUMMARY_TRUCKS} per request"}), 400
+
+    window = item_window(data.get("from"), data.get("to"))
+    if window is None:
+        return jsonify({"error": "invalid datetime format, expected yyyymmddhhmmss"}), 400
+
+    dt_from, dt_to = window
+    return jsonify({
+        "from": dt_from.strftime("%Y%m%d%H%M%S"),
+        "to": dt_to.strftime("%Y%m%d%H%M%S"),
+        **summarize_weights(trucks, dt_from, dt_to)
+    }), 200
+
+@app.get("/weight/changes")
+def get_weight_changes():
+    """Transactions inserted and deleted and container taras registered after `since`, in commit order.
+
+    With wait=<seconds> the request is held until there is at least one
+    change (or the wait is over). Pass the returned watermark as the next
+    `since`.
+    """
+    try:
+        since = int(request.args.get("since", 0))
+        limit = int(request.args.get("limit", MAX_CHANGES))
+        wait = float(request.args.get("wait", 0))
+    except ValueError:
+        return jsonify({"error": "since, limit and wait must be numbers"}), 400
+
+    if since < 0 or not 1 <= limit <= MAX_CHANGES or not math.isfinite(wait):
+        return jsonify({"error": f"since must be 0 or more, limit between 1 and {MAX_CHANGES} and wait a number of seconds"}), 400
+    wait = min(max(wait, 0), MAX_CHANGES_WAIT)
+
+    changes = changes_since(since, limit, wait)
+    return jsonify({
+        "changes": [change_record(c) for c in changes],
+        "watermark": changes[-1].id if changes else since
+    }), 200
+
 @app.post("/batch-weight")
 def post_batch_weight():
     data = request.get_json(silent=True) or request.form.to_dict()
@@ -322,35 +1682,33 @@ def post_batch_weight():
     if not os.path.exists(filepath):
         return jsonify({"error": f"file not found: {filename}"}), 404
     
-    # 1. Parse the file
+    if not batch_file_format(filename):
+        return jsonify({"error": "unsupported file format, expected .csv or .json (optionally .gz or .zst)"}), 400
+
+    # Job mode: return right away and import on the worker pool
+    if parse_force(data.get("async", False)):
+        job = batch_jobs.submit(filename, lambda job: run_batch_job(job, filepath))
+        return jsonify(job.to_dict()), 202, {"Location": f"/batch-weight/{job.id}"}
+
+    # Parse, validate and upsert into containers_registered one chunk at a time
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0}
     try:
-        if filename.endswith(".csv"):
-            records = parse_csv(filepath)
-        elif filename.endswith(".json"):
-            records = parse_json(filepath)
-        else:
-            return jsonify({"error": "unsupported file format, expected .csv or .json"}), 400
-    except Exception as e:
+        upsert_containers(guard_parse_errors(parse_batch_file(filepath)), counts=counts)
+    except BatchParseError as e:
+        # The import is one transaction, so nothing before the bad row was saved
         return jsonify({"error": f"failed to parse file: {str(e)}"}), 400
 
-    # 2. Upsert each record into containers_registered
-    for container_id, weight_kg in records:
-        existing = ContainerRegistered.query.filter_by(container_id=container_id).first()
+    return jsonify({"message": f"processed {sum(counts.values())} records", **counts}), 200
 
-        if existing:
-            existing.weight = weight_kg
-            existing.unit = "kg"
-        else:
-            new_container = ContainerRegistered(
-                container_id=container_id,
-                weight=weight_kg,
-                unit="kg"
-            )
-            db.session.add(new_container)
 
-    db.session.commit()
+@app.get("/batch-weight/<job_id>")
+def get_batch_job(job_id):
+    job = batch_jobs.get(job_id)
+
+    if not job:
+        return jsonify({"error": "job not found"}), 404
 
-    return jsonify({"message": f"processed {len(records)} records"}), 200
+    return jsonify(job.to_dict()), 200
 
 
 
@@ -361,48 +1719,45 @@ def get_session(session_id):
     except ValueError:
         return jsonify({"error": "invalid session id"}), 400
 
-    out_transaction = Transaction.query.filter_by(
-        session_id=session_id,
-        direction="out"
-    ).first()
-
-    if out_transaction:
-        return jsonify({
-            "id": str(out_transaction.session_id),
-            "truck": out_transaction.truck,
-            "bruto": out_transaction.bruto,
-            "truckTara": out_transaction.truckTara,
-            "neto": out_transaction.neto if out_transaction.neto is not None else "na"
-        }), 200
-
-    in_transaction = Transaction.query.filter_by(
-        session_id=session_id,
-        direction="in"
-    ).first()
-
-    if in_transaction:
-        return jsonify({
-            "id": str(in_transaction.session_id),
-            "truck": in_transaction.truck,
-            "bruto": in_transaction.bruto
-        }), 200
-
-    return jsonify({"error": "session not found"}), 404
+    records = get_session_records([session_id])
 
-@app.get('/item/<id>')
-def get_item(id):
-    now = datetime.now()
-    default_t1 = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    
-    from_str = request.args.get("from")
-    to_str = request.args.get("to")
+    if session_id not in records:
+        return jsonify({"error": "session not found"}), 404
 
+    return jsonify(records[session_id]), 200
 
-    dt_from = parse_datetime_param(from_str) if from_str else default_t1
-    dt_to = parse_datetime_param(to_str) if to_str else now
+@app.get("/sessions")
+def get_sessions():
+    ids_str = request.args.get("ids", "")
 
-    if dt_from is None or dt_to is None:
+    try:
+        session_ids = list(dict.fromkeys(int(i) for i in ids_str.split(",") if i.strip()))
+    except ValueError:
+        return jsonify({"error": "invalid session id"}), 400
+
+    if not session_ids:
+        return jsonify({"error": "missing required parameter: ids"}), 400
+    if len(session_ids) > MAX_SESSION_IDS:
+        return jsonify({"error": f"too many ids, at most {MAX_SESSION_IDS} per request"}), 400
+
+    records = get_session_records(session_ids)
+
+    return jsonify({
+        "sessions": [records[i] for i in session_ids if i in records],
+        "not_found": [str(i) for i in session_ids if i not in records]
+    }), 200
+
+@app.get('/item/<id>')
+def get_item(id):
+    window = item_window(request.args.get("from"), request.args.get("to"))
+    if window is None:
         return jsonify({"error": "invalid datetime format, expected yyyymmddhhmmss"}), 400
+    dt_from, dt_to = window
+
+    try:
+        page = parse_page_params(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
     item_type = None
     tara_weight = "na"
@@ -410,89 +1765,113 @@ def get_item(id):
     container = ContainerRegistered.query.filter_by(container_id=id).first()
     if container:
         item_type = "container"
-        if container.weight is not None:
-            tara_weight = container.weight
-            if container.unit == "lbs":
-                tara_weight = lbs_to_kg(tara_weight)
-        
-                
+        tara_weight = container_tara_kg(container)
+        if tara_weight is None:
+            tara_weight = "na"
+
     else:
-        truck_exists = Transaction.query.filter_by(truck=id).first()
-        if truck_exists:
+        truck = db.session.get(Truck, id)
+        if truck:
             item_type = "truck"
-            last_out_tx = Transaction.query.filter(
-                Transaction.truck == id, 
-                Transaction.direction == "out",
-                Transaction.truckTara.isnot(None)
-            ).order_by(Transaction.datetime.desc()).first()
-            
-            if last_out_tx:
-                tara_weight = last_out_tx.truckTara
+            if truck.last_tara is not None:
+                tara_weight = truck.last_tara
                 
     if not item_type:
         return jsonify({"error": "Item not found"}), 404
 
-    sessions = set()
-    
     if item_type == "truck":
-        truck_transactions = Transaction.query.filter(
+        sessions_query = db.session.query(Transaction.session_id).filter(
             Transaction.truck == id,
             Transaction.datetime >= dt_from,
-            Transaction.datetime <= dt_to
-        ).all()
-        
-        for t in truck_transactions:
-            if t.session_id is not None:
-                sessions.add(t.session_id)
-        
+            Transaction.datetime <= dt_to,
+            Transaction.session_id.isnot(None)
+        ).distinct()
+        session_column = Transaction.session_id
+
     elif item_type == "container":
-        all_transactions_in_range = Transaction.query.filter(
-            Transaction.datetime >= dt_from,
-            Transaction.datetime <= dt_to
-        ).all()
-        
-        for t in all_transactions_in_range:
-            if t.containers:
-                container_list = [c.strip() for c in t.containers.split(",")]
-                if id in container_list and t.session_id is not None:
-                    sessions.add(t.session_id)
+        sessions_query = db.session.query(SessionContainer.session_id).filter(
+            SessionContainer.container_id == id,
+            SessionContainer.datetime >= dt_from,
+            SessionContainer.datetime <= dt_to,
+            SessionContainer.session_id.isnot(None)
+        ).distinct()
+        session_column = SessionContainer.session_id
+
+    result = {"id": id, "tara": tara_weight}
+
+    # Sessions page on session id, which grows with time
+    if page:
+        limit, after = page
+        try:
+            rows, last = keyset_page(sessions_query, [session_column], after, limit)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        result["next"] = encode_cursor([last.session_id]) if last else None
+    else:
+        rows = sessions_query.order_by(session_column).all()
 
-    return jsonify({
-        "id": id,
-        "tara": tara_weight,
-        "sessions": list(sessions)
-    }), 200 
+    result["sessions"] = [session_id for (session_id,) in rows]
 
+    return jsonify(result), 200 
 
-@app.get("/unknown")
-def get_unknown():
-    transactions = Transaction.query.all()
+@app.post("/items")
+def post_items():
+    data = request.get_json(silent=True) or {}
+    item_ids = data.get("ids")
+
+    if not isinstance(item_ids, list) or not item_ids or not all(isinstance(i, str) and i for i in item_ids):
+        return jsonify({"error": "missing required field: ids (a list of truck/container ids)"}), 400
+    item_ids = list(dict.fromkeys(item_ids))
+    if len(item_ids) > MAX_ITEM_IDS:
+        return jsonify({"error": f"too many ids, at most {MAX_ITEM_IDS} per request"}), 400
 
-    all_cids = []
-    seen = set()
+    window = item_window(data.get("from"), data.get("to"))
+    if window is None:
+        return jsonify({"error": "invalid datetime format, expected yyyymmddhhmmss"}), 400
 
-    for transaction in transactions:
-        for cid in parse_containers(transaction.containers):
-            cid = cid.strip()
-            if cid and cid not in seen:
-                seen.add(cid)
-                all_cids.append(cid)
+    items = resolve_items(item_ids, *window)
+
+    return jsonify({
+        "items": [items[i] for i in item_ids if i in items],
+        "not_found": [i for i in item_ids if i not in items]
+    }), 200
+
+@app.get("/unknown")
+def get_unknown():
+    try:
+        page = parse_page_params(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    if not all_cids:
-        return jsonify([]), 200
+    # containers_unknown is kept current by post_weight and post_batch_weight
+    query = db.session.query(ContainerUnknown.container_id)
 
-    known = ContainerRegistered.query.filter(
-        ContainerRegistered.container_id.in_(all_cids),
-        ContainerRegistered.weight.isnot(None)
-    ).all()
+    if page:
+        limit, after = page
+        try:
+            rows, last = keyset_page(query, [ContainerUnknown.container_id], after, limit)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
-    known_ids = {container.container_id for container in known}
+        next_cursor = encode_cursor([last.container_id]) if last else None
+        return jsonify({"results": [cid for (cid,) in rows], "next": next_cursor}), 200
 
-    unknown = [cid for cid in all_cids if cid not in known_ids]
+    unknown = query.order_by(ContainerUnknown.container_id).all()
 
-    return jsonify(unknown), 200
+    return jsonify([cid for (cid,) in unknown]), 200
 
 
 
 if __name__ == "__main__":
+    with app.app_context():
+        migrate()
+        if backfill_session_containers():
+            rebuild_unknown_containers()
+        # Readings buffered before a crash or restart go in first
+        recover_journal(config.BUFFER_PATH, BUFFER_CHECKPOINT).close()
+        load_open_sessions()
+        if config.STORE_AND_FORWARD:
+            reserve_buffer_ids()
+        if config.WRITE_BEHIND:
+            start_write_behind(config.JOURNAL_PATH)
     app.run(host="0.0.0.0", port=5000)
@@ -0,0 +1,77 @@
+"""
+Measure POST /weight throughput for "in" and "out" weighings.
+
+Runs against the database configured in .env through Flask's test client,
+so the numbers reflect the app + DB write path without HTTP overhead.
+
+Usage (from the weight/ directory):
+    python benchmarks/bench_post_weight.py [--sessions 500]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import app, load_open_sessions
+from database import db
+from models import Change, ContainerUnknown, Transaction, SessionContainer, Truck, WeighingSession
+
+TRUCK_PREFIX = "BENCH-"
+
+
+def run(client, direction, trucks, weight):
+    start = time.perf_counter()
+    for truck in trucks:
+        res = client.post("/weight", json={
+            "direction": direction,
+            "truck": truck,
+            "weight": weight,
+            "containers": "C-101,C-102",
+            "produce": "orange"
+        })
+        if res.status_code != 200:
+            raise RuntimeError(f"{direction} for {truck} failed: {res.get_json()}")
+    return len(trucks) / (time.perf_counter() - start)
+
+
+def cleanup():
+    bench_ids = db.session.query(Transaction.id).filter(Transaction.truck.like(f"{TRUCK_PREFIX}%"))
+    SessionContainer.query.filter(SessionContainer.transaction_id.in_(bench_ids)).delete(synchronize_session=False)
+    WeighingSession.query.filter(WeighingSession.truck.like(f"{TRUCK_PREFIX}%")).delete(synchronize_session=False)
+    Truck.query.filter(Truck.id.like(f"{TRUCK_PREFIX}%")).delete(synchronize_session=False)
+    Transaction.query.filter(Transaction.truck.like(f"{TRUCK_PREFIX}%")).delete(synchronize_session=False)
+    Change.query.filter(
+        Change.kind.in_(("insert", "delete")), Change.payload.like(f'%"truck": "{TRUCK_PREFIX}%')
+    ).delete(synchronize_session=False)
+    ContainerUnknown.query.filter(
+        ~db.exists().where(SessionContainer.container_id == ContainerUnknown.container_id)
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    load_open_sessions()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=500)
+    args = parser.parse_args()
+
+    trucks = [f"{TRUCK_PREFIX}{i:06d}" for i in range(args.sessions)]
+
+    with app.app_context():
+        cleanup()
+        client = app.test_client()
+        try:
+            in_rps = run(client, "in", trucks, 15000)
+            out_rps = run(client, "out", trucks, 5000)
+        finally:
+            cleanup()
+
+    print(f"sessions: {args.sessions}")
+    print(f"in:  {in_rps:8.1f} req/s")
+    print(f"out: {out_rps:8.1f} req/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+from collections import OrderedDict
+from threading import Lock
+
+
+class LRUCache:
+    """Thread-safe, process-local LRU cache with hit/miss counters.
+
+    Each worker process has its own copy, so writers must invalidate
+    explicitly after they commit.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = Lock()
+
+    def get_many(self, keys):
+        """Return ({key: value} for cached keys, [keys that were not cached])."""
+        found = {}
+        missing = []
+
+        with self._lock:
+            for key in keys:
+                if key in found:
+                    continue
+                if key in self._data:
+                    self._data.move_to_end(key)
+                    found[key] = self._data[key]
+                    self.hits += 1
+                elif key not in missing:
+                    missing.append(key)
+                    self.misses += 1
+
+        return found, missing
+
+    def put_many(self, items):
+        with self._lock:
+            for key, value in items.items():
+                self._data[key] = value
+                self._data.move_to_end(key)
+
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def invalidate(self, keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
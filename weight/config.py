@@ -1,6 +1,40 @@
 import os
 
-DB_HOST = os.environ["DB_HOSTNAME"]
-DB_NAME = os.environ["DB_NAME"]
-DB_USER = os.environ["DB_USER"]
-DB_PASSWORD = os.environ["DB_PASSWORD"]
\ No newline at end of file
+# Full SQLAlchemy URL override, e.g. sqlite:////tmp/weight.db for running
+# the integration tests without MySQL
+DB_URI = os.environ.get("DB_URI")
+
+if not DB_URI:
+    DB_HOST = os.environ["DB_HOSTNAME"]
+    DB_NAME = os.environ["DB_NAME"]
+    DB_USER = os.environ["DB_USER"]
+    DB_PASSWORD = os.environ["DB_PASSWORD"]
+    DB_URI = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}"
+
+TARA_CACHE_SIZE = int(os.environ.get("TARA_CACHE_SIZE", 10000))
+
+# Closed sessions kept for GET /session/<id>
+SESSION_CACHE_SIZE = int(os.environ.get("SESSION_CACHE_SIZE", 10000))
+
+# POST /weight responses kept per Idempotency-Key, and for how many seconds
+IDEMPOTENCY_MAX_KEYS = int(os.environ.get("IDEMPOTENCY_MAX_KEYS", 10000))
+IDEMPOTENCY_TTL = int(os.environ.get("IDEMPOTENCY_TTL", 24 * 60 * 60))
+
+# Write-behind mode: POST /weight journals the reading to JOURNAL_PATH and
+# answers right away; a background writer applies the journal to the DB
+# WRITE_BEHIND_BATCH readings per transaction
+WRITE_BEHIND = os.environ.get("WRITE_BEHIND", "").lower() in ("1", "true", "yes")
+JOURNAL_PATH = os.environ.get("JOURNAL_PATH", "journal/readings.jsonl")
+WRITE_BEHIND_BATCH = int(os.environ.get("WRITE_BEHIND_BATCH", 200))
+
+# Store-and-forward: while the DB is unreachable, POST /weight buffers
+# readings in BUFFER_PATH and syncs them back once it returns
+STORE_AND_FORWARD = os.environ.get("STORE_AND_FORWARD", "1").lower() in ("1", "true", "yes")
+BUFFER_PATH = os.environ.get("BUFFER_PATH", "journal/buffer.jsonl")
+# Transaction ids each process reserves in the DB ahead of an outage; the
+# buffer takes no more readings than that
+BUFFER_RESERVED_IDS = int(os.environ.get("BUFFER_RESERVED_IDS", 500))
+
+# Worker threads for background /batch-weight jobs; kept small so imports
+# don't starve the scales of DB connections
+BATCH_WORKERS = int(os.environ.get("BATCH_WORKERS", 2))
@@ -1,6 +1,9 @@
 --
 -- Database: `Weight`
 --
+-- Schema for a fresh database. Existing databases are brought up to date
+-- by `python migrations.py` (also run on app startup).
+--
 
 CREATE DATABASE IF NOT EXISTS `weight`;
 
@@ -17,7 +20,19 @@ CREATE TABLE IF NOT EXISTS `containers_registered` (
   `weight` int DEFAULT NULL,
   `unit` varchar(10) DEFAULT NULL,
   PRIMARY KEY (`container_id`)
-) ENGINE=MyISAM AUTO_INCREMENT=10001 ;
+) ENGINE=InnoDB AUTO_INCREMENT=10001 ;
+
+-- --------------------------------------------------------
+
+--
+-- Table structure for table `containers_unknown`
+-- Containers seen on a transaction that have no registered tara yet.
+--
+
+CREATE TABLE IF NOT EXISTS `containers_unknown` (
+  `container_id` varchar(50) NOT NULL,
+  PRIMARY KEY (`container_id`)
+) ENGINE=InnoDB;
 
 -- --------------------------------------------------------
 
@@ -36,5 +51,94 @@ CREATE TABLE IF NOT EXISTS `transactions` (
   `neto` int DEFAULT NULL,
   `produce` varchar(50) DEFAULT NULL,
   `session_id` int DEFAULT NULL,
+  PRIMARY KEY (`id`),
+  KEY `ix_transactions_open_session` (`truck`, `direction`, `truckTara`),
+  KEY `ix_transactions_session` (`session_id`, `direction`),
+  KEY `ix_transactions_datetime` (`datetime`, `direction`),
+  KEY `ix_transactions_truck_datetime` (`truck`, `datetime`),
+  KEY `ix_transactions_datetime_id` (`datetime`, `id`),
+  KEY `ix_transactions_produce_datetime` (`produce`, `datetime`)
+) ENGINE=InnoDB AUTO_INCREMENT=10001;
+
+
+-- --------------------------------------------------------
+
+--
+-- Table structure for table `session_containers`
+-- One row per container carried by a transaction, so container lookups
+-- don't have to split `transactions.containers`.
+--
+
+CREATE TABLE IF NOT EXISTS `session_containers` (
+  `transaction_id` int NOT NULL,
+  `container_id` varchar(50) NOT NULL,
+  `session_id` int DEFAULT NULL,
+  `datetime` datetime DEFAULT NULL,
+  PRIMARY KEY (`transaction_id`, `container_id`),
+  KEY `ix_session_containers_container_datetime` (`container_id`, `datetime`)
+) ENGINE=InnoDB;
+-- --------------------------------------------------------
+
+--
+-- Table structure for table `sessions`
+-- One row per weighing session (`id` is the session id). Containers are
+-- in `session_containers`.
+--
+
+CREATE TABLE IF NOT EXISTS `sessions` (
+  `id` int NOT NULL,
+  `direction` varchar(10) DEFAULT NULL,
+  `truck` varchar(50) DEFAULT NULL,
+  `bruto` int DEFAULT NULL,
+  `truckTara` int DEFAULT NULL,
+  `neto` int DEFAULT NULL,
+  `produce` varchar(50) DEFAULT NULL,
+  `in_datetime` datetime DEFAULT NULL,
+  `out_datetime` datetime DEFAULT NULL,
+  PRIMARY KEY (`id`)
+) ENGINE=InnoDB;
+
+-- --------------------------------------------------------
+
+--
+-- Table structure for table `trucks`
+-- One row per truck seen at the scale: its tara from the last weigh-out,
+-- when it was last weighed and how many sessions it has completed.
+--
+
+CREATE TABLE IF NOT EXISTS `trucks` (
+  `id` varchar(50) NOT NULL,
+  `last_tara` int DEFAULT NULL,
+  `last_seen` datetime DEFAULT NULL,
+  `session_count` int NOT NULL DEFAULT 0,
+  PRIMARY KEY (`id`)
+) ENGINE=InnoDB;
+
+-- --------------------------------------------------------
+
+--
+-- Table structure for table `journal_checkpoint`
+-- Last write-behind journal entry applied to this database (one row).
+--
+
+CREATE TABLE IF NOT EXISTS `journal_checkpoint` (
+  `id` int NOT NULL,
+  `seq` int NOT NULL,
+  PRIMARY KEY (`id`)
+) ENGINE=InnoDB;
+
+-- --------------------------------------------------------
+
+--
+-- Table structure for table `changes`
+-- Change feed (GET /weight/changes): transactions inserted or deleted and
+-- container taras registered, numbered in commit order.
+--
+
+CREATE TABLE IF NOT EXISTS `changes` (
+  `id` int NOT NULL AUTO_INCREMENT,
+  `kind` varchar(10) NOT NULL,
+  `datetime` datetime NOT NULL,
+  `payload` text NOT NULL,
   PRIMARY KEY (`id`)
-) ENGINE=MyISAM AUTO_INCREMENT=10001;
+) ENGINE=InnoDB;
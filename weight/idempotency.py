@@ -0,0 +1,106 @@
+import time
+from collections import OrderedDict
+from threading import Event, Lock
+
+
+class IdempotencyKeyReused(Exception):
+    """The key was first used for a different request."""
+
+
+class IdempotencyKeyBusy(Exception):
+    """Another request with the same key did not finish in time."""
+
+
+class _Entry:
+    __slots__ = ("fingerprint", "response", "done", "expires_at")
+
+    def __init__(self, fingerprint):
+        self.fingerprint = fingerprint
+        self.response = None
+        self.done = Event()
+        self.expires_at = None
+
+
+class IdempotencyStore:
+    """Bounded, process-local store of responses by Idempotency-Key, each kept for `ttl` seconds.
+
+    The first request with a key claims it; requests arriving with the same
+    key while it runs wait for it and then get its response. Only this
+    process's requests are covered, like the other in-memory caches.
+    """
+
+    def __init__(self, max_keys, ttl, clock=time.monotonic):
+        self.max_keys = max_keys
+        self.ttl = ttl
+        self.replays = 0
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def claim(self, key, fingerprint, wait=30.0):
+        """Return the stored (body, status) for key, or None if the caller now owns the key.
+
+        An owner must call complete() or release() when it's done.
+        """
+        deadline = self._clock() + wait
+
+        while True:
+            with self._lock:
+                self._expire()
+                entry = self._entries.get(key)
+
+                if entry is None:
+                    self._entries[key] = _Entry(fingerprint)
+                    self._evict()
+                    return None
+                if entry.fingerprint != fingerprint:
+                    raise IdempotencyKeyReused(key)
+                if entry.response is not None:
+                    self.replays += 1
+                    return entry.response
+
+            # In progress elsewhere: wait, then look again (it may have been released)
+            remaining = deadline - self._clock()
+            if remaining <= 0 or not entry.done.wait(remaining):
+                raise IdempotencyKeyBusy(key)
+
+    def complete(self, key, response):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry.response = response
+            entry.expires_at = self._clock() + self.ttl
+            entry.done.set()
+
+    def release(self, key):
+        """Forget a claimed key without a response, so the next request with it runs again."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        if entry:
+            entry.done.set()
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._entries), "max_size": self.max_keys, "replays": self.replays}
+
+    def _expire(self):
+        # Keys are in claim order, which is close enough to expiry order to stop at the first live one
+        now = self._clock()
+        expired = []
+        for key, entry in self._entries.items():
+            if entry.expires_at is None:
+                continue
+            if entry.expires_at > now:
+                break
+            expired.append(key)
+        for key in expired:
+            del self._entries[key]
+
+    def _evict(self):
+        # Oldest finished keys go first; in-flight ones stay until they finish
+        while len(self._entries) > self.max_keys:
+            oldest = next((k for k, e in self._entries.items() if e.response is not None), None)
+            if oldest is None:
+                break
+            del self._entries[oldest]
@@ -0,0 +1,83 @@
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+
+class BatchJob:
+    """Progress of one background /batch-weight import."""
+
+    def __init__(self, filename):
+        self.id = uuid.uuid4().hex
+        self.filename = filename
+        self.status = "queued"
+        self.counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    def to_dict(self):
+        processed = sum(self.counts.values())
+        elapsed = 0.0
+        if self.started_at:
+            elapsed = (self.finished_at or time.time()) - self.started_at
+
+        return {
+            "job": self.id,
+            "file": self.filename,
+            "status": self.status,
+            "processed": processed,
+            **self.counts,
+            "elapsed_seconds": round(elapsed, 3),
+            "rows_per_second": round(processed / elapsed, 1) if elapsed else 0.0,
+            "error": self.error
+        }
+
+
+class JobRunner:
+    """Runs batch jobs on a small thread pool and remembers the most recent ones.
+
+    Jobs live in this process only: they keep running if the client that
+    started them disconnects, but not across a restart.
+    """
+
+    def __init__(self, max_workers, max_jobs=100):
+        self.max_jobs = max_jobs
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="batch-job")
+        self._jobs = OrderedDict()
+        self._lock = Lock()
+
+    def submit(self, filename, work):
+        """Queue work(job) for filename and return the new BatchJob."""
+        job = BatchJob(filename)
+
+        with self._lock:
+            self._jobs[job.id] = job
+            self._forget_finished()
+
+        self._executor.submit(self._run, job, work)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job, work):
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            work(job)
+            job.status = "done"
+        except Exception as e:
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+
+    def _forget_finished(self):
+        # Drop the oldest finished jobs once we track more than max_jobs
+        excess = len(self._jobs) - self.max_jobs
+        for job_id in [j.id for j in self._jobs.values() if j.finished_at][:max(excess, 0)]:
+            del self._jobs[job_id]
@@ -0,0 +1,212 @@
+import itertools
+import json
+import logging
+import os
+from threading import Event, Lock, Thread
+
+log = logging.getLogger(__name__)
+
+
+class Journal:
+    """Append-only JSON-lines file of accepted readings.
+
+    Every append is fsynced before it returns, so an acknowledged reading
+    survives a crash. Entries get increasing sequence numbers; those at or
+    below applied_seq are already in the DB and are dropped on open. Once
+    every entry has been applied the file is cut down to a mark line
+    ({"seq": n}, no record) so numbering carries on after a reopen even
+    when applied_seq isn't known.
+    """
+
+    def __init__(self, path, applied_seq=0):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        entries = self._read()
+        self.last_seq = max([applied_seq] + [e["seq"] for e in entries])
+        self._entries = [e for e in entries if e["seq"] > applied_seq and len(e) > 1]
+        self._lock = Lock()
+
+        # Rewrite the file so a line torn by a crash can't run into the next append
+        with open(path, "w", encoding="utf-8") as f:
+            self._write_entries(f)
+        self._file = open(path, "a", encoding="utf-8")
+
+    def _write_entries(self, f):
+        mark = [{"seq": self.last_seq}] if self.last_seq else []
+        for entry in self._entries or mark:
+            f.write(json.dumps(entry) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return []
+
+        entries = []
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    # Only the last line can be torn; nothing after it was acknowledged
+                    break
+        return entries
+
+    def append(self, record):
+        """Durably append record and return it as the stored entry, with its "seq"."""
+        with self._lock:
+            entry = {"seq": self.last_seq + 1, **record}
+            self._file.write(json.dumps(entry) + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.last_seq = entry["seq"]
+            self._entries.append(entry)
+            return entry
+
+    def pending(self, limit):
+        """The oldest `limit` entries not yet applied."""
+        with self._lock:
+            return self._entries[:limit]
+
+    def applied_through(self, seq):
+        with self._lock:
+            self._entries = [e for e in self._entries if e["seq"] > seq]
+            if not self._entries:
+                self._file.truncate(0)
+                self._write_entries(self._file)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def close(self):
+        self._file.close()
+
+
+class PendingReadings:
+    """Readings that are in the journal but not yet in the DB, for reads to merge in.
+
+    Everything is tagged with the sequence number of the journal entry
+    that last touched it and dropped once the writer has applied that
+    entry.
+    """
+
+    def __init__(self):
+        self._transactions = {}
+        self._deleted = {}
+        self._sessions = {}
+        self._lock = Lock()
+
+    def add_transaction(self, seq, transaction):
+        with self._lock:
+            self._transactions[transaction.id] = (seq, transaction)
+
+    def delete_transaction(self, seq, transaction_id):
+        with self._lock:
+            if self._transactions.pop(transaction_id, None) is None:
+                self._deleted[transaction_id] = seq
+
+    def put_session(self, seq, session_id, record):
+        """Record what GET /session should return for session_id; None means it was deleted."""
+        with self._lock:
+            self._sessions[session_id] = (seq, record)
+
+    def sessions(self, session_ids):
+        """{session_id: record or None} for the ids with a pending change."""
+        with self._lock:
+            return {i: self._sessions[i][1] for i in session_ids if i in self._sessions}
+
+    def transactions(self):
+        with self._lock:
+            return [t for _, t in self._transactions.values()]
+
+    def deleted_ids(self):
+        with self._lock:
+            return list(self._deleted)
+
+    def applied_through(self, seq):
+        with self._lock:
+            for pending in (self._transactions, self._deleted, self._sessions):
+                for key in [k for k, v in pending.items() if (v[0] if isinstance(v, tuple) else v) <= seq]:
+                    del pending[key]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._transactions) + len(self._deleted)
+
+
+class WriteBehind:
+    """Accept readings into a Journal and apply them to the DB from a background thread.
+
+    apply_entries(entries) must write the entries in one DB transaction;
+    if it raises, the same entries are retried after retry_delay seconds.
+    Transaction ids are handed out here (from next_id, or from the `ids`
+    iterator, which may run out) so a reading can be acknowledged with its
+    session id before it reaches the DB.
+
+    on_drained, if given, is called by the writer thread each time the
+    journal has been emptied; when it returns True the writer stops. It
+    should clear `accepting` (under `lock`) so no reading is journaled
+    after that.
+    """
+
+    def __init__(self, journal, apply_entries, next_id, batch_size=200, interval=0.5, retry_delay=1.0,
+                 on_drained=None, ids=None):
+        self.journal = journal
+        self.pending = PendingReadings()
+        self.lock = Lock()
+        self.accepting = True
+        self.batch_size = batch_size
+        self.interval = interval
+        self.retry_delay = retry_delay
+        self._apply_entries = apply_entries
+        self._on_drained = on_drained
+        self._ids = ids if ids is not None else itertools.count(next_id)
+        self._flush_lock = Lock()
+        self._wake = Event()
+        self._stopped = Event()
+        self._thread = None
+
+    def allocate_id(self):
+        """The next transaction id, or None once `ids` has run out."""
+        return next(self._ids, None)
+
+    def notify(self):
+        self._wake.set()
+
+    def flush(self):
+        """Apply every journaled entry now. Returns how many were applied."""
+        applied = 0
+        with self._flush_lock:
+            while True:
+                entries = self.journal.pending(self.batch_size)
+                if not entries:
+                    return applied
+
+                self._apply_entries(entries)
+                self.journal.applied_through(entries[-1]["seq"])
+                self.pending.applied_through(entries[-1]["seq"])
+                applied += len(entries)
+
+    def start(self):
+        self._thread = Thread(target=self._run, name="journal-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.flush()
+                if self._on_drained and not len(self.journal) and self._on_drained(self):
+                    return
+            except Exception:
+                log.exception("journal writer failed, retrying in %ss", self.retry_delay)
+                self._stopped.wait(self.retry_delay)
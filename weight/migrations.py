@@ -0,0 +1,293 @@
+"""
+Versioned schema migrations for the weight DB.
+
+db/weightdb.sql builds a fresh database; migrations bring an existing one up
+to date. Every migration checks the live schema before changing it, so a
+migration that was interrupted halfway (MySQL commits each DDL statement on
+its own) can simply be run again.
+
+Usage (from the weight/ directory):
+    python migrations.py            # apply pending migrations
+    python migrations.py explain    # show the query plans of the hot paths
+"""
+import sys
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, String, Table, Text, inspect, text
+
+from database import db
+from queryplan import capture_statements, explain
+
+# Composite indexes matching how the routes actually query transactions
+HOT_PATH_INDEXES = {
+    # post_weight: the truck's open "in" session
+    "ix_transactions_open_session": ("transactions", ["truck", "direction", "truckTara"]),
+    # get_session: the in/out rows of one session
+    "ix_transactions_session": ("transactions", ["session_id", "direction"]),
+    # get_weight: time window filtered by direction
+    "ix_transactions_datetime": ("transactions", ["datetime", "direction"]),
+    # get_item for a truck: its sessions in a time window and its last tara
+    "ix_transactions_truck_datetime": ("transactions", ["truck", "datetime"]),
+}
+
+# get_weight pages: walk the window in (datetime, id) order without sorting
+KEYSET_INDEXES = {
+    "ix_transactions_datetime_id": ("transactions", ["datetime", "id"]),
+}
+
+# get_weight ?produce=: one product's rows in a time window (?truck= uses
+# ix_transactions_truck_datetime)
+FILTER_INDEXES = {
+    "ix_transactions_produce_datetime": ("transactions", ["produce", "datetime"]),
+}
+
+migrations_table = Table(
+    "schema_migrations", MetaData(),
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("name", String(100), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+# --- Helpers ---
+
+def has_index(conn, table, name):
+    return any(ix["name"] == name for ix in inspect(conn).get_indexes(table))
+
+def create_index(conn, table, name, columns):
+    """CREATE INDEX unless an index with that name already exists (MySQL has no IF NOT EXISTS)."""
+    if has_index(conn, table, name):
+        return
+    quote = conn.dialect.identifier_preparer.quote
+    column_list = ", ".join(quote(c) for c in columns)
+    conn.execute(text(f"CREATE INDEX {quote(name)} ON {quote(table)} ({column_list})"))
+
+def backfill_sessions(conn):
+    """Insert a sessions row for every session in transactions that doesn't have one yet.
+
+    Sessions come from their "in"/"none" row plus the "out" row if there is
+    one; an "out" row whose "in" was deleted by a forced re-weigh still
+    becomes a session. Returns the number of rows inserted.
+    """
+    inserted = conn.execute(text(
+        "INSERT INTO sessions (id, direction, truck, bruto, truckTara, neto, produce, in_datetime, out_datetime) "
+        "SELECT i.session_id, i.direction, i.truck, i.bruto, o.truckTara, o.neto, i.produce, i.datetime, o.datetime "
+        "FROM transactions i "
+        "LEFT JOIN transactions o ON o.session_id = i.session_id AND o.direction = 'out' "
+        "WHERE i.direction IN ('in', 'none') AND i.session_id IS NOT NULL "
+        "AND NOT EXISTS (SELECT 1 FROM sessions s WHERE s.id = i.session_id)"
+    )).rowcount
+
+    inserted += conn.execute(text(
+        "INSERT INTO sessions (id, direction, truck, bruto, truckTara, neto, produce, in_datetime, out_datetime) "
+        "SELECT o.session_id, 'in', o.truck, o.bruto, o.truckTara, o.neto, o.produce, NULL, o.datetime "
+        "FROM transactions o "
+        "WHERE o.direction = 'out' AND o.session_id IS NOT NULL "
+        "AND NOT EXISTS (SELECT 1 FROM sessions s WHERE s.id = o.session_id)"
+    )).rowcount
+
+    return inserted
+
+def backfill_trucks(conn):
+    """Insert a trucks row for every truck in transactions that doesn't have one yet.
+
+    Returns the number of rows inserted.
+    """
+    return conn.execute(text(
+        "INSERT INTO trucks (id, last_tara, last_seen, session_count) "
+        "SELECT t.truck, "
+        "(SELECT o.truckTara FROM transactions o "
+        " WHERE o.truck = t.truck AND o.direction = 'out' AND o.truckTara IS NOT NULL "
+        " ORDER BY o.datetime DESC, o.id DESC LIMIT 1), "
+        "MAX(t.datetime), "
+        "COUNT(DISTINCT CASE WHEN t.direction = 'out' THEN t.session_id END) "
+        "FROM transactions t "
+        "WHERE t.truck IS NOT NULL AND t.truck <> 'na' "
+        "AND NOT EXISTS (SELECT 1 FROM trucks k WHERE k.id = t.truck) "
+        "GROUP BY t.truck"
+    )).rowcount
+
+
+# --- Migrations ---
+# Append new ones at the end; never renumber or edit one that has shipped.
+
+def m001_container_index_tables(conn):
+    """session_containers and containers_unknown for databases created before they existed."""
+    metadata = MetaData()
+    Table(
+        "session_containers", metadata,
+        Column("transaction_id", Integer, primary_key=True, autoincrement=False),
+        Column("container_id", String(50), primary_key=True),
+        Column("session_id", Integer),
+        Column("datetime", DateTime),
+        Index("ix_session_containers_container_datetime", "container_id", "datetime"),
+    )
+    Table(
+        "containers_unknown", metadata,
+        Column("container_id", String(50), primary_key=True),
+    )
+    metadata.create_all(conn, checkfirst=True)
+
+def m002_innodb(conn):
+    """Move the weight tables from MyISAM to InnoDB for row locks and real transactions.
+
+    The tables are the ones that existed when this shipped; tables created
+    later declare InnoDB in the migration that creates them.
+    """
+    if conn.dialect.name != "mysql":
+        return
+
+    for table in ("transactions", "containers_registered", "session_containers", "containers_unknown"):
+        engine = conn.execute(text(
+            "SELECT ENGINE FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table"
+        ), {"table": table}).scalar()
+
+        if engine and engine.lower() != "innodb":
+            conn.execute(text(f"ALTER TABLE `{table}` ENGINE=InnoDB"))
+
+def m003_hot_path_indexes(conn):
+    """Composite indexes for the open-session, session, time-window and truck lookups."""
+    for name, (table, columns) in HOT_PATH_INDEXES.items():
+        create_index(conn, table, name, columns)
+
+def m004_keyset_indexes(conn):
+    """(datetime, id) so keyset pages of /weight are read in index order."""
+    for name, (table, columns) in KEYSET_INDEXES.items():
+        create_index(conn, table, name, columns)
+
+def m005_sessions(conn):
+    """One row per session, filled from the existing in/out transaction pairs."""
+    Table(
+        "sessions", MetaData(),
+        Column("id", Integer, primary_key=True, autoincrement=False),
+        Column("direction", String(10)),
+        Column("truck", String(50)),
+        Column("bruto", Integer),
+        Column("truckTara", Integer),
+        Column("neto", Integer),
+        Column("produce", String(50)),
+        Column("in_datetime", DateTime),
+        Column("out_datetime", DateTime),
+        mysql_engine="InnoDB",
+    ).create(conn, checkfirst=True)
+    backfill_sessions(conn)
+
+def m006_trucks(conn):
+    """One row per truck with its last tara, filled from the existing transactions."""
+    Table(
+        "trucks", MetaData(),
+        Column("id", String(50), primary_key=True),
+        Column("last_tara", Integer),
+        Column("last_seen", DateTime),
+        Column("session_count", Integer, nullable=False, server_default="0"),
+        mysql_engine="InnoDB",
+    ).create(conn, checkfirst=True)
+    backfill_trucks(conn)
+
+def m007_journal_checkpoint(conn):
+    """Where the write-behind journal writer has got to."""
+    Table(
+        "journal_checkpoint", MetaData(),
+        Column("id", Integer, primary_key=True, autoincrement=False),
+        Column("seq", Integer, nullable=False),
+        mysql_engine="InnoDB",
+    ).create(conn, checkfirst=True)
+
+def m008_filter_indexes(conn):
+    """(produce, datetime) for GET /weight?produce=."""
+    for name, (table, columns) in FILTER_INDEXES.items():
+        create_index(conn, table, name, columns)
+
+def m009_changes(conn):
+    """The change feed behind GET /weight/changes; it starts empty (history before it isn't replayed)."""
+    Table(
+        "changes", MetaData(),
+        Column("id", Integer, primary_key=True),
+        Column("kind", String(10), nullable=False),
+        Column("datetime", DateTime, nullable=False),
+        Column("payload", Text, nullable=False),
+        mysql_engine="InnoDB",
+    ).create(conn, checkfirst=True)
+
+
+MIGRATIONS = [
+    (1, "container index tables", m001_container_index_tables),
+    (2, "innodb", m002_innodb),
+    (3, "hot path indexes", m003_hot_path_indexes),
+    (4, "keyset indexes", m004_keyset_indexes),
+    (5, "sessions", m005_sessions),
+    (6, "trucks", m006_trucks),
+    (7, "journal checkpoint", m007_journal_checkpoint),
+    (8, "filter indexes", m008_filter_indexes),
+    (9, "changes", m009_changes),
+]
+
+
+def migrate():
+    """Apply pending migrations in order. Returns the versions that were applied."""
+    with db.engine.begin() as conn:
+        migrations_table.create(conn, checkfirst=True)
+        applied = set(conn.execute(migrations_table.select().with_only_columns(migrations_table.c.version)).scalars())
+
+    newly_applied = []
+    for version, name, upgrade in MIGRATIONS:
+        if version in applied:
+            continue
+
+        with db.engine.begin() as conn:
+            upgrade(conn)
+            conn.execute(migrations_table.insert().values(
+                version=version, name=name, applied_at=datetime.now().replace(microsecond=0)
+            ))
+        newly_applied.append(version)
+
+    return newly_applied
+
+
+# --- Query plans ---
+
+def hot_path_queries():
+    """Representative queries for each indexed access path, as the routes issue them."""
+    from models import Transaction
+
+    now = datetime.now()
+    month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+    return {
+        "open session": Transaction.query.filter_by(truck="T-1", direction="in", truckTara=None),
+        "session out row": Transaction.query.filter_by(session_id=1, direction="out"),
+        "weight window": Transaction.query.filter(
+            Transaction.datetime >= month_start,
+            Transaction.datetime <= now,
+            Transaction.direction.in_(["in", "out", "none"])
+        ),
+        "truck sessions": Transaction.query.filter(
+            Transaction.truck == "T-1",
+            Transaction.datetime >= month_start,
+            Transaction.datetime <= now
+        ),
+    }
+
+def print_hot_path_plans():
+    for name, query in hot_path_queries().items():
+        with capture_statements(db.engine) as statements:
+            query.all()
+
+        print(f"{name}:")
+        with db.engine.connect() as conn:
+            for statement, parameters in statements:
+                for step in explain(conn, statement, parameters):
+                    flags = [flag for flag in ("full_scan", "filesort") if step[flag]]
+                    print(f"  {step['table']}: index={step['index']} {' '.join(flags)}  [{step['detail']}]")
+
+
+if __name__ == "__main__":
+    from app import app
+
+    with app.app_context():
+        if sys.argv[1:] == ["explain"]:
+            print_hot_path_plans()
+        else:
+            applied = migrate()
+            print(f"applied migrations: {applied}" if applied else "schema is up to date")
@@ -8,6 +8,12 @@ class ContainerRegistered(db.Model):
     weight = db.Column(db.Integer, nullable=True)
     unit = db.Column(db.String(10), nullable=True)
 
+class ContainerUnknown(db.Model):
+
+    __tablename__ = "containers_unknown"
+
+    container_id = db.Column(db.String(50), primary_key=True)
+
 class Transaction(db.Model):
 
     __tablename__ = "transactions"
@@ -22,3 +28,94 @@ class Transaction(db.Model):
     neto = db.Column(db.Integer, nullable=True)
     produce = db.Column(db.String(50), nullable=True)
     session_id = db.Column(db.Integer, nullable=True)
+
+    # Kept in step with migrations.HOT_PATH_INDEXES, KEYSET_INDEXES and FILTER_INDEXES
+    __table_args__ = (
+        db.Index("ix_transactions_open_session", "truck", "direction", "truckTara"),
+        db.Index("ix_transactions_session", "session_id", "direction"),
+        db.Index("ix_transactions_datetime", "datetime", "direction"),
+        db.Index("ix_transactions_truck_datetime", "truck", "datetime"),
+        db.Index("ix_transactions_datetime_id", "datetime", "id"),
+        db.Index("ix_transactions_produce_datetime", "produce", "datetime"),
+        # Like MySQL's AUTO_INCREMENT, never reissue a deleted id (app.reserve_buffer_ids)
+        {"sqlite_autoincrement": True},
+    )
+
+
+class WeighingSession(db.Model):
+    """One row per session, written by post_weight next to its transactions.
+
+    The id is the session id; the containers are in session_containers.
+    """
+
+    __tablename__ = "sessions"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    direction = db.Column(db.String(10), nullable=True)
+    truck = db.Column(db.String(50), nullable=True)
+    bruto = db.Column(db.Integer, nullable=True)
+    truckTara = db.Column(db.Integer, nullable=True)
+    neto = db.Column(db.Integer, nullable=True)
+    produce = db.Column(db.String(50), nullable=True)
+    in_datetime = db.Column(db.DateTime, nullable=True)
+    out_datetime = db.Column(db.DateTime, nullable=True)
+
+
+class Truck(db.Model):
+    """One row per truck seen at the scale, kept up to date by post_weight.
+
+    last_tara comes from the truck's latest weigh-out; last_seen is its
+    latest weighing in any direction.
+    """
+
+    __tablename__ = "trucks"
+
+    id = db.Column(db.String(50), primary_key=True)
+    last_tara = db.Column(db.Integer, nullable=True)
+    last_seen = db.Column(db.DateTime, nullable=True)
+    # Sessions that have weighed out
+    session_count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class SessionContainer(db.Model):
+
+    __tablename__ = "session_containers"
+
+    transaction_id = db.Column(db.Integer, primary_key=True)
+    container_id = db.Column(db.String(50), primary_key=True)
+    session_id = db.Column(db.Integer, nullable=True)
+    datetime = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index("ix_session_containers_container_datetime", "container_id", "datetime"),
+    )
+
+
+class JournalCheckpoint(db.Model):
+    """Sequence number of the last journal entry applied to the DB (id 1: write-behind, id 2: store-and-forward).
+
+    Updated in the same transaction as the entries, so a replay after a
+    crash skips exactly the ones already written.
+    """
+
+    __tablename__ = "journal_checkpoint"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    seq = db.Column(db.Integer, nullable=False)
+
+
+class Change(db.Model):
+    """One entry of the change feed (GET /weight/changes).
+
+    Written in the same transaction as the change it describes; ids are
+    handed out in commit order. kind is "insert" or "delete" for a
+    transaction (payload: the row as GET /weight shows it) and "tara" for
+    a registered container weight (payload: container_id, weight, unit).
+    """
+
+    __tablename__ = "changes"
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(10), nullable=False)
+    datetime = db.Column(db.DateTime, nullable=False)
+    payload = db.Column(db.Text, nullable=False)
@@ -0,0 +1,62 @@
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+
+@contextmanager
+def capture_statements(engine, executemany=False):
+    """Collect (statement, parameters) for every single statement sent to the driver.
+
+    With executemany=True, executemany batches are collected too (one entry
+    per batch); they can't be EXPLAINed.
+    """
+    captured = []
+
+    def record(conn, cursor, statement, parameters, context, is_executemany):
+        if executemany or not is_executemany:
+            captured.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield captured
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+def explain(conn, statement, parameters=None):
+    """Run EXPLAIN on a driver-level SQL statement and normalize the plan.
+
+    Returns one dict per plan step: table, index used (or None), and whether
+    the step is a full table scan or a filesort.
+    """
+    parameters = parameters if parameters is not None else ()
+
+    if conn.dialect.name == "mysql":
+        result = conn.exec_driver_sql(f"EXPLAIN {statement}", parameters).mappings().all()
+        return [{
+            "table": row["table"],
+            "index": row["key"],
+            "full_scan": row["type"] == "ALL",
+            "filesort": "filesort" in (row["Extra"] or ""),
+            "detail": f"type={row['type']} rows={row['rows']} extra={row['Extra']}",
+        } for row in result]
+
+    if conn.dialect.name == "sqlite":
+        steps = []
+        table = None
+        for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all():
+            detail = row[-1]
+            words = detail.split()
+            if words[0] in ("SCAN", "SEARCH"):
+                table = words[1]
+            steps.append({
+                # Sort steps don't name a table; charge them to the table read before them
+                "table": table,
+                "index": words[words.index("INDEX") + 1] if "INDEX" in words else None,
+                "full_scan": words[0] == "SCAN" and "INDEX" not in words,
+                "filesort": detail.startswith("USE TEMP B-TREE FOR") and detail.endswith("ORDER BY"),
+                "detail": detail,
+            })
+        return steps
+
+    raise NotImplementedError(f"no EXPLAIN support for dialect '{conn.dialect.name}'")
@@ -0,0 +1,75 @@
+from threading import Lock
+
+
+class OpenSession:
+    """A truck's current session: its "in" transaction and whether it has weighed out."""
+
+    __slots__ = ("transaction_id", "session_id", "truck", "bruto", "containers", "produce", "datetime",
+                 "weighed_out", "out_transaction_id")
+
+    def __init__(self, transaction_id, session_id, truck, bruto, containers, produce, datetime,
+                 weighed_out=False, out_transaction_id=None):
+        self.transaction_id = transaction_id
+        self.session_id = session_id
+        self.truck = truck
+        self.bruto = bruto
+        self.containers = containers
+        self.produce = produce
+        self.datetime = datetime
+        self.weighed_out = weighed_out
+        self.out_transaction_id = out_transaction_id
+
+    def weighed_out_copy(self, out_transaction_id=None):
+        """This session after its weigh-out, leaving the registry's copy untouched until commit."""
+        return OpenSession(self.transaction_id, self.session_id, self.truck, self.bruto,
+                           self.containers, self.produce, self.datetime,
+                           weighed_out=True, out_transaction_id=out_transaction_id)
+
+    def to_dict(self):
+        return {
+            "id": str(self.session_id),
+            "truck": self.truck,
+            "bruto": self.bruto,
+            "produce": self.produce,
+            "containers": [c for c in (self.containers or "").split(",") if c],
+            "datetime": self.datetime.strftime("%Y%m%d%H%M%S") if self.datetime else None
+        }
+
+
+class OpenSessionRegistry:
+    """Thread-safe, process-local map of truck -> its current OpenSession.
+
+    post_weight is the only writer of transactions, so it keeps the registry
+    in step by putting each changed session after its commit; replace_all()
+    reloads it from the DB at startup.
+    """
+
+    def __init__(self):
+        self._sessions = {}
+        self._lock = Lock()
+
+    def get(self, truck):
+        with self._lock:
+            return self._sessions.get(truck)
+
+    def put(self, session):
+        with self._lock:
+            self._sessions[session.truck] = session
+
+    def sessions(self):
+        with self._lock:
+            return list(self._sessions.values())
+
+    def replace_all(self, sessions):
+        with self._lock:
+            self._sessions = {s.truck: s for s in sessions}
+
+    def in_yard(self):
+        """Sessions that have weighed in but not out, oldest first."""
+        with self._lock:
+            sessions = [s for s in self._sessions.values() if not s.weighed_out]
+        return sorted(sessions, key=lambda s: (s.datetime is None, s.datetime, s.session_id))
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
@@ -1,10 +1,19 @@
 import pytest
-from app import app
+from app import app, backfill_session_containers, load_open_sessions, rebuild_unknown_containers, session_cache, tara_cache
+from migrations import backfill_sessions, backfill_trucks, migrate
 from database import db
-from models import Transaction, ContainerRegistered
+from models import Change, Transaction, ContainerRegistered, ContainerUnknown, SessionContainer, Truck, WeighingSession
 from datetime import datetime, timedelta
 
 
+@pytest.fixture(scope="session", autouse=True)
+def schema():
+    """Create any missing tables (a no-op on MySQL, where weightdb.sql builds the schema), then migrate."""
+    with app.app_context():
+        db.create_all()
+        migrate()
+
+
 @pytest.fixture(autouse=True)
 def client():
     """Create a Flask test client with test data — all in one app context."""
@@ -13,6 +22,7 @@ def client():
         db.session.remove()
 
         max_id = db.session.query(db.func.max(Transaction.id)).scalar() or 0
+        max_change_id = db.session.query(db.func.max(Change.id)).scalar() or 0
         existing_containers = {c.container_id for c in ContainerRegistered.query.all()}
 
         # --- Containers ---
@@ -28,6 +38,9 @@ def client():
                 db.session.add(ContainerRegistered(container_id=cid, weight=w, unit=u))
 
         db.session.commit()
+        # Containers and sessions are written behind the app's back, so drop anything cached
+        tara_cache.clear()
+        session_cache.clear()
 
         # --- Dates ---
         now = datetime.now()
@@ -76,12 +89,34 @@ def client():
         # Commit all containers and transactions at once
         db.session.commit()
 
+        # Index the fixture containers the same way a deployment backfills old rows
+        backfill_session_containers()
+        rebuild_unknown_containers()
+        with db.engine.begin() as conn:
+            backfill_sessions(conn)
+            backfill_trucks(conn)
+        load_open_sessions()
+
         yield app.test_client()
 
         
         db.session.remove()
+        SessionContainer.query.filter(SessionContainer.transaction_id > max_id).delete()
+        # Trucks the test weighed get rebuilt below from the rows that are left
+        touched_trucks = db.session.query(Transaction.truck).filter(Transaction.id > max_id)
+        Truck.query.filter(Truck.id.in_(touched_trucks)).delete(synchronize_session=False)
         Transaction.query.filter(Transaction.id > max_id).delete()
+        WeighingSession.query.filter(
+            ~db.exists().where(Transaction.session_id == WeighingSession.id)
+        ).delete(synchronize_session=False)
+        ContainerUnknown.query.filter(
+            ~db.exists().where(SessionContainer.container_id == ContainerUnknown.container_id)
+        ).delete(synchronize_session=False)
         ContainerRegistered.query.filter(
             ContainerRegistered.container_id.notin_(existing_containers)
         ).delete()
-        db.session.commit()
\ No newline at end of file
+        Change.query.filter(Change.id > max_change_id).delete()
+        db.session.commit()
+        with db.engine.begin() as conn:
+            backfill_trucks(conn)
+        load_open_sessions()
\ No newline at end of file
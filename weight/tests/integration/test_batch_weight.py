@@ -1,3 +1,8 @@
+import os
+
+import pytest
+
+
 # --- Validation tests ---
 
 def test_missing_file_param(client):
@@ -94,4 +99,158 @@ def test_json_body_request(client):
     """Should also accept file parameter via JSON body."""
     res = client.post("/batch-weight", json={"file": "containers1.csv"})
     assert res.status_code == 200
-    assert res.get_json()["message"] == "processed 36 records"
\ No newline at end of file
+    assert res.get_json()["message"] == "processed 36 records"
+
+# --- Upsert counts ---
+
+def test_upsert_reports_counts(client):
+    """Every record should be counted as inserted, updated or unchanged."""
+    res = client.post("/batch-weight", data={"file": "containers1.csv"})
+    data = res.get_json()
+    assert data["inserted"] + data["updated"] + data["unchanged"] == 36
+
+
+def test_reimport_reports_unchanged(client):
+    """Importing the same file twice should leave every record unchanged."""
+    client.post("/batch-weight", data={"file": "containers1.csv"})
+    res = client.post("/batch-weight", data={"file": "containers1.csv"})
+    data = res.get_json()
+    assert data["inserted"] == 0
+    assert data["updated"] == 0
+    assert data["unchanged"] == 36
+
+
+def test_upsert_reports_updated(client):
+    """A registered container with a different tara should be counted as updated."""
+    from models import ContainerRegistered
+    from database import db
+    db.session.add(ContainerRegistered(container_id="C-35434", weight=1, unit="kg"))
+    db.session.commit()
+
+    res = client.post("/batch-weight", data={"file": "containers1.csv"})
+    assert res.get_json()["updated"] == 1
+    assert ContainerRegistered.query.filter_by(container_id="C-35434").first().weight == 296
+
+
+@pytest.fixture
+def bad_batch_file():
+    """A CSV in in/ whose last row is invalid."""
+    path = os.path.join("in", "test_bad_rows.csv")
+    with open(path, "w") as f:
+        f.write("id,kg\nTEST-BAD-1,100\nTEST-BAD-2,200\nTEST-BAD-3,heavy\n")
+    yield os.path.basename(path)
+    os.remove(path)
+
+
+def test_bad_row_imports_nothing(client, bad_batch_file):
+    """A parse error anywhere in the file should leave every row unregistered."""
+    from models import ContainerRegistered
+    res = client.post("/batch-weight", json={"file": bad_batch_file})
+    assert res.status_code == 400
+    assert "failed to parse file" in res.get_json()["error"]
+    assert ContainerRegistered.query.filter(ContainerRegistered.container_id.like("TEST-BAD-%")).count() == 0
+
+
+@pytest.fixture
+def large_batch_file():
+    """Write a CSV of `rows` new containers into in/; returns its name."""
+    paths = []
+
+    def write(rows):
+        path = os.path.join("in", f"test_large_{rows}.csv")
+        with open(path, "w") as f:
+            f.write("id,kg\n")
+            f.writelines(f"TBW{rows}-{i},{100 + i % 50}\n" for i in range(rows))
+        paths.append(path)
+        return os.path.basename(path)
+
+    yield write
+    for path in paths:
+        os.remove(path)
+
+
+def test_statements_grow_with_chunks_not_rows(client, large_batch_file):
+    """Each chunk's upsert and change-feed rows go in as a fixed number of statements."""
+    from database import db
+    from models import Change
+    from queryplan import capture_statements
+
+    def statements_for(rows):
+        name = large_batch_file(rows)
+        with capture_statements(db.engine, executemany=True) as statements:
+            res = client.post("/batch-weight", json={"file": name})
+        assert res.get_json()["inserted"] == rows
+        return len(statements)
+
+    # Both files are two chunks of up to 1000 rows
+    assert statements_for(1200) == statements_for(1800)
+    assert Change.query.filter(Change.kind == "tara", Change.payload.like('%"TBW1800-%')).count() == 1800
+
+
+def test_bad_row_after_first_chunk_imports_nothing(client):
+    """A bad row in the second chunk should roll back the chunk already written."""
+    from models import Change, ContainerRegistered
+    path = os.path.join("in", "test_bad_second_chunk.csv")
+    with open(path, "w") as f:
+        f.write("id,kg\n")
+        f.writelines(f"TBWBAD-{i},100\n" for i in range(1200))
+        f.write("TBWBAD-X,heavy\n")
+    try:
+        res = client.post("/batch-weight", json={"file": "test_bad_second_chunk.csv"})
+    finally:
+        os.remove(path)
+
+    assert res.status_code == 400
+    assert ContainerRegistered.query.filter(ContainerRegistered.container_id.like("TBWBAD-%")).count() == 0
+    assert Change.query.filter(Change.payload.like('%"TBWBAD-%')).count() == 0
+
+
+# --- Job mode ---
+
+def wait_for_job(client, job_id, timeout=10):
+    import time
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = client.get(f"/batch-weight/{job_id}").get_json()
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} did not finish in {timeout}s")
+
+
+def test_async_bad_row_imports_nothing(client, bad_batch_file):
+    """A job should fail on a bad row without registering the rows before it."""
+    res = client.post("/batch-weight", json={"file": bad_batch_file, "async": True})
+    job = wait_for_job(client, res.get_json()["job"])
+    assert job["status"] == "failed"
+
+    from models import ContainerRegistered
+    assert ContainerRegistered.query.filter(ContainerRegistered.container_id.like("TEST-BAD-%")).count() == 0
+
+
+def test_async_returns_job_id(client):
+    """async=true should queue the import and return 202 with a job id."""
+    res = client.post("/batch-weight", json={"file": "containers1.csv", "async": True})
+    assert res.status_code == 202
+    job_id = res.get_json()["job"]
+    assert res.headers["Location"] == f"/batch-weight/{job_id}"
+    wait_for_job(client, job_id)
+
+
+def test_async_job_reports_progress(client):
+    """A finished job should report rows processed and the upsert counts."""
+    res = client.post("/batch-weight", data={"file": "trucks.json", "async": "true"})
+    job = wait_for_job(client, res.get_json()["job"])
+    assert job["status"] == "done"
+    assert job["processed"] == 31
+    assert job["error"] is None
+
+    from models import ContainerRegistered
+    assert ContainerRegistered.query.filter(ContainerRegistered.container_id.like("T-%")).count() > 0
+
+
+def test_async_unknown_job(client):
+    """Unknown job ids should return 404."""
+    res = client.get("/batch-weight/does-not-exist")
+    assert res.status_code == 404
+    assert res.get_json()["error"] == "job not found"
@@ -124,4 +124,82 @@ def test_get_item_truck_very_old_session(client):
     assert data["tara"] == 5100 
     # Since Session 6 is from 'last_year', it should not appear in the default 
     # date range (which typically starts at the beginning of the current month).
-    assert data["sessions"] == []
\ No newline at end of file
+    assert data["sessions"] == []
+
+def test_get_item_container_from_new_weighing(client):
+    """A container weighed in through POST /weight should be found by /item."""
+    post_res = client.post("/weight", json={
+        "direction": "in",
+        "truck": "TEST-ITEM-01",
+        "weight": 15000,
+        "containers": "C-999",
+        "produce": "orange"
+    })
+    session_id = int(post_res.get_json()["id"])
+
+    response = client.get("/item/C-999")
+    assert response.status_code == 200
+    assert response.get_json()["sessions"] == [session_id]
+
+
+def test_get_item_container_forced_overwrite_drops_old_session(client):
+    """A forced weigh-in should remove the overwritten session from the container's history."""
+    first = client.post("/weight", json={
+        "direction": "in",
+        "truck": "TEST-ITEM-02",
+        "weight": 15000,
+        "containers": "C-999"
+    })
+    client.post("/weight", json={
+        "direction": "in",
+        "truck": "TEST-ITEM-02",
+        "weight": 14000,
+        "containers": "TEST-C1",
+        "force": "true"
+    })
+
+    response = client.get("/item/C-999")
+    assert int(first.get_json()["id"]) not in response.get_json()["sessions"]
+
+
+def test_get_item_sessions_pagination(client):
+    """Item sessions should page by session id with a next cursor."""
+    now = datetime.now()
+    from_date = now.replace(year=now.year-1, month=1, day=1).strftime("%Y%m%d%H%M%S")
+
+    first = client.get(f"/item/C-101?from={from_date}&limit=2").get_json()
+    assert first["sessions"] == [1, 4]
+    assert first["next"]
+
+    second = client.get(f"/item/C-101?from={from_date}&limit=2&cursor={first['next']}").get_json()
+    assert second["sessions"] == [5, 6]
+    assert second["next"] is None
+
+
+# --- Truck registry ---
+
+def test_get_item_truck_before_first_out(client):
+    """A truck that has only weighed in exists, with no tara yet."""
+    client.post("/weight", json={"direction": "in", "truck": "TEST-REG-01", "weight": 15000})
+    data = client.get("/item/TEST-REG-01").get_json()
+    assert data["tara"] == "na"
+    assert len(data["sessions"]) == 1
+
+def test_get_item_truck_tara_from_latest_out(client):
+    client.post("/weight", json={"direction": "in", "truck": "TEST-REG-02", "weight": 15000})
+    client.post("/weight", json={"direction": "out", "truck": "TEST-REG-02", "weight": 5100})
+    assert client.get("/item/TEST-REG-02").get_json()["tara"] == 5100
+
+    client.post("/weight", json={"direction": "out", "truck": "TEST-REG-02", "weight": 5200, "force": True})
+    assert client.get("/item/TEST-REG-02").get_json()["tara"] == 5200
+
+def test_truck_session_count_ignores_forced_out(client):
+    from models import Truck
+    from database import db
+
+    client.post("/weight", json={"direction": "in", "truck": "TEST-REG-03", "weight": 15000})
+    client.post("/weight", json={"direction": "out", "truck": "TEST-REG-03", "weight": 5100})
+    client.post("/weight", json={"direction": "out", "truck": "TEST-REG-03", "weight": 5200, "force": True})
+
+    db.session.expire_all()
+    assert db.session.get(Truck, "TEST-REG-03").session_count == 1
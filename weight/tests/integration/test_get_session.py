@@ -71,4 +71,125 @@ def test_get_closed_session(client):
     assert data["truck"] == "TEST-SESSION-CLOSED"
     assert data["bruto"] == 32000
     assert data["truckTara"] == 18000
-    assert data["neto"] == 13500
\ No newline at end of file
+    assert data["neto"] == 13500
+
+def test_get_closed_session_after_forced_out(client):
+    """A forced re-weigh-out should replace the session's tara and neto."""
+    session_id = client.post("/weight", json={
+        "direction": "in",
+        "truck": "TEST-SESSION-FORCE",
+        "weight": 32000,
+        "containers": "TEST-C1,TEST-C2"
+    }).get_json()["id"]
+    client.post("/weight", json={"direction": "out", "truck": "TEST-SESSION-FORCE", "weight": 18000})
+    client.post("/weight", json={"direction": "out", "truck": "TEST-SESSION-FORCE", "weight": 17000, "force": True})
+
+    data = client.get(f"/session/{session_id}").get_json()
+    assert data["truckTara"] == 17000
+    assert data["neto"] == 14500
+
+
+def test_get_standalone_container_session(client):
+    """A 'none' weighing is a session of its own, without tara or neto."""
+    session_id = client.post("/weight", json={
+        "direction": "none",
+        "weight": 800,
+        "containers": "TEST-C1"
+    }).get_json()["id"]
+
+    res = client.get(f"/session/{session_id}")
+    assert res.status_code == 200
+    data = res.get_json()
+    assert data["bruto"] == 800
+    assert "truckTara" not in data
+
+
+def test_get_fixture_session_converted_from_transactions(client):
+    """Fixture sessions are written as transactions only and converted by backfill_sessions."""
+    data = client.get("/session/1").get_json()
+    assert data["truck"] == "T-123"
+    assert data["bruto"] == 15000
+    assert data["truckTara"] == 5000
+
+
+# --- Closed session cache ---
+
+def test_closed_session_served_from_cache(client):
+    session_id = client.post("/weight", json={"direction": "in", "truck": "TEST-SESSION-CACHE", "weight": 32000}).get_json()["id"]
+    client.post("/weight", json={"direction": "out", "truck": "TEST-SESSION-CACHE", "weight": 18000})
+
+    first = client.get(f"/session/{session_id}").get_json()
+    hits = client.get("/stats").get_json()["session_cache"]["hits"]
+    second = client.get(f"/session/{session_id}").get_json()
+
+    assert second == first
+    assert client.get("/stats").get_json()["session_cache"]["hits"] == hits + 1
+
+
+def test_open_session_not_cached(client):
+    session_id = client.post("/weight", json={"direction": "in", "truck": "TEST-SESSION-NOCACHE", "weight": 32000}).get_json()["id"]
+    client.get(f"/session/{session_id}")
+    client.post("/weight", json={"direction": "out", "truck": "TEST-SESSION-NOCACHE", "weight": 18000})
+
+    assert client.get(f"/session/{session_id}").get_json()["truckTara"] == 18000
+
+
+def test_forced_out_invalidates_cached_session(client):
+    session_id = client.post("/weight", json={"direction": "in", "truck": "TEST-SESSION-RECACHE", "weight": 32000}).get_json()["id"]
+    client.post("/weight", json={"direction": "out", "truck": "TEST-SESSION-RECACHE", "weight": 18000})
+    assert client.get(f"/session/{session_id}").get_json()["truckTara"] == 18000
+
+    client.post("/weight", json={"direction": "out", "truck": "TEST-SESSION-RECACHE", "weight": 17000, "force": True})
+    assert client.get(f"/session/{session_id}").get_json()["truckTara"] == 17000
+
+
+def test_forced_in_keeps_cached_closed_session(client):
+    session_id = client.post("/weight", json={"direction": "in", "truck": "TEST-SESSION-NEXT", "weight": 32000}).get_json()["id"]
+    client.post("/weight", json={"direction": "out", "truck": "TEST-SESSION-NEXT", "weight": 18000})
+    closed = client.get(f"/session/{session_id}").get_json()
+
+    # The truck's next visit starts a new session; the closed one stays as it was
+    client.post("/weight", json={"direction": "in", "truck": "TEST-SESSION-NEXT", "weight": 30000, "force": True})
+    res = client.get(f"/session/{session_id}")
+    assert res.status_code == 200
+    assert (res.get_json()["truckTara"], res.get_json()["neto"]) == (closed["truckTara"], closed["neto"])
+
+
+def test_forced_in_replaces_open_session(client):
+    session_id = client.post("/weight", json={"direction": "in", "truck": "TEST-SESSION-REPLACED", "weight": 32000}).get_json()["id"]
+    assert client.get(f"/session/{session_id}").status_code == 200
+
+    client.post("/weight", json={"direction": "in", "truck": "TEST-SESSION-REPLACED", "weight": 30000, "force": True})
+    assert client.get(f"/session/{session_id}").status_code == 404
+
+
+# --- Bulk lookup ---
+
+def test_get_sessions_bulk(client):
+    """Found sessions come back in request order, in the GET /session shape, plus the ids not found."""
+    open_id = client.post("/weight", json={"direction": "in", "truck": "TEST-BULK-01", "weight": 32000}).get_json()["id"]
+
+    res = client.get(f"/sessions?ids={open_id},1,99999,1")
+    assert res.status_code == 200
+    data = res.get_json()
+
+    assert [s["id"] for s in data["sessions"]] == [open_id, "1"]
+    assert data["sessions"][0] == client.get(f"/session/{open_id}").get_json()
+    assert data["sessions"][1] == client.get("/session/1").get_json()
+    assert data["not_found"] == ["99999"]
+
+def test_get_sessions_invalid_id(client):
+    res = client.get("/sessions?ids=1,abc")
+    assert res.status_code == 400
+    assert res.get_json()["error"] == "invalid session id"
+
+def test_get_sessions_missing_ids(client):
+    assert client.get("/sessions").status_code == 400
+
+def test_get_sessions_too_many_ids(client):
+    from app import MAX_SESSION_IDS
+
+    ids = ",".join(str(i) for i in range(1, MAX_SESSION_IDS + 2))
+    res = client.get(f"/sessions?ids={ids}")
+    assert res.status_code == 400
+    assert "too many" in res.get_json()["error"]
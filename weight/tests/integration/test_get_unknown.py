@@ -101,4 +101,70 @@ def test_get_unknown_container_with_null_weight(client):
     data = res.get_json()
 
     assert res.status_code == 200
-    assert "TEST-NOWEIGHT" in data
\ No newline at end of file
+    assert "TEST-NOWEIGHT" in data
+
+# --- Incremental maintenance tests ---
+
+def test_get_unknown_drops_container_after_batch_weight(client):
+    """A container should leave the unknown list once /batch-weight registers its tara."""
+    client.post("/weight", json={
+        "direction": "in",
+        "truck": "TEST-UNK-06",
+        "weight": 15000,
+        "containers": "C-35434",
+        "produce": "orange"
+    })
+    assert "C-35434" in client.get("/unknown").get_json()
+
+    client.post("/batch-weight", data={"file": "containers1.csv"})
+
+    assert "C-35434" not in client.get("/unknown").get_json()
+
+
+def test_get_unknown_drops_container_of_overwritten_session(client):
+    """A container only seen on a force-overwritten weigh-in should no longer be unknown."""
+    client.post("/weight", json={
+        "direction": "in",
+        "truck": "TEST-UNK-07",
+        "weight": 15000,
+        "containers": "UNKNOWN-C4"
+    })
+    client.post("/weight", json={
+        "direction": "in",
+        "truck": "TEST-UNK-07",
+        "weight": 15000,
+        "containers": "TEST-C1",
+        "force": "true"
+    })
+
+    assert "UNKNOWN-C4" not in client.get("/unknown").get_json()
+
+
+# --- Pagination tests ---
+
+def test_get_unknown_pagination(client):
+    """Unknown containers should page by container id with a next cursor."""
+    client.post("/weight", json={
+        "direction": "in",
+        "truck": "TEST-UNK-08",
+        "weight": 15000,
+        "containers": "UNKNOWN-P1,UNKNOWN-P2,UNKNOWN-P3"
+    })
+
+    full = client.get("/unknown").get_json()
+    seen = []
+    res = client.get("/unknown?limit=1").get_json()
+    while True:
+        seen.extend(res["results"])
+        if not res["next"]:
+            break
+        res = client.get(f"/unknown?limit=1&cursor={res['next']}").get_json()
+
+    assert seen == full
+
+
+def test_get_unknown_rejects_cursor_from_other_endpoint(client):
+    """A /weight cursor doesn't fit /unknown's key and should return 400."""
+    from app import encode_cursor
+    res = client.get(f"/unknown?cursor={encode_cursor(['20250101000000', 5])}")
+    assert res.status_code == 400
@@ -59,6 +59,50 @@ def test_filter_multiple(client):
     assert "out" not in directions
 
 
+def test_filter_by_trucks(client):
+    """truck= takes several trucks, comma-separated or repeated."""
+    for truck in ("TEST-GW-10", "TEST-GW-11", "TEST-GW-12"):
+        client.post("/weight", json={"direction": "in", "truck": truck, "weight": 15000})
+
+    for query in ("truck=TEST-GW-10,TEST-GW-11", "truck=TEST-GW-10&truck=TEST-GW-11"):
+        data = client.get(f"/weight?{query}").get_json()
+        assert sorted(t["truck"] for t in data) == ["TEST-GW-10", "TEST-GW-11"]
+
+
+def test_filter_by_produce_and_truck(client):
+    """produce= and truck= narrow the list together, alongside filter=."""
+    client.post("/weight", json={"direction": "in", "truck": "TEST-GW-13", "weight": 15000, "produce": "orange"})
+    client.post("/weight", json={"direction": "in", "truck": "TEST-GW-14", "weight": 15000, "produce": "tomato"})
+    client.post("/weight", json={"direction": "out", "truck": "TEST-GW-14", "weight": 5000})
+
+    data = client.get("/weight?produce=tomato&truck=TEST-GW-13,TEST-GW-14").get_json()
+    assert [(t["truck"], t["direction"]) for t in data] == [("TEST-GW-14", "in"), ("TEST-GW-14", "out")]
+
+    data = client.get("/weight?produce=tomato&truck=TEST-GW-14&filter=out").get_json()
+    assert [t["direction"] for t in data] == ["out"]
+
+    assert client.get("/weight?produce=tomato&truck=TEST-GW-13").get_json() == []
+
+
+def test_filter_by_truck_paged(client):
+    for n in range(3):
+        client.post("/weight", json={"direction": "none", "truck": "na", "weight": 300 + n})
+    client.post("/weight", json={"direction": "in", "truck": "TEST-GW-15", "weight": 15000})
+    client.post("/weight", json={"direction": "out", "truck": "TEST-GW-15", "weight": 5000})
+
+    body = client.get("/weight?truck=TEST-GW-15&limit=1").get_json()
+    assert [t["direction"] for t in body["results"]] == ["in"]
+    body = client.get(f"/weight?truck=TEST-GW-15&limit=1&cursor={body['next']}").get_json()
+    assert [t["direction"] for t in body["results"]] == ["out"]
+    assert body["next"] is None
+
+
+def test_too_many_filter_values(client):
+    import app as weight_app
+    trucks = ",".join(f"T-{i}" for i in range(weight_app.MAX_WEIGHT_FILTER_VALUES + 1))
+    assert client.get(f"/weight?truck={trucks}").status_code == 400
+
+
 # --- Response format ---
 
 def test_response_has_required_fields(client):
@@ -145,4 +189,85 @@ def test_bad_to_format(client):
     """Invalid 'to' format should return 400."""
     res = client.get("/weight?to=abc")
     assert res.status_code == 400
-    assert "invalid datetime" in res.get_json()["error"]
\ No newline at end of file
+    assert "invalid datetime" in res.get_json()["error"]
+
+# --- Streaming export tests ---
+
+def test_ndjson_export(client):
+    """format=ndjson should stream one JSON record per line."""
+    import json
+    client.post("/weight", json={
+        "direction": "in",
+        "truck": "TEST-GW-STREAM-01",
+        "weight": 15000,
+        "containers": "TEST-C1,TEST-C2",
+        "produce": "orange"
+    })
+    res = client.get("/weight?format=ndjson")
+    assert res.status_code == 200
+    assert res.mimetype == "application/x-ndjson"
+
+    records = [json.loads(line) for line in res.get_data(as_text=True).splitlines()]
+    ours = [r for r in records if r["truck"] == "TEST-GW-STREAM-01"]
+    assert ours[0]["containers"] == ["TEST-C1", "TEST-C2"]
+    assert ours[0]["neto"] == "na"
+
+
+def test_csv_export_via_accept_header(client):
+    """Accept: text/csv should stream a CSV with a header row."""
+    import csv
+    client.post("/weight", json={
+        "direction": "in",
+        "truck": "TEST-GW-STREAM-02",
+        "weight": 15000,
+        "containers": "TEST-C1,TEST-C2"
+    })
+    res = client.get("/weight", headers={"Accept": "text/csv"})
+    assert res.status_code == 200
+    assert res.mimetype == "text/csv"
+
+    rows = list(csv.DictReader(res.get_data(as_text=True).splitlines()))
+    ours = [r for r in rows if r["truck"] == "TEST-GW-STREAM-02"]
+    assert ours[0]["containers"] == "TEST-C1,TEST-C2"
+    assert ours[0]["bruto"] == "15000"
+
+
+def test_default_accept_still_returns_json_array(client):
+    """Clients sending Accept: */* should keep getting a JSON array."""
+    res = client.get("/weight", headers={"Accept": "*/*"})
+    assert isinstance(res.get_json(), list)
+
+
+# --- Pagination tests ---
+
+def test_pagination_walks_every_record_once(client):
+    """Following next cursors should return each record exactly once, in order."""
+    for i in range(5):
+        client.post("/weight", json={"direction": "in", "truck": f"TEST-GW-PAGE-{i}", "weight": 15000})
+
+    full = client.get("/weight").get_json()
+
+    seen = []
+    res = client.get("/weight?limit=2").get_json()
+    while True:
+        assert len(res["results"]) <= 2
+        seen.extend(res["results"])
+        if not res["next"]:
+            break
+        res = client.get(f"/weight?limit=2&cursor={res['next']}").get_json()
+
+    assert sorted(r["truck"] for r in seen) == sorted(r["truck"] for r in full)
+    assert len(seen) == len(full)
+
+
+def test_pagination_invalid_cursor(client):
+    """A garbage cursor should return 400."""
+    res = client.get("/weight?limit=2&cursor=not-a-cursor")
+    assert res.status_code == 400
+    assert "invalid cursor" in res.get_json()["error"]
+
+
+def test_pagination_invalid_limit(client):
+    """limit must be a positive integer within range."""
+    assert client.get("/weight?limit=0").status_code == 400
+    assert client.get("/weight?limit=abc").status_code == 400
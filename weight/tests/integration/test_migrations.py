@@ -0,0 +1,93 @@
+import pytest
+from sqlalchemy import inspect
+from database import db
+from migrations import MIGRATIONS, FILTER_INDEXES, HOT_PATH_INDEXES, migrate, hot_path_queries
+from queryplan import capture_statements, explain
+
+
+def test_migrate_is_repeatable(client):
+    """Running migrate again should find nothing left to apply."""
+    assert migrate() == []
+
+
+def test_every_migration_recorded(client):
+    """schema_migrations should list every known migration version."""
+    versions = {row[0] for row in db.session.execute(db.text("SELECT version FROM schema_migrations"))}
+    assert versions == {version for version, _, _ in MIGRATIONS}
+
+
+def test_hot_path_indexes_exist(client):
+    """The composite indexes from migration 3 should be on transactions."""
+    names = {ix["name"] for ix in inspect(db.engine).get_indexes("transactions")}
+    assert set(HOT_PATH_INDEXES) <= names
+
+
+def test_filter_indexes_exist(client):
+    """The GET /weight filter index from migration 8 should be on transactions."""
+    names = {ix["name"] for ix in inspect(db.engine).get_indexes("transactions")}
+    assert set(FILTER_INDEXES) <= names
+
+
+def test_weight_tables_are_innodb(client):
+    """Every table, including ones created after migration 2, should be InnoDB."""
+    if db.engine.dialect.name != "mysql":
+        pytest.skip("storage engines are MySQL only")
+    engines = db.session.execute(db.text(
+        "SELECT TABLE_NAME, ENGINE FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE()"
+    )).all()
+    assert [table for table, engine in engines if engine.lower() != "innodb"] == []
+
+
+def test_hot_path_queries_use_indexes(client):
+    """None of the hot path queries should fall back to a full table scan."""
+    for name, query in hot_path_queries().items():
+        with capture_statements(db.engine) as statements:
+            query.all()
+
+        with db.engine.connect() as conn:
+            for statement, parameters in statements:
+                plan = explain(conn, statement, parameters)
+                assert not any(step["full_scan"] for step in plan), f"{name}: {plan}"
+
+
+def test_backfill_sessions_converts_transaction_pairs(client):
+    """An in/out pair becomes one closed session; an "out" whose "in" is gone still becomes a session."""
+    from datetime import datetime
+    from migrations import backfill_sessions
+    from models import Transaction, WeighingSession
+
+    when = datetime(2024, 3, 1, 8, 0, 0)
+    db.session.add_all([
+        Transaction(direction="in", truck="TEST-LEGACY", bruto=15000, produce="orange", datetime=when, session_id=900001),
+        Transaction(direction="out", truck="TEST-LEGACY", bruto=15000, truckTara=5000, neto=9500,
+                    produce="orange", datetime=when.replace(hour=9), session_id=900001),
+        Transaction(direction="out", truck="TEST-LEGACY", bruto=14000, truckTara=4000, neto=9000,
+                    produce="orange", datetime=when.replace(hour=10), session_id=900002),
+    ])
+    db.session.commit()
+
+    with db.engine.begin() as conn:
+        assert backfill_sessions(conn) == 2
+        assert backfill_sessions(conn) == 0
+
+    closed = db.session.get(WeighingSession, 900001)
+    assert (closed.truck, closed.bruto, closed.truckTara, closed.neto) == ("TEST-LEGACY", 15000, 5000, 9500)
+    assert closed.in_datetime == when
+    assert closed.out_datetime == when.replace(hour=9)
+
+    orphan = db.session.get(WeighingSession, 900002)
+    assert orphan.in_datetime is None
+    assert orphan.truckTara == 4000
+
+
+def test_backfill_trucks_takes_latest_out_tara(client):
+    """Fixture truck T-123 has two completed sessions; its newest weigh-out had tara 5000."""
+    from models import Truck
+
+    truck = db.session.get(Truck, "T-123")
+    assert truck.last_tara == 5000
+    assert truck.session_count == 2
+
+    open_truck = db.session.get(Truck, "T-456")
+    assert open_truck.last_tara is None
+    assert open_truck.session_count == 0
@@ -0,0 +1,90 @@
+from app import load_open_sessions, open_sessions
+
+
+def open_trucks(client):
+    return [s["truck"] for s in client.get("/open-sessions").get_json()]
+
+
+def test_lists_fixture_open_session(client):
+    """T-456 weighed in without weighing out; completed sessions are not listed."""
+    trucks = open_trucks(client)
+    assert "T-456" in trucks
+    assert "T-123" not in trucks
+    assert "T-888" not in trucks
+
+
+def test_in_then_out(client):
+    client.post("/weight", json={
+        "direction": "in",
+        "truck": "TEST-YARD-01",
+        "weight": 15000,
+        "containers": "TEST-C1",
+        "produce": "orange"
+    })
+
+    res = client.get("/open-sessions")
+    assert res.status_code == 200
+    session = next(s for s in res.get_json() if s["truck"] == "TEST-YARD-01")
+    assert session["bruto"] == 15000
+    assert session["containers"] == ["TEST-C1"]
+    assert session["produce"] == "orange"
+
+    client.post("/weight", json={"direction": "out", "truck": "TEST-YARD-01", "weight": 5000})
+    assert "TEST-YARD-01" not in open_trucks(client)
+
+
+def test_none_is_not_an_open_session(client):
+    client.post("/weight", json={"direction": "none", "truck": "TEST-YARD-02", "weight": 300, "containers": "TEST-C1"})
+    assert "TEST-YARD-02" not in open_trucks(client)
+
+
+def test_force_in_replaces_session(client):
+    first = client.post("/weight", json={"direction": "in", "truck": "TEST-YARD-03", "weight": 15000}).get_json()
+    second = client.post("/weight", json={"direction": "in", "truck": "TEST-YARD-03", "weight": 16000, "force": True}).get_json()
+
+    sessions = [s for s in client.get("/open-sessions").get_json() if s["truck"] == "TEST-YARD-03"]
+    assert [s["id"] for s in sessions] == [second["id"]]
+    assert first["id"] != second["id"]
+
+
+def test_rebuild_matches_live_registry(client):
+    """Reloading from the DB gives the same view post_weight kept up to date."""
+    client.post("/weight", json={"direction": "in", "truck": "TEST-YARD-04", "weight": 15000})
+    client.post("/weight", json={"direction": "in", "truck": "TEST-YARD-05", "weight": 15000})
+    client.post("/weight", json={"direction": "out", "truck": "TEST-YARD-05", "weight": 5000})
+    before = client.get("/open-sessions").get_json()
+
+    load_open_sessions()
+
+    assert client.get("/open-sessions").get_json() == before
+    assert open_sessions.get("TEST-YARD-05").weighed_out
+
+
+def test_out_after_rebuild_still_rejects_second_out(client):
+    client.post("/weight", json={"direction": "in", "truck": "TEST-YARD-06", "weight": 15000})
+    client.post("/weight", json={"direction": "out", "truck": "TEST-YARD-06", "weight": 5000})
+
+    load_open_sessions()
+
+    res = client.post("/weight", json={"direction": "out", "truck": "TEST-YARD-06", "weight": 5000})
+    assert res.status_code == 400
+    assert "already weighed out" in res.get_json()["error"]
+
+
+def test_rebuild_takes_each_trucks_latest_session(client):
+    for bruto in (15000, 16000, 17000):
+        client.post("/weight", json={"direction": "in", "truck": "TEST-YARD-07", "weight": bruto, "force": True})
+        client.post("/weight", json={"direction": "out", "truck": "TEST-YARD-07", "weight": 5000})
+    latest_id = client.post("/weight", json={"direction": "in", "truck": "TEST-YARD-07", "weight": 18000,
+                                             "force": True}).get_json()["id"]
+
+    from database import db
+    from models import Transaction
+    trucks = db.session.query(db.func.count(db.distinct(Transaction.truck))).filter(
+        Transaction.direction == "in", Transaction.truck != "na"
+    ).scalar()
+
+    # One session per truck, however many it has had
+    assert load_open_sessions() == trucks
+    session = open_sessions.get("TEST-YARD-07")
+    assert (str(session.session_id), session.bruto, session.weighed_out) == (latest_id, 18000, False)
@@ -0,0 +1,66 @@
+from datetime import datetime
+
+
+def test_post_items_matches_get_item(client):
+    """Each resolved item has the same tara and sessions as GET /item/<id> over the same window."""
+    now = datetime.now()
+    window = {
+        "from": now.replace(year=now.year - 1, month=1, day=1).strftime("%Y%m%d%H%M%S"),
+        "to": now.replace(year=now.year + 1).strftime("%Y%m%d%H%M%S")
+    }
+    ids = ["T-123", "C-101", "C-102", "T-456", "C-103"]
+
+    res = client.post("/items", json={"ids": ids, **window})
+    assert res.status_code == 200
+    data = res.get_json()
+    assert [item["id"] for item in data["items"]] == ids
+    assert data["not_found"] == []
+
+    for item in data["items"]:
+        single = client.get(f"/item/{item['id']}?from={window['from']}&to={window['to']}").get_json()
+        assert item["tara"] == single["tara"]
+        assert item["sessions"] == single["sessions"]
+
+
+def test_post_items_types(client):
+    items = client.post("/items", json={"ids": ["T-123", "C-101"]}).get_json()["items"]
+    assert [item["type"] for item in items] == ["truck", "container"]
+
+
+def test_post_items_default_window_is_this_month(client):
+    items = client.post("/items", json={"ids": ["T-123"]}).get_json()["items"]
+    assert items[0]["sessions"] == [1]
+
+
+def test_post_items_not_found(client):
+    data = client.post("/items", json={"ids": ["T-123", "NON-EXISTENT-ITEM"]}).get_json()
+    assert data["not_found"] == ["NON-EXISTENT-ITEM"]
+
+
+def test_post_items_missing_ids(client):
+    assert client.post("/items", json={}).status_code == 400
+    assert client.post("/items", json={"ids": "T-123"}).status_code == 400
+
+
+def test_post_items_invalid_date(client):
+    res = client.post("/items", json={"ids": ["T-123"], "from": "2024-01-01"})
+    assert res.status_code == 400
+
+
+def test_post_items_too_many_ids(client):
+    from app import MAX_ITEM_IDS
+
+    res = client.post("/items", json={"ids": [f"T-{i}" for i in range(MAX_ITEM_IDS + 1)]})
+    assert res.status_code == 400
+
+
+def test_post_items_query_count_does_not_grow_with_ids(client):
+    from database import db
+    from queryplan import capture_statements
+
+    def statements_for(ids):
+        with capture_statements(db.engine) as statements:
+            client.post("/items", json={"ids": ids})
+        return len(statements)
+
+    assert statements_for(["T-123", "C-101"]) == statements_for(["T-123", "T-456", "T-888", "C-101", "C-102", "C-103"])
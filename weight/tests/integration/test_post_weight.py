@@ -100,6 +100,34 @@ def test_in_after_in_with_force_overwrites(client):
     assert data["bruto"] == 14000
 
 
+def test_forced_in_after_out_keeps_closed_session(client):
+    """A forced weigh-in on the truck's next visit should not touch its weighed-out session."""
+    closed_id = client.post("/weight", json={
+        "direction": "in",
+        "truck": "TEST-004B",
+        "weight": 15000
+    }).get_json()["id"]
+    client.post("/weight", json={
+        "direction": "out",
+        "truck": "TEST-004B",
+        "weight": 5000
+    })
+    closed = client.get(f"/session/{closed_id}").get_json()
+
+    res = client.post("/weight", json={
+        "direction": "in",
+        "truck": "TEST-004B",
+        "weight": 16000,
+        "force": "true"
+    })
+    assert res.status_code == 200
+    assert res.get_json()["id"] != closed_id
+
+    assert client.get(f"/session/{closed_id}").get_json() == closed
+    weights = client.get("/weight").get_json()
+    assert [w["direction"] for w in weights if w["id"] == int(closed_id)] == ["in", "out"]
+
+
 # --- Direction "none" tests ---
 
 def test_none_standalone_container(client):
@@ -266,4 +294,70 @@ def test_in_out_flow_via_form_data(client):
     assert res.status_code == 200
     data = res.get_json()
     assert data["truckTara"] == 4500
-    assert data["neto"] == 10000
\ No newline at end of file
+    assert data["neto"] == 10000
+
+# --- Container tara cache tests ---
+
+def test_out_uses_tara_registered_by_batch_weight(client):
+    """A tara cached as unknown should be refreshed once /batch-weight registers it."""
+    client.post("/weight", json={
+        "direction": "in",
+        "truck": "TEST-TARA-01",
+        "weight": 15000,
+        "containers": "C-35434"
+    })
+    client.post("/batch-weight", data={"file": "containers1.csv"})
+    res = client.post("/weight", json={
+        "direction": "out",
+        "truck": "TEST-TARA-01",
+        "weight": 4500
+    })
+    assert res.get_json()["neto"] == 15000 - 4500 - 296
+
+
+def test_stats_reports_tara_cache(client):
+    """Repeated weigh-outs with the same containers should hit the tara cache."""
+    for truck in ("TEST-TARA-02", "TEST-TARA-03"):
+        client.post("/weight", json={
+            "direction": "in",
+            "truck": truck,
+            "weight": 15000,
+            "containers": "TEST-C1,TEST-C2"
+        })
+        client.post("/weight", json={"direction": "out", "truck": truck, "weight": 4500})
+
+    stats = client.get("/stats").get_json()["tara_cache"]
+    assert stats["hits"] >= 2
+    assert stats["size"] >= 2
+
+
+# --- Idempotency-Key ---
+
+def test_retried_in_with_idempotency_key_replays(client):
+    """A retried "in" gets the original response and doesn't create or replace a session."""
+    body = {"direction": "in", "truck": "TEST-IDEM-01", "weight": 15000, "containers": "TEST-C1"}
+    headers = {"Idempotency-Key": "test-idem-01"}
+
+    first = client.post("/weight", json=body, headers=headers)
+    retry = client.post("/weight", json=body, headers=headers)
+
+    assert retry.status_code == 200
+    assert retry.get_json() == first.get_json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    from models import Transaction
+    assert Transaction.query.filter_by(truck="TEST-IDEM-01").count() == 1
+
+
+def test_idempotency_key_reused_for_other_request(client):
+    headers = {"Idempotency-Key": "test-idem-02"}
+    client.post("/weight", json={"direction": "in", "truck": "TEST-IDEM-02", "weight": 15000}, headers=headers)
+    res = client.post("/weight", json={"direction": "in", "truck": "TEST-IDEM-02", "weight": 16000}, headers=headers)
+    assert res.status_code == 422
+
+
+def test_different_idempotency_keys_are_separate_requests(client):
+    body = {"direction": "in", "truck": "TEST-IDEM-03", "weight": 15000}
+    client.post("/weight", json=body, headers={"Idempotency-Key": "test-idem-03a"})
+    res = client.post("/weight", json=body, headers={"Idempotency-Key": "test-idem-03b"})
+    assert res.status_code == 400
+    assert "already weighed in" in res.get_json()["error"]
@@ -0,0 +1,146 @@
+"""
+Query-plan regression tests.
+
+Each route is called against a seeded dataset while every SQL statement it
+sends is captured; each SELECT/UPDATE/DELETE is then EXPLAINed. A full table
+scan or a filesort on one of LARGE_TABLES fails the test unless the
+(route, table) pair is in ALLOWED with a reason.
+
+Runs on MySQL (the dev compose DB) or on the SQLite stand-in
+(DB_URI=sqlite:///...). SQLite plans are a weaker signal than MySQL ones,
+so run it against MySQL before merging index changes.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from database import db
+from models import ContainerRegistered, SessionContainer, Transaction, Truck, WeighingSession
+from migrations import backfill_sessions, backfill_trucks
+from queryplan import capture_statements, explain
+
+# Tables that grow with traffic; scans of the small lookup tables are fine
+LARGE_TABLES = {"transactions", "session_containers", "containers_registered", "sessions", "trucks", "changes"}
+
+# (route, table) -> why a scan/filesort there is acceptable
+ALLOWED = {
+    # The index range (one item, one time window) is read first; only that
+    # item's few sessions are then sorted by session id.
+    ("item truck page", "transactions"): "sorts the sessions of a single truck",
+    ("item container page", "session_containers"): "sorts the sessions of a single container",
+    ("weight list trucks page", "transactions"): "sorts only the listed trucks' rows in the window",
+}
+
+SEED_TRUCKS = 100
+SEED_SESSIONS_PER_TRUCK = 15
+SEED_PREFIX = "PLAN-"
+
+ROUTES = [
+    ("health", "GET", "/health", None),
+    ("open sessions", "GET", "/open-sessions", None),
+    ("weight in", "POST", "/weight", {"direction": "in", "truck": f"{SEED_PREFIX}NEW", "weight": 15000, "containers": f"{SEED_PREFIX}C-1,{SEED_PREFIX}C-2"}),
+    ("weight none", "POST", "/weight", {"direction": "none", "weight": 300, "containers": f"{SEED_PREFIX}C-3"}),
+    ("weight out", "POST", "/weight", {"direction": "out", "truck": f"{SEED_PREFIX}T-0", "weight": 5000}),
+    ("weight replay", "POST", "/weight/replay", {"readings": [
+        {"direction": "in", "truck": f"{SEED_PREFIX}REPLAY", "weight": 15000, "containers": f"{SEED_PREFIX}C-4"},
+        {"direction": "out", "truck": f"{SEED_PREFIX}REPLAY", "weight": 5000},
+    ]}),
+    ("weight list", "GET", "/weight?from=20000101000000", None),
+    ("weight list page", "GET", "/weight?from=20000101000000&limit=50", None),
+    ("weight list trucks", "GET", f"/weight?from=20000101000000&filter=out&truck={SEED_PREFIX}T-1,{SEED_PREFIX}T-2", None),
+    ("weight list trucks page", "GET", f"/weight?from=20000101000000&truck={SEED_PREFIX}T-1&truck={SEED_PREFIX}T-2&limit=5", None),
+    ("weight list produce", "GET", "/weight?from=20000101000000&produce=tomato", None),
+    ("weight summary", "POST", "/weight/summary", {"trucks": [f"{SEED_PREFIX}T-1", f"{SEED_PREFIX}T-2", "NOPE"],
+                                                   "from": "20000101000000"}),
+    ("batch weight", "POST", "/batch-weight", {"file": "containers1.csv"}),
+    ("weight changes", "GET", "/weight/changes?since=0&limit=50", None),
+    ("session", "GET", "/session/1", None),
+    ("sessions", "GET", "/sessions?ids=1,2,3,99999", None),
+    ("item truck", "GET", f"/item/{SEED_PREFIX}T-1?from=20000101000000", None),
+    ("item truck page", "GET", f"/item/{SEED_PREFIX}T-1?from=20000101000000&limit=5", None),
+    ("item container", "GET", f"/item/{SEED_PREFIX}C-1?from=20000101000000", None),
+    ("item container page", "GET", f"/item/{SEED_PREFIX}C-1?from=20000101000000&limit=5", None),
+    ("items", "POST", "/items", {"ids": [f"{SEED_PREFIX}T-1", f"{SEED_PREFIX}T-2", f"{SEED_PREFIX}C-1", "NOPE"],
+                                 "from": "20000101000000"}),
+    ("unknown", "GET", "/unknown", None),
+    ("unknown page", "GET", "/unknown?limit=50", None),
+]
+
+
+@pytest.fixture(scope="module")
+def seeded():
+    """Enough rows that the MySQL optimizer prefers indexes over scanning a tiny table."""
+    from app import app
+
+    with app.app_context():
+        start = datetime.now() - timedelta(days=SEED_SESSIONS_PER_TRUCK)
+
+        db.session.add_all(
+            ContainerRegistered(container_id=f"{SEED_PREFIX}C-{i}", weight=300, unit="kg") for i in range(200)
+        )
+
+        for truck in range(SEED_TRUCKS):
+            for n in range(SEED_SESSIONS_PER_TRUCK):
+                when = start + timedelta(days=n, minutes=truck)
+                containers = f"{SEED_PREFIX}C-{truck % 200},{SEED_PREFIX}C-{(truck + n) % 200}"
+                session_in = Transaction(direction="in", truck=f"{SEED_PREFIX}T-{truck}", containers=containers,
+                                         bruto=15000, produce="orange", datetime=when)
+                db.session.add(session_in)
+                db.session.flush()
+                session_in.session_id = session_in.id
+
+                # Leave each truck's last session open so "out" has something to close
+                if n < SEED_SESSIONS_PER_TRUCK - 1:
+                    db.session.add(Transaction(direction="out", truck=session_in.truck, containers=containers,
+                                               bruto=15000, truckTara=5000, neto=9400, produce="orange",
+                                               datetime=when + timedelta(minutes=30), session_id=session_in.id))
+        db.session.commit()
+
+        from app import backfill_session_containers, load_open_sessions
+        backfill_session_containers()
+        with db.engine.begin() as conn:
+            backfill_sessions(conn)
+            backfill_trucks(conn)
+        load_open_sessions()
+
+        if db.engine.dialect.name == "mysql":
+            db.session.execute(db.text("ANALYZE TABLE transactions, session_containers, containers_registered"))
+
+        yield
+
+        seeded_ids = db.session.query(Transaction.id).filter(Transaction.truck.like(f"{SEED_PREFIX}%"))
+        SessionContainer.query.filter(SessionContainer.transaction_id.in_(seeded_ids)).delete(synchronize_session=False)
+        WeighingSession.query.filter(WeighingSession.truck.like(f"{SEED_PREFIX}%")).delete(synchronize_session=False)
+        Truck.query.filter(Truck.id.like(f"{SEED_PREFIX}%")).delete(synchronize_session=False)
+        Transaction.query.filter(Transaction.truck.like(f"{SEED_PREFIX}%")).delete(synchronize_session=False)
+        ContainerRegistered.query.filter(ContainerRegistered.container_id.like(f"{SEED_PREFIX}%")).delete(synchronize_session=False)
+        db.session.commit()
+        load_open_sessions()
+
+
+def plan_problems(route, statements):
+    """EXPLAIN each captured read/update/delete and list the scans and filesorts on large tables."""
+    problems = []
+
+    with db.engine.connect() as conn:
+        for statement, parameters in statements:
+            if statement.lstrip().split(None, 1)[0].upper() not in ("SELECT", "UPDATE", "DELETE"):
+                continue
+
+            for step in explain(conn, statement, parameters):
+                if step["table"] not in LARGE_TABLES or (route, step["table"]) in ALLOWED:
+                    continue
+                if step["full_scan"] or step["filesort"]:
+                    problems.append(f"{step['detail']}\n    in: {statement}")
+
+    return problems
+
+
+@pytest.mark.parametrize("route, method, path, body", ROUTES, ids=[r[0] for r in ROUTES])
+def test_route_query_plans(seeded, client, route, method, path, body):
+    with capture_statements(db.engine) as statements:
+        res = client.open(path, method=method, json=body)
+
+    assert res.status_code < 500
+    problems = plan_problems(route, statements)
+    assert not problems, f"{route}: unindexed access on a large table:\n" + "\n".join(problems)
@@ -0,0 +1,124 @@
+from collections import deque
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+import app as weight_app
+from database import db
+from models import JournalCheckpoint, Transaction
+
+
+def db_unavailable(*args, **kwargs):
+    raise OperationalError("SELECT 1", {}, Exception(2003, "Can't connect to MySQL server"))
+
+
+def lock_wait_timeout(*args, **kwargs):
+    raise OperationalError("INSERT INTO transactions", {}, Exception(1205, "Lock wait timeout exceeded"))
+
+
+@pytest.fixture
+def db_down(client, tmp_path, monkeypatch):
+    """POST /weight and /health fail on the DB; the buffer's writer thread is left to the test."""
+    monkeypatch.setattr(weight_app.config, "BUFFER_PATH", str(tmp_path / "buffer.jsonl"))
+    monkeypatch.setattr(weight_app.config, "BUFFER_RESERVED_IDS", 10)
+    # Reserved while the DB was still up, as at startup
+    weight_app.reserve_buffer_ids()
+    monkeypatch.setattr(weight_app.WriteBehind, "start", lambda self: None)
+    monkeypatch.setattr(weight_app, "apply_weighing", db_unavailable)
+    monkeypatch.setattr(db.session, "execute", db_unavailable)
+    yield monkeypatch
+    monkeypatch.undo()
+    weight_app.stop_write_behind()
+    JournalCheckpoint.query.delete()
+    db.session.commit()
+
+
+def db_back(monkeypatch):
+    """Undo db_down and let the buffer's writer sync, as its thread would."""
+    monkeypatch.undo()
+    writer = weight_app.write_behind
+    writer.flush()
+    assert weight_app.end_store_and_forward(writer)
+
+
+def test_readings_are_buffered_while_db_is_down(client, db_down):
+    res = client.post("/weight", json={"direction": "in", "truck": "TEST-SF-01", "weight": 15000, "containers": "TEST-C1"})
+    assert res.status_code == 200
+    session_id = res.get_json()["id"]
+
+    health = client.get("/health")
+    assert health.status_code == 200
+    assert health.get_json()["status"] == "Degraded"
+    assert health.get_json()["mode"] == "store-and-forward"
+    assert health.get_json()["backlog"] == 1
+
+    # Open sessions and the in/out rules keep working from memory
+    assert "TEST-SF-01" in [s["truck"] for s in client.get("/open-sessions").get_json()]
+    res = client.post("/weight", json={"direction": "in", "truck": "TEST-SF-01", "weight": 15000})
+    assert res.status_code == 400
+
+    out = client.post("/weight", json={"direction": "out", "truck": "TEST-SF-01", "weight": 4500}).get_json()
+    assert out["id"] == session_id
+    # TEST-C1's tara isn't cached, so neto has to wait for the DB
+    assert out["neto"] == "na"
+
+    db_back(db_down)
+
+    health = client.get("/health").get_json()
+    assert (health["status"], health["mode"], health["backlog"]) == ("OK", "direct", 0)
+    assert client.get(f"/session/{session_id}").get_json()["neto"] == 10200
+    assert Transaction.query.filter_by(truck="TEST-SF-01").count() == 2
+
+
+def test_buffered_reading_keeps_its_id(client, db_down):
+    session_id = int(client.post("/weight", json={"direction": "in", "truck": "TEST-SF-02", "weight": 15000}).get_json()["id"])
+
+    # Another process writes to the DB while this one buffers; the reserved id isn't handed out again
+    other = Transaction(direction="none", truck="na", bruto=800)
+    db.session.add(other)
+    db.session.commit()
+    assert other.id != session_id
+
+    db_back(db_down)
+
+    synced = Transaction.query.filter_by(truck="TEST-SF-02").one()
+    assert (synced.id, synced.session_id) == (session_id, session_id)
+    out = client.post("/weight", json={"direction": "out", "truck": "TEST-SF-02", "weight": 5000})
+    assert out.get_json()["id"] == str(session_id)
+    # The ids used up while buffering are reserved again
+    assert len(weight_app.reserved_ids) == weight_app.config.BUFFER_RESERVED_IDS
+
+
+def test_buffer_refuses_readings_without_reserved_ids(client, db_down):
+    db_down.setattr(weight_app, "reserved_ids", deque())
+
+    res = client.post("/weight", json={"direction": "in", "truck": "TEST-SF-05", "weight": 15000})
+    assert res.status_code == 503
+    assert len(weight_app.write_behind.journal) == 0
+    assert "TEST-SF-05" not in [s["truck"] for s in client.get("/open-sessions").get_json()]
+
+
+def test_db_failure_without_store_and_forward(client, db_down):
+    db_down.setattr(weight_app.config, "STORE_AND_FORWARD", False)
+    with pytest.raises(OperationalError):
+        client.post("/weight", json={"direction": "in", "truck": "TEST-SF-03", "weight": 15000})
+
+    res = client.get("/health")
+    assert res.status_code == 500
+    assert res.get_json()["mode"] == "direct"
+
+
+def test_lock_wait_timeout_is_not_an_outage(client, monkeypatch):
+    monkeypatch.setattr(weight_app, "apply_weighing", lock_wait_timeout)
+    res = client.post("/weight", json={"direction": "in", "truck": "TEST-SF-04", "weight": 15000},
+                      headers={"Idempotency-Key": "TEST-SF-04-in"})
+    assert res.status_code == 503
+    assert weight_app.ingest_mode == "direct"
+    assert weight_app.write_behind is None
+
+    # The key wasn't used up: the retry is applied once the DB answers
+    monkeypatch.undo()
+    res = client.post("/weight", json={"direction": "in", "truck": "TEST-SF-04", "weight": 15000},
+                      headers={"Idempotency-Key": "TEST-SF-04-in"})
+    assert res.status_code == 200
+    assert "Idempotent-Replayed" not in res.headers
@@ -0,0 +1,91 @@
+import time
+
+import pytest
+
+
+@pytest.fixture
+def since(client):
+    """The feed's watermark before the test wrote anything."""
+    return client.get("/weight/changes").get_json()["watermark"]
+
+
+def changes(client, since, **params):
+    res = client.get("/weight/changes", query_string={"since": since, **params})
+    assert res.status_code == 200, res.get_json()
+    return res.get_json()
+
+
+def test_weighings_are_fed_in_commit_order(client, since):
+    in_id = client.post("/weight", json={"direction": "in", "truck": "TEST-CF-01", "weight": 15000,
+                                         "containers": "TEST-C1", "produce": "orange"}).get_json()["id"]
+    client.post("/weight", json={"direction": "out", "truck": "TEST-CF-01", "weight": 5000})
+
+    feed = changes(client, since)
+    assert [c["type"] for c in feed["changes"]] == ["insert", "insert"]
+    assert [c["data"]["direction"] for c in feed["changes"]] == ["in", "out"]
+    assert feed["changes"][0]["seq"] < feed["changes"][1]["seq"] == feed["watermark"]
+
+    out = feed["changes"][1]["data"]
+    assert (out["id"], out["truck"], out["truckTara"], out["neto"]) == (int(in_id), "TEST-CF-01", 5000, 9700)
+    assert out["containers"] == ["TEST-C1"]
+
+
+def test_rejected_weighing_writes_no_change(client, since):
+    res = client.post("/weight", json={"direction": "out", "truck": "TEST-CF-02", "weight": 5000})
+    assert res.status_code == 400
+    assert changes(client, since) == {"changes": [], "watermark": since}
+
+
+def test_forced_in_feeds_delete_then_insert(client, since):
+    # Session 4 is T-456's open session
+    client.post("/weight", json={"direction": "in", "truck": "T-456", "weight": 14500, "force": True})
+
+    feed = changes(client, since)["changes"]
+    assert [(c["type"], c["data"]["truck"], c["data"]["bruto"]) for c in feed] == [
+        ("delete", "T-456", 14000), ("insert", "T-456", 14500)
+    ]
+    assert feed[0]["data"]["id"] == 4
+
+
+def test_batch_weight_feeds_tara_updates(client, since):
+    res = client.post("/batch-weight", json={"file": "containers1.csv"})
+    assert res.status_code == 200
+
+    feed = changes(client, since)["changes"]
+    assert feed and all(c["type"] == "tara" for c in feed)
+    assert len(feed) == res.get_json()["inserted"] + res.get_json()["updated"]
+    assert set(feed[0]["data"]) == {"container_id", "weight", "unit"}
+
+    # Registering the same file again changes nothing
+    client.post("/batch-weight", json={"file": "containers1.csv"})
+    assert len(changes(client, since)["changes"]) == len(feed)
+
+
+def test_watermark_pages_through_the_feed(client, since):
+    for n in range(5):
+        client.post("/weight", json={"direction": "in", "truck": f"TEST-CF-1{n}", "weight": 15000})
+
+    seen, watermark = [], since
+    while True:
+        feed = changes(client, watermark, limit=2)
+        if not feed["changes"]:
+            break
+        seen += [c["data"]["truck"] for c in feed["changes"]]
+        watermark = feed["watermark"]
+
+    assert seen == [f"TEST-CF-1{n}" for n in range(5)]
+    assert feed["watermark"] == watermark
+
+
+def test_long_poll_waits_then_returns_empty(client, since):
+    started = time.monotonic()
+    feed = changes(client, since, wait=0.2)
+    assert feed == {"changes": [], "watermark": since}
+    assert time.monotonic() - started >= 0.2
+
+
+def test_changes_validation(client):
+    assert client.get("/weight/changes?since=abc").status_code == 400
+    assert client.get("/weight/changes?since=-1").status_code == 400
+    assert client.get("/weight/changes?limit=0").status_code == 400
+    assert client.get("/weight/changes?wait=nan").status_code == 400
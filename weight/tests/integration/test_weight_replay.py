@@ -0,0 +1,131 @@
+from database import db
+from models import Transaction, Truck
+
+
+def replay(client, readings):
+    return client.post("/weight/replay", json={"readings": readings})
+
+
+def test_replay_in_out_with_original_timestamps(client):
+    res = replay(client, [
+        {"direction": "in", "truck": "TEST-REPLAY-01", "weight": 15000, "containers": "TEST-C1,TEST-C2",
+         "produce": "orange", "datetime": "20240301080000"},
+        {"direction": "out", "truck": "TEST-REPLAY-01", "weight": 4500, "datetime": "20240301083000"},
+    ])
+    assert res.status_code == 200
+    results = res.get_json()["results"]
+    assert [r["status"] for r in results] == [200, 200]
+    assert results[1]["id"] == results[0]["id"]
+    assert results[1]["neto"] == 10000
+
+    rows = Transaction.query.filter_by(session_id=int(results[0]["id"])).order_by(Transaction.id).all()
+    assert [t.datetime.strftime("%Y%m%d%H%M%S") for t in rows] == ["20240301080000", "20240301083000"]
+    assert client.get(f"/session/{results[0]['id']}").get_json()["truckTara"] == 4500
+
+
+def test_replay_same_rules_as_post_weight(client):
+    """Errors are reported per reading and don't stop the readings after them."""
+    results = replay(client, [
+        {"direction": "out", "truck": "TEST-REPLAY-02", "weight": 4500},
+        {"direction": "in", "truck": "TEST-REPLAY-02", "weight": 15000},
+        {"direction": "in", "truck": "TEST-REPLAY-02", "weight": 15500},
+        {"direction": "none", "truck": "TEST-REPLAY-02", "weight": 300},
+        {"direction": "in", "truck": "TEST-REPLAY-02", "weight": 16000, "force": True},
+        {"direction": "out", "truck": "TEST-REPLAY-02", "weight": 5000},
+        {"direction": "out", "truck": "TEST-REPLAY-02", "weight": 5100},
+        {"direction": "out", "truck": "TEST-REPLAY-02", "weight": 5200, "force": True},
+        {"direction": "sideways", "weight": 1},
+    ]).get_json()["results"]
+
+    assert [r["status"] for r in results] == [400, 200, 400, 400, 200, 200, 400, 200, 400]
+    assert "no open" in results[0]["error"]
+    assert "already weighed in" in results[2]["error"]
+    assert "already weighed out" in results[6]["error"]
+    assert results[7]["bruto"] == 16000
+    assert results[7]["truckTara"] == 5200
+
+
+def test_replay_updates_registry_after_commit(client):
+    replay(client, [{"direction": "in", "truck": "TEST-REPLAY-03", "weight": 15000}])
+    assert "TEST-REPLAY-03" in [s["truck"] for s in client.get("/open-sessions").get_json()]
+
+    res = client.post("/weight", json={"direction": "out", "truck": "TEST-REPLAY-03", "weight": 5000})
+    assert res.status_code == 200
+
+
+def test_replay_commits_in_chunks(client, monkeypatch):
+    import app as weight_app
+    monkeypatch.setattr(weight_app, "REPLAY_COMMIT_SIZE", 2)
+
+    readings = []
+    for i in range(3):
+        readings.append({"direction": "in", "truck": f"TEST-REPLAY-CHUNK-{i}", "weight": 15000})
+        readings.append({"direction": "out", "truck": f"TEST-REPLAY-CHUNK-{i}", "weight": 5000})
+
+    results = replay(client, readings).get_json()["results"]
+    assert all(r["status"] == 200 for r in results)
+    assert Transaction.query.filter(Transaction.truck.like("TEST-REPLAY-CHUNK-%")).count() == 6
+
+
+def test_replay_error_while_applying_rolls_back_chunk(client, monkeypatch):
+    import app as weight_app
+    from sqlalchemy.exc import IntegrityError
+    monkeypatch.setattr(weight_app, "REPLAY_COMMIT_SIZE", 2)
+
+    apply_weighing = weight_app.apply_weighing
+    def fail_on_last(reading, when, batch, transaction_id=None):
+        if reading["truck"] == "TEST-REPLAY-FAIL-3":
+            raise IntegrityError("INSERT INTO transactions", {}, Exception("duplicate entry"))
+        return apply_weighing(reading, when, batch, transaction_id)
+    monkeypatch.setattr(weight_app, "apply_weighing", fail_on_last)
+
+    res = replay(client, [{"direction": "in", "truck": f"TEST-REPLAY-FAIL-{i}", "weight": 15000} for i in range(4)])
+    assert res.status_code == 500
+    results = res.get_json()["results"]
+    assert [r["status"] for r in results] == [200, 200, 500, 500]
+    assert "stopped at reading 2" in results[2]["error"]
+
+    # Reading 2 was applied before reading 3 failed; neither was saved
+    saved = {t.truck for t in Transaction.query.filter(Transaction.truck.like("TEST-REPLAY-FAIL-%"))}
+    assert saved == {"TEST-REPLAY-FAIL-0", "TEST-REPLAY-FAIL-1"}
+    assert "TEST-REPLAY-FAIL-2" not in [s["truck"] for s in client.get("/open-sessions").get_json()]
+
+
+def test_replay_older_weigh_out_keeps_newest_tara(client):
+    replay(client, [
+        {"direction": "in", "truck": "TEST-REPLAY-OLD", "weight": 15000, "datetime": "20250301080000"},
+        {"direction": "out", "truck": "TEST-REPLAY-OLD", "weight": 5000, "datetime": "20250301083000"},
+    ])
+    # A session from 2020 turns up afterwards
+    results = replay(client, [
+        {"direction": "in", "truck": "TEST-REPLAY-OLD", "weight": 14000, "datetime": "20200101080000", "force": True},
+        {"direction": "out", "truck": "TEST-REPLAY-OLD", "weight": 4000, "datetime": "20200101083000"},
+    ]).get_json()["results"]
+    assert [r["status"] for r in results] == [200, 200]
+
+    truck = db.session.get(Truck, "TEST-REPLAY-OLD")
+    assert truck.last_seen.strftime("%Y%m%d%H%M%S") == "20250301083000"
+    assert truck.session_count == 2
+    item = client.get("/item/TEST-REPLAY-OLD?from=20000101000000").get_json()
+    assert item["tara"] == 5000
+
+
+def test_replay_accepts_bare_array(client):
+    res = client.post("/weight/replay", json=[{"direction": "none", "weight": 300, "containers": "TEST-C1"}])
+    assert res.status_code == 200
+    assert res.get_json()["results"][0]["status"] == 200
+
+
+def test_replay_invalid_reading(client):
+    results = replay(client, [
+        {"direction": "in", "truck": "TEST-REPLAY-04", "weight": 15000, "datetime": "2024-03-01"},
+        {"direction": "in", "truck": "TEST-REPLAY-04", "weight": "heavy"},
+        "not a reading",
+    ]).get_json()["results"]
+    assert [r["status"] for r in results] == [400, 400, 400]
+    assert db.session.query(Transaction).filter_by(truck="TEST-REPLAY-04").count() == 0
+
+
+def test_replay_missing_readings(client):
+    assert client.post("/weight/replay", json={}).status_code == 400
+    assert client.post("/weight/replay", json={"readings": []}).status_code == 400
@@ -0,0 +1,64 @@
+def weigh_session(client, truck, bruto, tara, containers="TEST-C1", produce="orange"):
+    client.post("/weight", json={"direction": "in", "truck": truck, "weight": bruto,
+                                 "containers": containers, "produce": produce})
+    return client.post("/weight", json={"direction": "out", "truck": truck, "weight": tara}).get_json()
+
+
+def summary(client, trucks, **window):
+    return client.post("/weight/summary", json={"trucks": trucks, **window})
+
+
+def test_summary_adds_up_neto_per_produce(client):
+    weigh_session(client, "TEST-SUM-01", 15000, 5000)                       # neto 9700
+    weigh_session(client, "TEST-SUM-02", 12000, 5000, produce="tomato")     # neto 6700
+    weigh_session(client, "TEST-SUM-03", 11000, 5000)                       # neto 5700
+    weigh_session(client, "TEST-SUM-09", 20000, 5000)                       # not asked for
+
+    res = summary(client, ["TEST-SUM-01", "TEST-SUM-02", "TEST-SUM-03", "NO-SUCH-TRUCK"])
+    assert res.status_code == 200
+    data = res.get_json()
+
+    assert data["trucks"] == ["TEST-SUM-01", "TEST-SUM-02", "TEST-SUM-03"]
+    assert data["truckCount"] == 3
+    assert data["sessionCount"] == 3
+    assert data["products"] == [
+        {"produce": "orange", "neto": 15400, "sessions": 2},
+        {"produce": "tomato", "neto": 6700, "sessions": 1},
+    ]
+
+
+def test_summary_skips_unknown_neto_and_open_sessions(client):
+    # C-103 has no registered weight, so neto is "na"
+    assert weigh_session(client, "TEST-SUM-04", 15000, 5000, containers="C-103")["neto"] == "na"
+    client.post("/weight", json={"direction": "in", "truck": "TEST-SUM-05", "weight": 15000})
+
+    data = summary(client, ["TEST-SUM-04", "TEST-SUM-05"]).get_json()
+    assert data["sessionCount"] == 0
+    assert data["trucks"] == []
+    assert data["products"] == []
+
+
+def test_summary_forced_out_counts_once(client):
+    weigh_session(client, "TEST-SUM-06", 15000, 5000)
+    client.post("/weight", json={"direction": "out", "truck": "TEST-SUM-06", "weight": 6000, "force": True})
+
+    data = summary(client, ["TEST-SUM-06"]).get_json()
+    assert data["products"] == [{"produce": "orange", "neto": 8700, "sessions": 1}]
+
+
+def test_summary_time_window(client):
+    weigh_session(client, "TEST-SUM-07", 15000, 5000)
+
+    data = summary(client, ["TEST-SUM-07"], **{"from": "20000101000000", "to": "20000201000000"}).get_json()
+    assert (data["from"], data["to"]) == ("20000101000000", "20000201000000")
+    assert data["sessionCount"] == 0
+
+
+def test_summary_validation(client):
+    assert summary(client, []).status_code == 400
+    assert summary(client, "TEST-SUM-01").status_code == 400
+    assert summary(client, ["TEST-SUM-01"], **{"from": "yesterday"}).status_code == 400
+
+    import app as weight_app
+    too_many = [f"T-{i}" for i in range(weight_app.MAX_SUMMARY_TRUCKS + 1)]
+    assert summary(client, too_many).status_code == 400
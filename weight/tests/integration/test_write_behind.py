@@ -0,0 +1,108 @@
+import pytest
+
+import app as weight_app
+from database import db
+from models import JournalCheckpoint, Transaction
+
+
+@pytest.fixture
+def journal_path(client, tmp_path):
+    """Write-behind mode with no writer thread: tests call flush() to play the writer."""
+    path = str(tmp_path / "readings.jsonl")
+    weight_app.start_write_behind(path, start_writer=False)
+    yield path
+    weight_app.stop_write_behind()
+    JournalCheckpoint.query.delete()
+    db.session.commit()
+
+
+def weigh(client, **reading):
+    res = client.post("/weight", json=reading)
+    assert res.status_code == 200, res.get_json()
+    return res.get_json()
+
+
+def weight_ids(client):
+    return [r["id"] for r in client.get("/weight").get_json()]
+
+
+def test_reading_is_acknowledged_before_it_reaches_the_db(client, journal_path):
+    data = weigh(client, direction="in", truck="TEST-WB-01", weight=15000, containers="TEST-C1")
+    session_id = int(data["id"])
+
+    assert db.session.get(Transaction, session_id) is None
+    assert client.get(f"/session/{session_id}").get_json() == {"id": data["id"], "truck": "TEST-WB-01", "bruto": 15000}
+    assert session_id in weight_ids(client)
+    assert [r["id"] for r in client.get("/weight?truck=TEST-WB-01").get_json()] == [session_id]
+    assert client.get("/weight?truck=TEST-WB-01&produce=tomato").get_json() == []
+
+    assert weight_app.write_behind.flush() == 1
+    assert db.session.get(Transaction, session_id).truck == "TEST-WB-01"
+    assert len(weight_app.write_behind.pending) == 0
+    assert weight_ids(client).count(session_id) == 1
+
+
+def test_out_sees_journaled_in(client, journal_path):
+    session_id = weigh(client, direction="in", truck="TEST-WB-02", weight=15000, containers="TEST-C1,TEST-C2")["id"]
+    out = weigh(client, direction="out", truck="TEST-WB-02", weight=4500)
+
+    assert out["id"] == session_id
+    assert out["neto"] == 10000
+    pending = client.get(f"/session/{session_id}").get_json()
+    assert pending["truckTara"] == 4500
+
+    # Same rules as before: a second out needs force
+    res = client.post("/weight", json={"direction": "out", "truck": "TEST-WB-02", "weight": 4600})
+    assert res.status_code == 400
+
+    weight_app.write_behind.flush()
+    assert client.get(f"/session/{session_id}").get_json() == pending
+
+
+def test_forced_in_hides_replaced_session(client, journal_path):
+    # Session 4 is T-456's open session in the DB
+    new_id = int(weigh(client, direction="in", truck="T-456", weight=14500, force=True)["id"])
+
+    assert client.get("/session/4").status_code == 404
+    ids = weight_ids(client)
+    assert 4 not in ids and new_id in ids
+
+    weight_app.write_behind.flush()
+    assert client.get("/session/4").status_code == 404
+    assert db.session.get(Transaction, new_id).bruto == 14500
+
+
+def test_weight_pages_include_journaled_readings(client, journal_path):
+    for n in range(3):
+        weigh(client, direction="in", truck=f"TEST-WB-1{n}", weight=15000)
+
+    expected = weight_ids(client)
+    seen, cursor = [], None
+    while True:
+        body = client.get("/weight", query_string={"limit": 2, **({"cursor": cursor} if cursor else {})}).get_json()
+        seen += [r["id"] for r in body["results"]]
+        cursor = body["next"]
+        if not cursor:
+            break
+
+    assert sorted(seen) == sorted(expected)
+
+
+def test_restart_replays_only_unapplied_entries(client, journal_path):
+    first = int(weigh(client, direction="in", truck="TEST-WB-20", weight=15000)["id"])
+    second = int(weigh(client, direction="in", truck="TEST-WB-21", weight=16000)["id"])
+
+    # The writer commits the first entry, then the process dies before it trims the journal
+    writer = weight_app.write_behind
+    weight_app.apply_journal_entries(writer.journal.pending(1))
+    writer.journal.close()
+    weight_app.write_behind = None
+
+    weight_app.start_write_behind(journal_path, start_writer=False)
+
+    assert Transaction.query.filter_by(truck="TEST-WB-20").count() == 1
+    assert db.session.get(Transaction, second).truck == "TEST-WB-21"
+    assert db.session.get(JournalCheckpoint, 1).seq == 2
+    # New readings get ids after the recovered ones
+    third = int(weigh(client, direction="in", truck="TEST-WB-22", weight=17000)["id"])
+    assert third > second > first
@@ -1,5 +1,8 @@
+import gzip
+import io
+import json
 import pytest
-from app import parse_csv, parse_json
+from app import parse_csv, parse_json, iter_json_array, batch_file_format
 
 
 # --- parse_csv: valid input ---
@@ -7,14 +10,14 @@ from app import parse_csv, parse_json
 def test_csv_kg(tmp_path):
     f = tmp_path / "test.csv"
     f.write_text('"id","kg"\nC-123,300\nC-456,250\n')
-    result = parse_csv(str(f))
+    result = list(parse_csv(str(f)))
     assert result == [("C-123", 300), ("C-456", 250)]
 
 
 def test_csv_lbs(tmp_path):
     f = tmp_path / "test.csv"
     f.write_text('"id","lbs"\nK-100,1000\n')
-    result = parse_csv(str(f))
+    result = list(parse_csv(str(f)))
     assert result == [("K-100", 453)]
 
 
@@ -24,35 +27,35 @@ def test_csv_wrong_first_column(tmp_path):
     f = tmp_path / "test.csv"
     f.write_text('"name","kg"\nAlice,300\n')
     with pytest.raises(ValueError, match="expected 'id'"):
-        parse_csv(str(f))
+        list(parse_csv(str(f)))
 
 
 def test_csv_bad_unit(tmp_path):
     f = tmp_path / "test.csv"
     f.write_text('"id","tons"\nC-123,300\n')
     with pytest.raises(ValueError, match="unsupported unit"):
-        parse_csv(str(f))
+        list(parse_csv(str(f)))
 
 
 def test_csv_missing_column(tmp_path):
     f = tmp_path / "test.csv"
     f.write_text('"id","kg"\nC-123\n')
     with pytest.raises(ValueError, match="expected 2 columns"):
-        parse_csv(str(f))
+        list(parse_csv(str(f)))
 
 
 def test_csv_empty_id(tmp_path):
     f = tmp_path / "test.csv"
     f.write_text('"id","kg"\n,300\n')
     with pytest.raises(ValueError, match="missing container id"):
-        parse_csv(str(f))
+        list(parse_csv(str(f)))
 
 
 def test_csv_missing_weight(tmp_path):
     f = tmp_path / "test.csv"
     f.write_text('"id","kg"\nC-123,\n')
     with pytest.raises(ValueError, match="missing weight value"):
-        parse_csv(str(f))
+        list(parse_csv(str(f)))
 
 
 # --- parse_json: valid input ---
@@ -60,21 +63,21 @@ def test_csv_missing_weight(tmp_path):
 def test_json_kg(tmp_path):
     f = tmp_path / "test.json"
     f.write_text('[{"id":"C-123","weight":300,"unit":"kg"}]')
-    result = parse_json(str(f))
+    result = list(parse_json(str(f)))
     assert result == [("C-123", 300)]
 
 
 def test_json_lbs(tmp_path):
     f = tmp_path / "test.json"
     f.write_text('[{"id":"K-100","weight":1000,"unit":"lbs"}]')
-    result = parse_json(str(f))
+    result = list(parse_json(str(f)))
     assert result == [("K-100", 453)]
 
 
 def test_json_default_unit(tmp_path):
     f = tmp_path / "test.json"
     f.write_text('[{"id":"C-123","weight":300}]')
-    result = parse_json(str(f))
+    result = list(parse_json(str(f)))
     assert result == [("C-123", 300)]
 
 
@@ -84,32 +87,113 @@ def test_json_not_array(tmp_path):
     f = tmp_path / "test.json"
     f.write_text('{"id":"C-123","weight":300}')
     with pytest.raises(ValueError, match="expected a JSON array"):
-        parse_json(str(f))
+        list(parse_json(str(f)))
 
 
 def test_json_missing_id(tmp_path):
     f = tmp_path / "test.json"
     f.write_text('[{"weight":300}]')
     with pytest.raises(ValueError, match="missing 'id' or 'weight'"):
-        parse_json(str(f))
+        list(parse_json(str(f)))
 
 
 def test_json_missing_weight(tmp_path):
     f = tmp_path / "test.json"
     f.write_text('[{"id":"C-123"}]')
     with pytest.raises(ValueError, match="missing 'id' or 'weight'"):
-        parse_json(str(f))
+        list(parse_json(str(f)))
 
 
 def test_json_empty_id(tmp_path):
     f = tmp_path / "test.json"
     f.write_text('[{"id":"","weight":300}]')
     with pytest.raises(ValueError, match="empty 'id' field"):
-        parse_json(str(f))
+        list(parse_json(str(f)))
 
 
 def test_json_null_weight(tmp_path):
     f = tmp_path / "test.json"
     f.write_text('[{"id":"C-123","weight":null}]')
     with pytest.raises(ValueError, match="missing weight value"):
-        parse_json(str(f))
\ No newline at end of file
+        list(parse_json(str(f)))
+
+# --- streaming ---
+
+def test_csv_is_lazy(tmp_path):
+    f = tmp_path / "test.csv"
+    f.write_text('"id","kg"\nC-123,300\nC-456,\n')
+    records = parse_csv(str(f))
+    assert next(records) == ("C-123", 300)
+    with pytest.raises(ValueError, match="row 3: missing weight value"):
+        next(records)
+
+
+def test_json_items_split_across_reads():
+    items = [{"id": f"C-{i}", "weight": i * 10, "unit": "kg"} for i in range(50)]
+    text = json.dumps(items, indent=2)
+    assert list(iter_json_array(io.StringIO(text), read_size=7)) == items
+
+
+def test_json_number_at_read_boundary():
+    assert list(iter_json_array(io.StringIO("[1,234,5]"), read_size=4)) == [1, 234, 5]
+
+
+@pytest.mark.parametrize("read_size", [1, 2, 3, 4])
+def test_json_fraction_and_exponent_at_read_boundary(read_size):
+    text = "[1.5, 2, -3e2, 4.25E-1]"
+    assert list(iter_json_array(io.StringIO(text), read_size=read_size)) == [1.5, 2, -300.0, 0.425]
+
+
+def test_json_empty_array():
+    assert list(iter_json_array(io.StringIO(" [ ] "))) == []
+
+
+def test_json_error_reports_item_number():
+    with pytest.raises(ValueError, match="item 1: invalid JSON"):
+        list(iter_json_array(io.StringIO('[{"id":"C-1"},{"id":}]'), read_size=3))
+
+
+def test_json_missing_comma():
+    with pytest.raises(ValueError, match="item 1: expected ','"):
+        list(iter_json_array(io.StringIO('[{"id":"C-1"} {"id":"C-2"}]')))
+
+
+def test_json_unterminated_array():
+    with pytest.raises(ValueError, match="unterminated JSON array"):
+        list(iter_json_array(io.StringIO('[{"id":"C-1"}')))
+
+
+# --- compressed files ---
+
+def test_csv_gzip(tmp_path):
+    f = tmp_path / "test.csv.gz"
+    with gzip.open(f, "wt") as out:
+        out.write('"id","lbs"\nK-100,1000\n')
+    assert list(parse_csv(str(f))) == [("K-100", 453)]
+
+
+def test_json_gzip(tmp_path):
+    f = tmp_path / "test.json.gz"
+    with gzip.open(f, "wt") as out:
+        out.write('[{"id":"C-123","weight":300}]')
+    assert list(parse_json(str(f))) == [("C-123", 300)]
+
+
+def test_zstd_without_package(tmp_path, monkeypatch):
+    import app
+    monkeypatch.setattr(app, "zstandard", None)
+    f = tmp_path / "test.csv.zst"
+    f.write_bytes(b"")
+    with pytest.raises(ValueError, match="zstandard"):
+        list(parse_csv(str(f)))
+
+
+@pytest.mark.parametrize("filename, expected", [
+    ("containers.csv", (".csv", None)),
+    ("containers.json.gz", (".json", ".gz")),
+    ("containers.csv.zst", (".csv", ".zst")),
+    ("containers.gz", None),
+    ("containers.xlsx", None),
+])
+def test_batch_file_format(filename, expected):
+    assert batch_file_format(filename) == expected
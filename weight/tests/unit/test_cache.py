@@ -0,0 +1,40 @@
+from cache import LRUCache
+
+
+# --- LRUCache ---
+
+def test_get_many_splits_hits_and_misses():
+    cache = LRUCache(10)
+    cache.put_many({"C-1": 300, "C-2": None})
+    found, missing = cache.get_many(["C-1", "C-2", "C-3"])
+    assert found == {"C-1": 300, "C-2": None}
+    assert missing == ["C-3"]
+
+def test_counters():
+    cache = LRUCache(10)
+    cache.put_many({"C-1": 300})
+    cache.get_many(["C-1", "C-2"])
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+
+def test_evicts_least_recently_used():
+    cache = LRUCache(2)
+    cache.put_many({"C-1": 1, "C-2": 2})
+    cache.get_many(["C-1"])
+    cache.put_many({"C-3": 3})
+    found, missing = cache.get_many(["C-1", "C-2", "C-3"])
+    assert found == {"C-1": 1, "C-3": 3}
+    assert missing == ["C-2"]
+
+def test_invalidate():
+    cache = LRUCache(10)
+    cache.put_many({"C-1": 300, "C-2": 200})
+    cache.invalidate(["C-1", "C-9"])
+    found, missing = cache.get_many(["C-1", "C-2"])
+    assert found == {"C-2": 200}
+    assert missing == ["C-1"]
+
+def test_empty_stats():
+    assert LRUCache(5).stats() == {"size": 0, "max_size": 5, "hits": 0, "misses": 0, "hit_rate": 0.0}
@@ -0,0 +1,73 @@
+import threading
+import time
+
+import pytest
+
+from idempotency import IdempotencyKeyBusy, IdempotencyKeyReused, IdempotencyStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+# --- IdempotencyStore ---
+
+def test_first_claim_owns_key_then_replays():
+    store = IdempotencyStore(10, ttl=60)
+    assert store.claim("k1", "body") is None
+    store.complete("k1", ({"id": "7"}, 200))
+    assert store.claim("k1", "body") == ({"id": "7"}, 200)
+    assert store.stats()["replays"] == 1
+
+def test_same_key_different_request():
+    store = IdempotencyStore(10, ttl=60)
+    store.claim("k1", "body")
+    store.complete("k1", ({}, 200))
+    with pytest.raises(IdempotencyKeyReused):
+        store.claim("k1", "other body")
+
+def test_expires_after_ttl():
+    clock = FakeClock()
+    store = IdempotencyStore(10, ttl=60, clock=clock)
+    store.claim("k1", "body")
+    store.complete("k1", ({}, 200))
+    clock.now = 61
+    assert store.claim("k1", "body") is None
+
+def test_evicts_oldest_finished_key():
+    store = IdempotencyStore(2, ttl=60)
+    for key in ("k1", "k2", "k3"):
+        store.claim(key, "body")
+        store.complete(key, ({"key": key}, 200))
+    assert store.stats()["size"] == 2
+    assert store.claim("k1", "body") is None
+
+def test_released_key_runs_again():
+    store = IdempotencyStore(10, ttl=60)
+    store.claim("k1", "body")
+    store.release("k1")
+    assert store.claim("k1", "body") is None
+
+def test_concurrent_claim_waits_for_first():
+    store = IdempotencyStore(10, ttl=60)
+    store.claim("k1", "body")
+    results = []
+
+    waiter = threading.Thread(target=lambda: results.append(store.claim("k1", "body")))
+    waiter.start()
+    time.sleep(0.05)
+    assert results == []
+
+    store.complete("k1", ({"id": "7"}, 200))
+    waiter.join(timeout=5)
+    assert results == [({"id": "7"}, 200)]
+
+def test_concurrent_claim_gives_up_after_wait():
+    store = IdempotencyStore(10, ttl=60)
+    store.claim("k1", "body")
+    with pytest.raises(IdempotencyKeyBusy):
+        store.claim("k1", "body", wait=0.05)
@@ -0,0 +1,44 @@
+import time
+from jobs import JobRunner
+
+
+def wait(job, timeout=5):
+    deadline = time.time() + timeout
+    while job.finished_at is None and time.time() < deadline:
+        time.sleep(0.01)
+    return job
+
+
+# --- JobRunner ---
+
+def test_job_runs_and_reports_counts():
+    def work(job):
+        job.counts["inserted"] += 3
+        job.counts["unchanged"] += 1
+
+    job = wait(JobRunner(1).submit("f.csv", work))
+    data = job.to_dict()
+    assert data["status"] == "done"
+    assert data["processed"] == 4
+    assert data["inserted"] == 3
+
+def test_failed_job_keeps_error():
+    def work(job):
+        raise ValueError("row 7: missing weight value")
+
+    job = wait(JobRunner(1).submit("f.csv", work))
+    assert job.status == "failed"
+    assert job.to_dict()["error"] == "row 7: missing weight value"
+
+def test_get_returns_submitted_job():
+    runner = JobRunner(1)
+    job = runner.submit("f.csv", lambda job: None)
+    assert runner.get(job.id) is job
+    assert runner.get("nope") is None
+
+def test_forgets_oldest_finished_jobs():
+    runner = JobRunner(1, max_jobs=2)
+    first = wait(runner.submit("a.csv", lambda job: None))
+    wait(runner.submit("b.csv", lambda job: None))
+    wait(runner.submit("c.csv", lambda job: None))
+    assert runner.get(first.id) is None
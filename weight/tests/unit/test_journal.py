@@ -0,0 +1,144 @@
+from datetime import datetime
+
+from journal import Journal, PendingReadings, WriteBehind
+from models import Transaction
+
+
+def journal_lines(path):
+    return path.read_text().splitlines()
+
+
+# --- Journal ---
+
+def test_append_numbers_entries_and_persists(tmp_path):
+    path = tmp_path / "readings.jsonl"
+    journal = Journal(str(path))
+
+    assert journal.append({"reading": {"weight": 1}})["seq"] == 1
+    assert journal.append({"reading": {"weight": 2}})["seq"] == 2
+    assert len(journal_lines(path)) == 2
+    assert [e["reading"]["weight"] for e in journal.pending(10)] == [1, 2]
+
+def test_reopen_drops_applied_entries(tmp_path):
+    path = tmp_path / "readings.jsonl"
+    journal = Journal(str(path))
+    for weight in (1, 2, 3):
+        journal.append({"reading": {"weight": weight}})
+    journal.close()
+
+    reopened = Journal(str(path), applied_seq=2)
+    assert [e["seq"] for e in reopened.pending(10)] == [3]
+    assert reopened.append({"reading": {}})["seq"] == 4
+    assert len(journal_lines(path)) == 2
+
+def test_reopen_skips_torn_last_line(tmp_path):
+    path = tmp_path / "readings.jsonl"
+    journal = Journal(str(path))
+    journal.append({"reading": {"weight": 1}})
+    journal.close()
+    with open(path, "a") as f:
+        f.write('{"seq": 2, "read')
+
+    reopened = Journal(str(path))
+    assert [e["seq"] for e in reopened.pending(10)] == [1]
+    reopened.append({"reading": {"weight": 3}})
+    assert len(journal_lines(path)) == 2
+
+def test_applied_through_truncates_when_empty(tmp_path):
+    path = tmp_path / "readings.jsonl"
+    journal = Journal(str(path))
+    journal.append({"reading": {}})
+    journal.append({"reading": {}})
+
+    journal.applied_through(1)
+    assert len(journal) == 1
+    journal.applied_through(2)
+    assert len(journal) == 0
+    assert journal_lines(path) == ['{"seq": 2}']
+    # Numbering carries on after the truncate
+    assert journal.append({"reading": {}})["seq"] == 3
+
+def test_reopen_after_truncate_keeps_numbering(tmp_path):
+    path = tmp_path / "readings.jsonl"
+    journal = Journal(str(path))
+    journal.append({"reading": {}})
+    journal.applied_through(1)
+    journal.close()
+
+    reopened = Journal(str(path))
+    assert len(reopened) == 0
+    assert reopened.append({"reading": {}})["seq"] == 2
+
+
+# --- PendingReadings ---
+
+def transaction(transaction_id, when=datetime(2024, 1, 1)):
+    return Transaction(id=transaction_id, session_id=transaction_id, direction="in", truck="T-1", datetime=when)
+
+def test_pending_transactions_and_deletes():
+    pending = PendingReadings()
+    pending.add_transaction(1, transaction(100))
+    pending.add_transaction(2, transaction(101))
+    # Deleting a pending transaction just drops it; deleting one in the DB is remembered
+    pending.delete_transaction(3, 100)
+    pending.delete_transaction(3, 50)
+
+    assert [t.id for t in pending.transactions()] == [101]
+    assert pending.deleted_ids() == [50]
+    assert len(pending) == 2
+
+def test_pending_sessions_overlay():
+    pending = PendingReadings()
+    pending.put_session(1, 100, {"id": "100"})
+    pending.put_session(2, 7, None)
+
+    assert pending.sessions([100, 7, 8]) == {100: {"id": "100"}, 7: None}
+
+def test_applied_through_drops_only_older_entries():
+    pending = PendingReadings()
+    pending.add_transaction(1, transaction(100))
+    pending.put_session(1, 100, {"id": "100"})
+    pending.add_transaction(2, transaction(101))
+    pending.delete_transaction(2, 50)
+
+    pending.applied_through(1)
+    assert [t.id for t in pending.transactions()] == [101]
+    assert pending.sessions([100]) == {}
+    assert pending.deleted_ids() == [50]
+
+    pending.applied_through(2)
+    assert len(pending) == 0
+
+
+# --- WriteBehind ---
+
+def test_flush_applies_in_batches(tmp_path):
+    applied = []
+    writer = WriteBehind(Journal(str(tmp_path / "readings.jsonl")), applied.append, next_id=10, batch_size=2)
+
+    for _ in range(5):
+        seq = writer.journal.append({"transaction_id": writer.allocate_id()})["seq"]
+        writer.pending.add_transaction(seq, transaction(seq))
+
+    assert writer.flush() == 5
+    assert [[e["transaction_id"] for e in batch] for batch in applied] == [[10, 11], [12, 13], [14]]
+    assert len(writer.journal) == 0
+    assert len(writer.pending) == 0
+
+def test_failed_batch_stays_in_journal(tmp_path):
+    def fail(entries):
+        raise RuntimeError("db down")
+
+    writer = WriteBehind(Journal(str(tmp_path / "readings.jsonl")), fail, next_id=1)
+    writer.journal.append({"transaction_id": 1})
+
+    try:
+        writer.flush()
+    except RuntimeError:
+        pass
+    assert len(writer.journal) == 1
+
+def test_allocate_id_from_reserved_ids(tmp_path):
+    writer = WriteBehind(Journal(str(tmp_path / "readings.jsonl")), lambda entries: None, next_id=None, ids=iter([7, 9]))
+
+    assert [writer.allocate_id() for _ in range(3)] == [7, 9, None]
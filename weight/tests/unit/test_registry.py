@@ -0,0 +1,55 @@
+from datetime import datetime
+
+from registry import OpenSession, OpenSessionRegistry
+
+
+def session(truck, session_id, when, weighed_out=False):
+    return OpenSession(session_id, session_id, truck, 15000, "C-1,C-2", "orange", when, weighed_out)
+
+
+# --- OpenSessionRegistry ---
+
+def test_put_and_get_by_truck():
+    registry = OpenSessionRegistry()
+    registry.put(session("T-1", 1, datetime(2024, 1, 1)))
+    assert registry.get("T-1").session_id == 1
+    assert registry.get("T-2") is None
+
+def test_put_replaces_truck_session():
+    registry = OpenSessionRegistry()
+    registry.put(session("T-1", 1, datetime(2024, 1, 1)))
+    registry.put(session("T-1", 2, datetime(2024, 1, 2)))
+    assert registry.get("T-1").session_id == 2
+    assert len(registry) == 1
+
+def test_in_yard_skips_weighed_out_oldest_first():
+    registry = OpenSessionRegistry()
+    registry.replace_all([
+        session("T-1", 1, datetime(2024, 1, 3)),
+        session("T-2", 2, datetime(2024, 1, 1)),
+        session("T-3", 3, datetime(2024, 1, 2), weighed_out=True),
+    ])
+    assert [s.truck for s in registry.in_yard()] == ["T-2", "T-1"]
+
+def test_replace_all_drops_old_sessions():
+    registry = OpenSessionRegistry()
+    registry.put(session("T-1", 1, datetime(2024, 1, 1)))
+    registry.replace_all([session("T-2", 2, datetime(2024, 1, 1))])
+    assert registry.get("T-1") is None
+
+def test_weighed_out_copy_leaves_original():
+    original = session("T-1", 1, datetime(2024, 1, 1))
+    copy = original.weighed_out_copy()
+    assert copy.weighed_out and copy.session_id == 1
+    assert not original.weighed_out
+
+def test_to_dict():
+    data = session("T-1", 7, datetime(2024, 1, 2, 3, 4, 5)).to_dict()
+    assert data == {
+        "id": "7",
+        "truck": "T-1",
+        "bruto": 15000,
+        "produce": "orange",
+        "containers": ["C-1", "C-2"],
+        "datetime": "20240102030405"
+    }